@@ -4,22 +4,30 @@ import itertools
 import re
 import uuid
 from logging import getLogger
-from typing import List
+from typing import List, Dict, Tuple
 from urllib.parse import urlparse
 
 import rdflib
 from SPARQLWrapper import SPARQLWrapper
-from pandas.io import json
-from rdflib import URIRef, Literal, Graph
+from rdflib import URIRef, Literal, Graph, ConjunctiveGraph, BNode
+from rdflib.compare import to_canonical_graph
 from rdflib.extras.external_graph_libs import rdflib_to_networkx_multidigraph
 from rdflib.namespace import NamespaceManager, RDF, OWL, XSD, Namespace, RDFS
 from tqdm import tqdm
 
 import claimskg.generator.ratings
+from claimskg.generator.columnar import parse_entity_annotations
+from claimskg.generator.interning import TermInterner
+from claimskg.generator.incremental import IncrementalState, BASE_ROW_KEY, row_key, row_digest, write_outputs
 from claimskg.generator.skosthesaurusmatcher import SkosThesaurusMatcher
 from claimskg.generator.statistics import ClaimsKGStatistics
-from claimskg.reconciler import FactReconciler
-from claimskg.util import TypedCounter
+from claimskg.reconciler import FactReconciler, ReconciliationIndex
+from claimskg.reconciler.features import ClaimFeatures
+from claimskg.reconciler.recognizer import RecognizerPool
+from claimskg.similarity.minhash import near_duplicate_pairs
+from claimskg.util import TypedCounter, LRUCache, _pool_context
+from claimskg.util.cache import open_cache
+from claimskg.util.sparql.entity_resolver import DBpediaEntityResolver
 
 logger = getLogger()
 
@@ -57,7 +65,24 @@ def _row_string_values(row, keys: List[str]):
     return [_row_string_value(row, key) for key in keys]
 
 
+def _row_keywords(row) -> List[str]:
+    keywords = row['extra_tags']
+    if not isinstance(keywords, str) or len(keywords) == 0:
+        return []
+    if ";" in keywords:
+        keyword_list = keywords.split(";")
+    else:
+        keyword_list = keywords.split(",")
+    return [keyword.strip() for keyword in keyword_list]
+
+
 class ClaimLogicalView:
+    __slots__ = ("review_entities", "review_entity_categories", "claim_entities", "claim_entity_categories", "keywords",
+                 "keywords_thesoz", "keywords_unesco", "keywords_dbpedia", "keywords_thesoz_dbpedia",
+                 "keywords_unesco_dbpedia", "links", "text_fragments", "claimreview_author", "creative_work_author",
+                 "creative_work_uri", "claim_review_url", "claim_date", "review_date", "has_body_text", "has_headline",
+                 "title", "normalized_rating", "features")
+
     def __init__(self):
         self.review_entities = []
         self.review_entity_categories = []
@@ -81,12 +106,40 @@ class ClaimLogicalView:
         self.has_headline = False
         self.title = ""
         self.normalized_rating = ""
+        self.features = None  # type: ClaimFeatures
+
+    def compact(self):
+        """
+            Replaces the entity, category, keyword and link collections and the text fragments, only needed while the
+            row is transformed and its statistics computed, by their ClaimFeatures (integer codes, normalised texts).
+            The first text fragment is kept for the mappings file.
+        """
+        self.features = ClaimFeatures.from_claim(self)
+        self.review_entities = None
+        self.review_entity_categories = None
+        self.claim_entities = None
+        self.claim_entity_categories = None
+        self.keywords = None
+        self.keywords_thesoz = None
+        self.keywords_unesco = None
+        self.keywords_dbpedia = None
+        self.keywords_thesoz_dbpedia = None
+        self.keywords_unesco_dbpedia = None
+        self.links = None
+        self.text_fragments = self.text_fragments[0:1]
 
 
 class ClaimsKGURIGenerator:
-    def __init__(self, base_uri):
+    def __init__(self, base_uri, terms: TermInterner = None):
+        """
+        :param terms: The interner of the URIs shared by several rows (organizations, authors, keywords, ratings)
+        """
         self.base_uri = base_uri
         self._claimskg_prefix = rdflib.Namespace(base_uri)
+        if terms is None:
+            terms = TermInterner()
+        self._terms = terms
+        self._keyword_uris = dict()  # type: Dict[str, URIRef]
 
     def creative_work_uri(self, row):
         uuid_key = "".join(_row_string_values(row, ["creativeWork_author_name", "creativeWork_author_sameAs",
@@ -103,20 +156,24 @@ class ClaimsKGURIGenerator:
 
     def organization_uri(self, row):
         uuid_key = "".join(_row_string_values(row, ["claimReview_author_name"])).lower().replace(" ", "_")
-        return URIRef(self._claimskg_prefix["organization/" + uuid_key])
+        return self._terms.uri(self._claimskg_prefix + "organization/" + uuid_key)
 
     def claimskg_organization_uri(self):
-        return URIRef(self._claimskg_prefix["organization/claimskg"])
+        return self._terms.uri(self._claimskg_prefix + "organization/claimskg")
 
     def creative_work_author_uri(self, row):
         uuid_key = "".join(_row_string_values(row, ["creativeWork_author_name", "creativeWork_author_sameAs"]))
-        return URIRef(self._claimskg_prefix["creative_work_author/" + str(uuid.uuid5(namespace=uuid.NAMESPACE_URL,
-                                                                                     name=uuid_key))])
+        return self._terms.uri(self._claimskg_prefix + "creative_work_author/" + str(
+            uuid.uuid5(namespace=uuid.NAMESPACE_URL, name=uuid_key)))
 
     def keyword_uri(self, keyword):
-        uuid_key = keyword
-        return URIRef(self._claimskg_prefix["keyword/" + str(uuid.uuid5(namespace=uuid.NAMESPACE_URL,
-                                                                        name=uuid_key))])
+        keyword_uri = self._keyword_uris.get(keyword)
+        if keyword_uri is None:
+            uuid_key = keyword
+            keyword_uri = self._terms.uri(self._claimskg_prefix + "keyword/" + str(
+                uuid.uuid5(namespace=uuid.NAMESPACE_URL, name=uuid_key)))
+            self._keyword_uris[keyword] = keyword_uri
+        return keyword_uri
 
     def create_original_rating_uri(self, row):
         uuid_key = "_".join(
@@ -124,12 +181,12 @@ class ClaimsKGURIGenerator:
                                      "rating_ratingValue"])).lower().replace(" ", "_").replace("\n", "_") \
             .replace("[", "").replace("]", "").replace("'", "").replace(",", ",").replace("\\", "").strip() \
             .replace("/", "").replace("<", "").replace(">", "")
-        return URIRef(self._claimskg_prefix["rating/original/" + uuid_key])
+        return self._terms.uri(self._claimskg_prefix + "rating/original/" + uuid_key)
 
     def create_normalized_rating_uri(self, normalized_rating):
         rating_name = str(normalized_rating.name)
         uuid_key = "claimskg_" + rating_name
-        return URIRef(self._claimskg_prefix["rating/normalized/" + uuid_key])
+        return self._terms.uri(self._claimskg_prefix + "rating/normalized/" + uuid_key)
 
     def mention_uri(self, begin, end, text, ref, confidence, source_text_content):
         uuid_key = str(begin) + str(end) + str(text) + str(ref) + str(round(confidence, 2)) + source_text_content
@@ -137,32 +194,132 @@ class ClaimsKGURIGenerator:
             self._claimskg_prefix["mention/" + str(uuid.uuid5(namespace=uuid.NAMESPACE_URL, name=uuid_key))])
 
 
+# Vocabularies used to annotate the claims: name -> (path, rdflib format, namespace used as named graph identifier)
+_vocabularies = {
+    "thesoz": ("claimskg/data/thesoz-komplett.xml", "xml", "http://lod.gesis.org/thesoz/"),
+    "unesco": ("claimskg/data/unesco-thesaurus.xml", "xml", "http://vocabularies.unesco.org/thesaurus/"),
+    "dbpedia_categories": ("claimskg/data/dbpedia_categories_lang_en_skos.ttl", "turtle",
+                           "http://dbpedia.org/resource/Category:")
+}
+
+
 def _normalize_text_fragment(text: str):
     return text.replace("\"\"", "\"").replace("\"", "'")
 
 
-class ClaimsKGGenerator:
-
-    def __init__(self, model_uri, sparql_wrapper=None, threshold=0.3, include_body: bool = False, resolve: bool = True,
-                 use_caching: bool = False):
-        self._graph = rdflib.Graph()
-        self.thesoz = SkosThesaurusMatcher(self._graph, thesaurus_path="claimskg/data/thesoz-komplett.xml",
-                                           skos_xl_labels=True, prefix="http://lod.gesis.org/thesoz/")
-        self._graph = self.thesoz.get_merged_graph()
+def _serialized_lines(dataset: ConjunctiveGraph, format) -> List[str]:
+    serialization = dataset.serialize(format=format, encoding="utf-8").decode("utf-8")
+    return [line for line in serialization.split("\n") if len(line.strip()) > 0]
+
+
+def _canonical_blank_nodes(dataset: ConjunctiveGraph) -> ConjunctiveGraph:
+    """
+        Copy of dataset whose blank nodes are labelled from the triples of their graph (see
+        rdflib.compare.to_canonical_graph). The blank nodes of a parsed vocabulary get new labels at each parse, they
+        then have the same labels from one run to the other.
+    """
+    canonical_dataset = ConjunctiveGraph()
+    for context in dataset.contexts():
+        graph = Graph(store=canonical_dataset.store, identifier=context.identifier)
+        triples = context
+        if any(isinstance(term, BNode) for triple in context for term in triple):
+            triples = to_canonical_graph(context)
+        graph.addN((subject, predicate, value, graph) for subject, predicate, value in triples)
+    return canonical_dataset
+
+
+# State of the generation worker processes, set once per process by _initialize_generator_worker
+_worker_generator = None  # type: ClaimsKGGenerator
+_worker_keep_logical_views = True
+
+
+def _initialize_generator_worker(generator, keep_logical_views):
+    global _worker_generator, _worker_keep_logical_views
+    _worker_generator = generator
+    _worker_keep_logical_views = keep_logical_views
+
+
+def _transform_shard(shard):
+    """
+        Transforms a shard of (row, keyword URIs already described before the row) on a worker, see
+        ClaimsKGGenerator._generate_model_sharded
+    :return: The triples of the shard, its statistics, the logical views and creative works of its claims, the
+    (hits, misses) of the lookup caches and the (requests, created) of the term interner during the shard
+    """
+    generator = _worker_generator
+    generator._reset_dataset()
+    generator.global_statistics = ClaimsKGStatistics()
+    generator.per_source_statistics = dict()
+    generator._logical_view_claims = []
+    generator._creative_works_index = []
+    # The caches of a worker live across its shards, only the counts of this shard are returned
+    caches = [cache for _, cache in generator._lookup_caches()]
+    cache_counts = [(cache.hits, cache.misses) for cache in caches]
+    term_counts = (generator._terms.requests, generator._terms.created)
+    for row, described_keywords in shard:
+        generator.keyword_uri_set = set(described_keywords)
+        generator._process_row(row, keep_logical_view=_worker_keep_logical_views)
+    cache_counts = [(cache.hits - hits, cache.misses - misses) for cache, (hits, misses) in zip(caches, cache_counts)]
+    term_counts = (generator._terms.requests - term_counts[0], generator._terms.created - term_counts[1])
+    return (list(generator._graph), generator.global_statistics.counts,
+            {site: statistics.counts for site, statistics in generator.per_source_statistics.items()},
+            generator._logical_view_claims, generator._creative_works_index, cache_counts, term_counts)
 
-        self.unesco = SkosThesaurusMatcher(self._graph, thesaurus_path="claimskg/data/unesco-thesaurus.xml",
-                                           skos_xl_labels=False, prefix="http://vocabularies.unesco.org/thesaurus/")
 
-        self._graph = self.unesco.get_merged_graph()
+class ClaimsKGGenerator:
 
-        self._graph.load("claimskg/data/dbpedia_categories_lang_en_skos.ttl", format="turtle")
+    def __init__(self, model_uri, sparql_wrapper=None, threshold=0.3, include_body: bool = False, resolve: bool = False,
+                 use_caching: bool = False, vocabulary_graphs: str = "merged", keyword_cache_size=100000,
+                 concept_recognizer: str = "intersection", annotation_workers: int = 1,
+                 cache_backend: str = "sqlite:claimskg_cache.sqlite", resolve_batch_size=200, resolve_workers=4,
+                 term_cache_size=1000000):
+        """
+        :param vocabulary_graphs: Where the triples of the vocabularies (TheSoz, UNESCO, DBpedia categories) go:
+        'merged' loads them in the ClaimsKG graph, 'named' loads each of them in its own named graph of the dataset
+        (kept apart when serializing to nquads, trig or trix) and 'excluded' leaves them out of the model, they can
+        then be serialized separately with export_vocabularies().
+        :param keyword_cache_size: The maximum number of (thesaurus, keyword) matches kept in memory, unbounded if None
+        :param term_cache_size: The maximum number of terms kept by the term interner, unbounded if None
+        :param concept_recognizer: The concept recognizer matching keywords against the thesauri, 'intersection' or
+        'automaton' (same matches)
+        :param annotation_workers: The number of processes matching the keywords against the thesauri, keywords are
+        then matched in bulk before the rows are transformed
+        :param cache_backend: The cache used by the reconciliation when use_caching is set and by the entity
+        resolution, see claimskg.util.cache.open_cache
+        :param resolve: Whether to resolve the entities of the mentions against the endpoint of sparql_wrapper, all the
+        distinct entities being resolved in batches of resolve_batch_size, with up to resolve_workers queries in flight
+        (disabled by default)
+        """
+        # All the graphs share the store of the dataset, the ClaimsKG triples go to the graph named after the model
+        self._dataset = ConjunctiveGraph()
+        self._graph = Graph(store=self._dataset.store, identifier=URIRef(model_uri))
+        self._vocabulary_graphs = vocabulary_graphs
+        vocabulary_graphs_by_name = self._load_vocabularies()
+
+        self.thesoz = SkosThesaurusMatcher(vocabulary_graphs_by_name.get("thesoz"),
+                                           thesaurus_path=_vocabularies["thesoz"][0],
+                                           skos_xl_labels=True, prefix=_vocabularies["thesoz"][2],
+                                           concept_recognizer=concept_recognizer)
+
+        self.unesco = SkosThesaurusMatcher(vocabulary_graphs_by_name.get("unesco"),
+                                           thesaurus_path=_vocabularies["unesco"][0],
+                                           skos_xl_labels=False, prefix=_vocabularies["unesco"][2],
+                                           concept_recognizer=concept_recognizer)
 
         self._sparql_wrapper = sparql_wrapper  # type: SPARQLWrapper
-        self._uri_generator = ClaimsKGURIGenerator(model_uri)
+        # Canonical instances of the terms repeated across rows, see TermInterner
+        self._terms = TermInterner(term_cache_size)
+        self._uri_generator = ClaimsKGURIGenerator(model_uri, self._terms)
         self._threshold = threshold
         self._include_body = include_body
         self._resolve = resolve
         self._use_caching = use_caching
+        self._cache_backend = cache_backend
+        self._resolve_batch_size = resolve_batch_size
+        self._resolve_workers = resolve_workers
+        self._entity_resolver = None  # type: DBpediaEntityResolver
+        # Candidate DBpedia IRI of an entity -> IRI it was resolved to, None when it does not exist
+        self._entity_resolutions = dict()  # type: Dict[str, str]
 
         self.model_uri = model_uri
         self._namespace_manager = NamespaceManager(Graph())
@@ -209,6 +366,7 @@ class ClaimsKGGenerator:
         self._namespace_manager.bind("skos", self._skos_prefix, override=False)
 
         self._owl_same_as = URIRef(OWL['sameAs'])
+        self._dct_about_property_uri = URIRef(self._dct_prefix["about"])
 
         self._schema_claim_review_class_uri = URIRef(self._schema_prefix['ClaimReview'])
         self._schema_creative_work_class_uri = URIRef(self._schema_prefix['CreativeWork'])
@@ -259,15 +417,51 @@ class ClaimsKGGenerator:
 
         self.its_ta_confidence_property_uri = URIRef(self._its_prefix['taConfidence'])
         self.its_ta_ident_ref_property_uri = URIRef(self._its_prefix['taIdentRef'])
+        self._schema_review_rating_property_uri = URIRef(self._schema_prefix['reviewRating'])
 
         self._logical_view_claims = []  # type: List[ClaimLogicalView]
         self._creative_works_index = []
 
         self.keyword_uri_set = set()
+        # Thesaurus matches of the keywords, shared by both thesauri, each keyword being recognized once per thesaurus
+        self._keyword_annotation_cache = LRUCache(keyword_cache_size)
+        self._annotation_workers = annotation_workers
+        # Annotation workers kept for a whole run, see _open_recognizer_pool
+        self._recognizer_pool = None  # type: RecognizerPool
 
         self.global_statistics = ClaimsKGStatistics()
         self.per_source_statistics = {}
 
+    def _load_vocabularies(self):
+        vocabulary_graphs_by_name = dict()
+        for name, (path, format, graph_uri) in _vocabularies.items():
+            if self._vocabulary_graphs == "merged":
+                logger.info("Loading vocabulary into ClaimsKG graph... [{}]".format(path))
+                self._graph.load(path, format=format)
+            elif self._vocabulary_graphs == "named":
+                logger.info("Loading vocabulary into named graph <{}>... [{}]".format(graph_uri, path))
+                vocabulary_graph = Graph(store=self._dataset.store, identifier=URIRef(graph_uri))
+                vocabulary_graph.load(path, format=format)
+                vocabulary_graphs_by_name[name] = vocabulary_graph
+        return vocabulary_graphs_by_name
+
+    def export_vocabularies(self, output_stream, format="nt"):
+        """
+            Serializes the vocabularies to output_stream (binary), one after the other, each one being parsed only
+            while it is written. Meant for the 'excluded' vocabulary mode, where they are not part of the model.
+        """
+        for name, (path, vocabulary_format, graph_uri) in _vocabularies.items():
+            logger.info("Serializing vocabulary <{}>... [{}]".format(graph_uri, path))
+            vocabulary_dataset = ConjunctiveGraph()
+            vocabulary_graph = Graph(store=vocabulary_dataset.store, identifier=URIRef(graph_uri))
+            vocabulary_graph.load(path, format=vocabulary_format)
+            vocabulary_dataset.serialize(destination=output_stream, format=format, encoding="utf-8")
+        output_stream.flush()
+
+    def _bind_namespaces(self):
+        self._graph.namespace_manager = self._namespace_manager
+        self._dataset.namespace_manager = self._namespace_manager
+
     def _create_schema_claim_review(self, row, claim: ClaimLogicalView):
         claim_review_instance = self._uri_generator.claim_review_uri(row)
         self._graph.add((claim_review_instance, RDF.type, self._schema_claim_review_class_uri))
@@ -308,7 +502,7 @@ class ClaimsKGGenerator:
         if review_date:
             self._graph.add(
                 (claim_review_instance, self._schema_date_published_property_uri,
-                 Literal(review_date, datatype=XSD.date)))
+                 self._terms.literal(review_date, datatype=XSD.date)))
             claim.review_date = datetime.datetime.strptime(review_date, "%Y-%m-%d").date()
         self._graph.add((claim_review_instance, self._schema_in_language_preperty_uri, self._english_uri))
 
@@ -322,11 +516,12 @@ class ClaimsKGGenerator:
 
         self._graph.add(
             (organization, self._schema_name_property_uri,
-             Literal(row['claimReview_author_name'], lang=self._iso1_language_tag)))
+             self._terms.literal(row['claimReview_author_name'], lang=self._iso1_language_tag)))
 
         author_name = _row_string_value(row, 'claimReview_author_name')
         if len(author_name) > 0:
-            self._graph.add((organization, self._schema_url_property_uri, URIRef(source_uri_dict[author_name])))
+            self._graph.add((organization, self._schema_url_property_uri,
+                             self._terms.uri(source_uri_dict[author_name])))
 
         return organization
 
@@ -341,7 +536,7 @@ class ClaimsKGGenerator:
 
     def _reconcile_keyword_annotations(self, claim, keyword_uri, keyword, matching_annotations, type="thesoz"):
         for annotation in matching_annotations:
-            self._graph.add((keyword_uri, URIRef(self._dct_prefix["about"]), URIRef(annotation[0])))
+            self._graph.add((keyword_uri, self._dct_about_property_uri, self._terms.uri(annotation[0])))
             if type == "thesoz":
                 claim.keywords_thesoz.add(keyword)
             else:
@@ -358,7 +553,74 @@ class ClaimsKGGenerator:
                 elif type == "unesco":
                     claim.keywords_unesco_dbpedia.add(keyword)
                 self._graph.add(
-                    (URIRef(dbpedia_entity), OWL.sameAs, URIRef(matching_annotation[0])))
+                    (self._terms.uri(dbpedia_entity), OWL.sameAs, self._terms.uri(matching_annotation[0])))
+
+    def _find_keyword_matches(self, matcher: SkosThesaurusMatcher, keyword):
+        return self._keyword_annotation_cache.get((matcher.prefix, keyword),
+                                                  lambda key: frozenset(matcher.find_keyword_matches(keyword)))
+
+    def _prime_keyword_cache(self, rows):
+        """
+            Matches the keywords of the rows that are not cached yet against both thesauri in bulk, on
+            self._annotation_workers processes, and caches the matches for the transformation of the rows
+        """
+        keywords = set()
+        for row in rows:
+            keywords.update(_row_keywords(row))
+        run_pool = self._recognizer_pool is not None
+        if not run_pool:
+            self._open_recognizer_pool()
+        try:
+            for matcher in (self.thesoz, self.unesco):
+                pending_keywords = [keyword for keyword in sorted(keywords) if
+                                    (matcher.prefix, keyword) not in self._keyword_annotation_cache]
+                logger.info("Matching {} keywords against <{}>...".format(len(pending_keywords), matcher.prefix))
+                keyword_matches = matcher.find_keyword_matches_many(pending_keywords, workers=self._annotation_workers,
+                                                                    pool=self._recognizer_pool)
+                for keyword, matches in zip(pending_keywords, keyword_matches):
+                    self._keyword_annotation_cache.put((matcher.prefix, keyword), frozenset(matches))
+        finally:
+            if not run_pool:
+                self._close_recognizer_pool()
+
+    def _open_recognizer_pool(self):
+        """
+            Forks the annotation workers, shared by both thesauri until _close_recognizer_pool, so that runs priming
+            the keyword cache several times (chunk by chunk) do not fork them each time
+        """
+        if self._annotation_workers > 1:
+            self._recognizer_pool = RecognizerPool([self.thesoz.concept_recognizer, self.unesco.concept_recognizer],
+                                                   self._annotation_workers)
+
+    def _close_recognizer_pool(self):
+        if self._recognizer_pool is not None:
+            self._recognizer_pool.close()
+            self._recognizer_pool = None
+
+    def _resolve_entities(self, rows):
+        """
+            Resolves the entities of the mentions of the rows that were not resolved yet in bulk, see
+            DBpediaEntityResolver. The parsed annotations replace the JSON fields of the rows, so that they are not
+            parsed again when the rows are transformed (as for columnar input).
+        """
+        if not self._resolve or self._sparql_wrapper is None:
+            return
+        candidates = set()
+        for row in rows:
+            for column in ('extra_entities_claimReview_claimReviewed', 'extra_entities_body',
+                           'extra_entities_keywords'):
+                row[column] = self._process_json(row[column])
+                for mention_entry in row[column] or []:
+                    if float(mention_entry['score']) > self._threshold:
+                        candidate = str(self._dbr_prefix[mention_entry['entity'].replace(" ", "_")])
+                        if candidate not in self._entity_resolutions:
+                            candidates.add(candidate)
+        if len(candidates) > 0:
+            if self._entity_resolver is None:
+                self._entity_resolver = DBpediaEntityResolver(self._sparql_wrapper, open_cache(self._cache_backend),
+                                                              batch_size=self._resolve_batch_size,
+                                                              workers=self._resolve_workers)
+            self._entity_resolutions.update(self._entity_resolver.resolve(candidates))
 
     def _create_creative_work(self, row, claim: ClaimLogicalView):
         creative_work = self._uri_generator.creative_work_uri(row)
@@ -367,28 +629,24 @@ class ClaimsKGGenerator:
         date_published_value = _row_string_value(row, "creativeWork_datePublished")
         if len(date_published_value) > 0:
             self._graph.add((creative_work, self._schema_date_published_property_uri,
-                             Literal(date_published_value, datatype=XSD.date)))
+                             self._terms.literal(date_published_value, datatype=XSD.date)))
             claim.claim_date = datetime.datetime.strptime(date_published_value, "%Y-%m-%d").date()
 
-        keywords = row['extra_tags']
-        if isinstance(keywords, str) and len(keywords) > 0:
+        keyword_list = _row_keywords(row)
+        if len(keyword_list) > 0:
             keyword_mentions = self._process_json(row['extra_entities_keywords'])
             if not keyword_mentions:
                 keyword_mentions = []
-            if ";" in keywords:
-                keyword_list = keywords.split(";")
-            else:
-                keyword_list = keywords.split(",")
 
             for keyword in keyword_list:
-                keyword = keyword.strip()
                 keyword_uri = self._uri_generator.keyword_uri(keyword)
                 if keyword_uri not in self.keyword_uri_set:
                     self._graph.add((keyword_uri, RDF.type, self._schema_thing_class_uri))
                     self._graph.add(
-                        (keyword_uri, self._schema_name_property_uri, Literal(keyword, lang=self._iso1_language_tag)))
-                    thesoz_matching_annotations = self.thesoz.find_keyword_matches(keyword)
-                    unesco_matching_annotations = self.unesco.find_keyword_matches(keyword)
+                        (keyword_uri, self._schema_name_property_uri,
+                         self._terms.literal(keyword, lang=self._iso1_language_tag)))
+                    thesoz_matching_annotations = self._find_keyword_matches(self.thesoz, keyword)
+                    unesco_matching_annotations = self._find_keyword_matches(self.unesco, keyword)
                     self._reconcile_keyword_annotations(claim, keyword_uri, keyword, thesoz_matching_annotations)
                     self._reconcile_keyword_annotations(claim, keyword_uri, keyword, unesco_matching_annotations,
                                                         type="unesco")
@@ -458,18 +716,17 @@ class ClaimsKGGenerator:
                 author_mentions = []
             for mention in author_mentions:
                 entity_uri = mention['entity'].replace(" ", "_")
-                mention_instance = self._dbr_prefix[entity_uri]
+                mention_instance = self._terms.uri(self._dbr_prefix + entity_uri)
                 if mention_instance:
                     self._graph.add((creative_work_author, self._schema_mentions_property_uri, mention_instance))
 
             self._graph.add(
                 (creative_work_author, self._schema_name_property_uri,
-                 Literal(author_value, lang=self._iso1_language_tag)))
+                 self._terms.literal(author_value, lang=self._iso1_language_tag)))
             self._graph.add((creative_work, self._schema_author_property_uri, creative_work_author))
 
         # Todo: Reconcile author entities with DBPedia
         # self._graph.add((creative_work_author, self._schema_same_as_property_uri, Literal("dbpedia:link")))
-        self._creative_works_index.append(creative_work)
         return creative_work
 
     def _create_review_rating(self, row, claim):
@@ -482,7 +739,7 @@ class ClaimsKGGenerator:
                                                                                             'xmlcharrefreplace')
             self._graph.add(
                 (original_rating, self._schema_alternate_name_property_uri,
-                 Literal(escaped_alternate_rating_name)))
+                 self._terms.literal(escaped_alternate_rating_name)))
 
         self._graph.add((original_rating, RDF.type, self._schema_rating_class_uri))
 
@@ -493,7 +750,7 @@ class ClaimsKGGenerator:
             value = float(rating_value)
             self._graph.add(
                 (original_rating, self._schema_rating_value_property_uri,
-                 Literal(value, datatype=XSD.float)))
+                 self._terms.literal(value, datatype=XSD.float)))
 
         organization = self._uri_generator.organization_uri(row)
         self._graph.add((original_rating, self._schema_author_property_uri, organization))
@@ -505,12 +762,11 @@ class ClaimsKGGenerator:
         self._graph.add((normalized_rating, RDF.type, self._schema_rating_class_uri))
         self._graph.add(
             (normalized_rating, self._schema_alternate_name_property_uri,
-             Literal(str(normalized_rating_enum.name), lang=self._iso1_language_tag)))
+             self._terms.literal(str(normalized_rating_enum.name), lang=self._iso1_language_tag)))
 
         self._graph.add(
             (normalized_rating, self._schema_rating_value_property_uri,
-             Literal(normalized_rating_enum.value,
-                     datatype=XSD.integer)))
+             self._terms.literal(normalized_rating_enum.value, datatype=XSD.integer)))
 
         claimskg_org = self._uri_generator.claimskg_organization_uri()
         self._graph.add((normalized_rating, self._schema_author_property_uri, claimskg_org))
@@ -532,20 +788,30 @@ class ClaimsKGGenerator:
             mention = self._uri_generator.mention_uri(start, end, text, entity_uri, rho_value,
                                                       ",".join(claim.text_fragments))
 
+            entity_iri = self._dbr_prefix + entity_uri
+            resolution = self._entity_resolutions.get(entity_iri)
+            if resolution is not None:
+                entity_iri = resolution
+                if resolution.startswith(str(self._dbr_prefix)):
+                    entity_uri = resolution[len(str(self._dbr_prefix)):]
+            entity = self._terms.uri(entity_iri)
+
             self._graph.add((mention, RDF.type, self._nif_context_class_uri))
             self._graph.add((mention, RDF.type, self._nif_RFC5147String_class_uri))
 
             self._graph.add((mention, self._nif_is_string_property_uri,
-                             Literal(text, lang=self._iso1_language_tag)))
-            self._graph.add((mention, self._nif_begin_index_property_uri, Literal(int(start), datatype=XSD.integer)))
-            self._graph.add((mention, self._nif_end_index_property_uri, Literal(int(end), datatype=XSD.integer)))
+                             self._terms.literal(text, lang=self._iso1_language_tag)))
+            self._graph.add((mention, self._nif_begin_index_property_uri,
+                             self._terms.literal(int(start), datatype=XSD.integer)))
+            self._graph.add((mention, self._nif_end_index_property_uri,
+                             self._terms.literal(int(end), datatype=XSD.integer)))
 
             # TODO: Fix values so that they aren't displayed in scientific notation
             self._graph.add(
                 (mention, self.its_ta_confidence_property_uri,
-                 Literal(float(self._format_confidence_score(mention_entry)), datatype=XSD.float)))
+                 self._terms.literal(float(self._format_confidence_score(mention_entry)), datatype=XSD.float)))
 
-            self._graph.add((mention, self.its_ta_ident_ref_property_uri, self._dbr_prefix[entity_uri]))
+            self._graph.add((mention, self.its_ta_ident_ref_property_uri, entity))
             if in_review:
                 claim.review_entities.append(entity_uri)
                 for category in categories:
@@ -558,9 +824,9 @@ class ClaimsKGGenerator:
 
             for category in categories:
                 category = category.replace(" ", "_")
-                self._graph.add((mention, URIRef(self._dct_prefix["about"]), URIRef(self._dbc_prefix[category])))
+                self._graph.add((mention, self._dct_about_property_uri, self._terms.uri(self._dbc_prefix + category)))
 
-            return mention, self._dbr_prefix[entity_uri]
+            return mention, entity
         else:
             return None, None
 
@@ -581,7 +847,12 @@ class ClaimsKGGenerator:
 
         return atchechmedjiev_contact_vcard
 
-    def add_dcat_metadata(self):
+    def add_dcat_metadata(self, modified=None):
+        """
+        :param modified: The modification date of the dataset, the time of the run by default
+        """
+        if modified is None:
+            modified = datetime.datetime.now()
         claimskg = rdflib.term.URIRef(self._claimskg_prefix['claimskg'])
         self._graph.add((claimskg,
                          RDF.type,
@@ -595,7 +866,7 @@ class ClaimsKGGenerator:
                          rdflib.term.Literal("2019-04-10", datatype=XSD.date)))
 
         self._graph.add((claimskg, rdflib.term.URIRef(self._dct_prefix['modified']),
-                         rdflib.term.Literal(datetime.datetime.now(), datatype=XSD.date)))
+                         rdflib.term.Literal(modified, datatype=XSD.date)))
 
         doi_org = URIRef(self._claimskg_prefix['doi_org_instance'])
         self._graph.add((
@@ -643,7 +914,7 @@ class ClaimsKGGenerator:
                          rdflib.term.Literal("2019-04-10", datatype=XSD.date)))
 
         self._graph.add((sparql_claimskg_distribution, rdflib.term.URIRef(self._dct_prefix['modified']),
-                         rdflib.term.Literal(datetime.datetime.now(), datatype=XSD.date)))
+                         rdflib.term.Literal(modified, datatype=XSD.date)))
 
         licence_document = URIRef("https://creativecommons.org/licenses/by/4.0/")
         self._graph.add((licence_document, RDF.type, self._dct_prefix['LicenseDocument']))
@@ -667,7 +938,7 @@ class ClaimsKGGenerator:
                          rdflib.term.Literal("2019-04-10", datatype=XSD.date)))
 
         self._graph.add((sourcecode_claimskg_distribution, rdflib.term.URIRef(self._dct_prefix['modified']),
-                         rdflib.term.Literal(datetime.datetime.now(), datatype=XSD.date)))
+                         rdflib.term.Literal(modified, datatype=XSD.date)))
 
         self._graph.add((sourcecode_claimskg_distribution, rdflib.term.URIRef(self._dct_prefix['license']),
                          licence_document))
@@ -675,81 +946,290 @@ class ClaimsKGGenerator:
         self._graph.add((sourcecode_claimskg_distribution, rdflib.term.URIRef(self._dcat_prefix['accessURL']),
                          Literal("https://github.com/claimskg")))
 
-    def generate_model(self, dataset_rows):
-        row_counter = 0
-
-        self._graph.namespace_manager = self._namespace_manager
-        total_entry_count = len(dataset_rows)
+    def generate_model(self, dataset_rows, workers=1, shard_size=500, keep_logical_views=True):
+        """
+        :param workers: The number of processes transforming the rows, see _generate_model_sharded
+        :param shard_size: The number of rows transformed by a worker at once
+        :param keep_logical_views: Whether to keep the logical view of the claims for reconciliation/alignment
+        """
+        self._bind_namespaces()
+        total_entry_count = len(dataset_rows) if hasattr(dataset_rows, "__len__") else None
 
         self.add_dcat_metadata()
 
+        if self._annotation_workers > 1 or self._resolve or workers > 1:
+            dataset_rows = list(dataset_rows)
+        if self._annotation_workers > 1:
+            self._prime_keyword_cache(dataset_rows)
+        self._resolve_entities(dataset_rows)
+
+        if workers > 1:
+            self._generate_model_sharded(dataset_rows, workers, shard_size, keep_logical_views)
+            return
+
         progress_bar = tqdm(total=total_entry_count)
 
         for row in dataset_rows:
-            row_counter += 1
             progress_bar.update(1)
+            self._process_row(row, keep_logical_view=keep_logical_views)
 
-            logical_claim = ClaimLogicalView()  # Instance holding claim raw information for mapping generation
-            source_site = _row_string_value(row, 'claimReview_author_name')
-            if source_site not in self.per_source_statistics.keys():
-                self.per_source_statistics[source_site] = ClaimsKGStatistics()
-
-            claim_review_instance = self._create_schema_claim_review(row, logical_claim)
+        progress_bar.close()
 
-            organization = self._create_organization(row, logical_claim)
-            self._graph.add((claim_review_instance, self._schema_author_property_uri, organization))
+    def _keyword_description_pass(self, dataset_rows) -> List[frozenset]:
+        """
+            Replays the evolution of keyword_uri_set over the rows without transforming them: a keyword is described
+            (name, thesaurus concepts, mentions) by every row using it until a row has a mention of it, after which it
+            is in keyword_uri_set and no longer described.
+        :return: For each row, the URIs of its keywords that are in keyword_uri_set before the row
+        """
+        described_keywords = []
+        for row in dataset_rows:
+            keyword_list = _row_keywords(row)
+            row_keyword_uris = set(self._uri_generator.keyword_uri(keyword) for keyword in keyword_list)
+            described_keywords.append(frozenset(row_keyword_uris & self.keyword_uri_set))
+            if len(keyword_list) > 0:
+                keyword_mentions = self._process_json(row['extra_entities_keywords'])
+                if not keyword_mentions:
+                    keyword_mentions = []
+                for keyword in keyword_list:
+                    keyword_uri = self._uri_generator.keyword_uri(keyword)
+                    if keyword_uri not in self.keyword_uri_set:
+                        for mention in keyword_mentions:
+                            if keyword.lower().strip() in mention['text'].lower().strip():
+                                self.keyword_uri_set.add(keyword_uri)
+        return described_keywords
+
+    def _generate_model_sharded(self, dataset_rows, workers, shard_size, keep_logical_views=True):
+        """
+            Transforms contiguous shards of rows on a pool of worker processes, each of them producing the triples,
+            statistics and logical views of its shard. The only state shared by rows, the keywords that were already
+            described, is computed beforehand by _keyword_description_pass. The shards are merged in order, the graph
+            deduplicating the nodes produced by several shards (organizations, keywords, ratings...), hence the model
+            and statistics are the same as those of a serial run. The hits and misses of the lookup caches and the
+            counts of the term interner of the workers are added to those of the generator, the sizes reported by
+            output_statistics remain those of the caches of the main process.
+        """
+        described_keywords = self._keyword_description_pass(dataset_rows)
+        shards = [list(zip(dataset_rows[start:start + shard_size], described_keywords[start:start + shard_size])) for
+                  start in range(0, len(dataset_rows), shard_size)]
+
+        progress_bar = tqdm(total=len(dataset_rows))
+        with _pool_context().Pool(workers, initializer=_initialize_generator_worker,
+                                  initargs=(self, keep_logical_views)) as pool:
+            for shard, (triples, global_counts, source_counts, logical_views, creative_works, cache_counts,
+                        term_counts) in zip(shards, pool.imap(_transform_shard, shards)):
+                self._graph.addN((subject, predicate, value, self._graph) for subject, predicate, value in triples)
+                self.global_statistics.add_counts(global_counts)
+                for site, counts in source_counts.items():
+                    if site not in self.per_source_statistics:
+                        self.per_source_statistics[site] = ClaimsKGStatistics()
+                    self.per_source_statistics[site].add_counts(counts)
+                self._logical_view_claims.extend(logical_views)
+                self._creative_works_index.extend(creative_works)
+                for (_, cache), (hits, misses) in zip(self._lookup_caches(), cache_counts):
+                    cache.hits += hits
+                    cache.misses += misses
+                self._terms.requests += term_counts[0]
+                self._terms.created += term_counts[1]
+                progress_bar.update(len(shard))
+        progress_bar.close()
 
-            creative_work = self._create_creative_work(row, logical_claim)
-            self._graph.add((claim_review_instance, self._schema_item_reviewed_property_uri, creative_work))
-            logical_claim.creative_work_uri = creative_work
+    def generate_model_stream(self, dataset_rows, output_stream, format="nt", chunk_size=1000,
+                              keep_logical_views=True):
+        """
+            Generates the model chunk by chunk: every chunk_size rows, the triples produced so far are appended to
+            output_stream and dropped from the in-memory graph. Rows are consumed lazily, so that memory usage does not
+            depend on the size of the input. Triples describing shared nodes (organizations, keywords, ratings) may be
+            repeated across chunks, which line-based formats allow.
+        :param dataset_rows: An iterable over the CSV rows
+        :param output_stream: A binary file-like object
+        :param format: A line-based serialization format whose chunks can be concatenated ('nt' or 'nquads')
+        :param chunk_size: The number of rows transformed between two flushes
+        :param keep_logical_views: Whether to keep the logical view of the claims for reconciliation/alignment
+        """
+        self._bind_namespaces()
+        self.add_dcat_metadata()
+        self.flush_graph(output_stream, format)
+
+        progress_bar = tqdm()
+        rows = iter(dataset_rows)
+        chunk = list(itertools.islice(rows, chunk_size))
+        self._open_recognizer_pool()
+        try:
+            while chunk:
+                if self._annotation_workers > 1:
+                    self._prime_keyword_cache(chunk)
+                self._resolve_entities(chunk)
+                for row in chunk:
+                    progress_bar.update(1)
+                    self._process_row(row, keep_logical_view=keep_logical_views)
+                self.flush_graph(output_stream, format)
+                chunk = list(itertools.islice(rows, chunk_size))
+        finally:
+            self._close_recognizer_pool()
 
-            original, normalized = self._create_review_rating(row, logical_claim)
-            self._graph.add((claim_review_instance, rdflib.term.URIRef(self._schema_prefix['reviewRating']), original))
-            self._graph.add(
-                (claim_review_instance, rdflib.term.URIRef(self._schema_prefix['reviewRating']), normalized))
-
-            # For claim review mentions
-            entities_json = row['extra_entities_claimReview_claimReviewed']  # type: str
-            loaded_json = self._process_json(entities_json)
-            if loaded_json:
-                for mention_entry in loaded_json:
-                    mention, dbpedia_entity = self._create_mention(mention_entry, logical_claim, True)
-                    if mention:
-                        self._graph.add((creative_work, self._schema_mentions_property_uri, mention))
-
-            # For Creative Work mentions
-            body_entities_json = row['extra_entities_body']
-            loaded_body_json = self._process_json(body_entities_json)
-            if loaded_body_json:
-                for mention_entry in loaded_body_json:
-                    mention, dbpedia_entity = self._create_mention(mention_entry, logical_claim, False)
-                    if mention:
-                        self._graph.add((claim_review_instance, self._schema_mentions_property_uri, mention))
+        progress_bar.close()
 
+    def generate_model_incremental(self, dataset_rows, state: IncrementalState, output_path, delta_path, format="nt"):
+        """
+            Updates the output of a previous run instead of regenerating it: only the rows that are new or whose
+            content changed since the run that saved state are transformed, the triples of the changed and removed rows
+            are retracted. The full output is rewritten from the previous one and the triples added/removed by the run
+            are written to delta_path in RDF Patch format. Rows are keyed on the URI of their claim review, which does
+            not depend on the order of the rows. The reconciliation statistics of a keyword stay attributed to the row
+            that first described it, they are retracted with that row even if other rows still use the keyword.
+        :param state: The state of the previous run (updated in place), a new IncrementalState on the first run
+        :param format: A line-based serialization format ('nt' or 'nquads')
+        """
+        first_run = len(state.rows) == 0
+        self.keyword_uri_set = state.keyword_uri_set
+        self.global_statistics = state.global_statistics
+        self.per_source_statistics = state.per_source_statistics
+        self._bind_namespaces()
+
+        seen_keys = set()
+        pending_rows = []
+        for row in dataset_rows:
+            key = row_key(str(self._uri_generator.claim_review_uri(row)), seen_keys)
+            digest = row_digest(row)
+            if not state.is_unchanged(key, digest):
+                pending_rows.append((key, digest, row))
+        removed_keys = [key for key in state.row_keys() if key != BASE_ROW_KEY and key not in seen_keys]
+        logger.info("Incremental export: {pending} new or changed rows out of {total}, {removed} removed rows".format(
+            pending=len(pending_rows), total=len(seen_keys), removed=len(removed_keys)))
+
+        # Vocabularies and metadata, regenerated at each run. The modification date is that of the last run changing
+        # rows and the blank nodes of the vocabularies are relabelled, so that the base triples of a run are the same
+        # as those of the previous one unless the vocabularies changed.
+        if first_run or len(pending_rows) > 0 or len(removed_keys) > 0:
+            state.modified = datetime.date.today()
+        self.add_dcat_metadata(modified=state.modified)
+        base_lines = _serialized_lines(_canonical_blank_nodes(self._dataset), format)
+        self._reset_dataset()
+        base_hashes = state.hash_lines(base_lines)
+        if BASE_ROW_KEY in state.rows:
+            state.remove_row(BASE_ROW_KEY)
+        state.add_row(BASE_ROW_KEY, None, base_hashes, [])
+
+        if self._annotation_workers > 1:
+            self._prime_keyword_cache([row for _, _, row in pending_rows])
+        self._resolve_entities([row for _, _, row in pending_rows])
+
+        for key, digest, row in tqdm(pending_rows):
+            if key in state.rows:
+                state.remove_row(key)
+            described_keywords = set(self.keyword_uri_set)
+            source_site = _row_string_value(row, 'claimReview_author_name')
+            logical_claim = self._process_row(row, keep_logical_view=False)
+
+            for keyword_uri in self.keyword_uri_set - described_keywords:
+                state.add_keyword_triples(str(keyword_uri),
+                                          state.hash_lines(self._keyword_description_lines(keyword_uri, format)))
+            row_statistics = ClaimsKGStatistics()
+            row_statistics.compute_stats_for_review(logical_claim)
+            state.add_row(key, digest, state.hash_lines(self._flush_lines(format)),
+                          [str(self._uri_generator.keyword_uri(keyword)) for keyword in _row_keywords(row)],
+                          source_site, row_statistics)
+
+        for key in removed_keys:
+            state.remove_row(key)
+
+        added_lines, removed_hashes = state.commit()
+        write_outputs(output_path, delta_path, added_lines, removed_hashes, previous_output=not first_run)
+
+    def _keyword_description_lines(self, keyword_uri, format):
+        """
+            Serializes the triples describing a keyword produced by the current row: the keyword itself, its DBpedia
+            mentions and the thesaurus concepts their entities are the same as
+        """
+        description_dataset = ConjunctiveGraph()
+        description = Graph(store=description_dataset.store, identifier=self._graph.identifier)
+        for triple in self._graph.triples((keyword_uri, None, None)):
+            description.add(triple)
+            if triple[1] == self._schema_mentions_property_uri:
+                for mention_triple in self._graph.triples((triple[2], None, None)):
+                    description.add(mention_triple)
+                    if mention_triple[1] == self.its_ta_ident_ref_property_uri:
+                        for entity_triple in self._graph.triples((mention_triple[2], OWL.sameAs, None)):
+                            description.add(entity_triple)
+        return _serialized_lines(description_dataset, format)
+
+    def flush_graph(self, output_stream, format="nt"):
+        """
+            Appends the triples of the in-memory dataset to output_stream and replaces it with an empty dataset.
+        """
+        self._dataset.serialize(destination=output_stream, format=format, encoding="utf-8")
+        output_stream.flush()
+        self._reset_dataset()
+
+    def _flush_lines(self, format="nt"):
+        """
+            Returns the lines of the triples of the in-memory dataset and replaces it with an empty dataset.
+        """
+        lines = _serialized_lines(self._dataset, format)
+        self._reset_dataset()
+        return lines
+
+    def _reset_dataset(self):
+        self._dataset = ConjunctiveGraph()
+        self._graph = Graph(store=self._dataset.store, identifier=self._graph.identifier)
+        self._bind_namespaces()
+
+    def _process_row(self, row, keep_logical_view=True):
+        logical_claim = ClaimLogicalView()  # Instance holding claim raw information for mapping generation
+        source_site = _row_string_value(row, 'claimReview_author_name')
+        if source_site not in self.per_source_statistics.keys():
+            self.per_source_statistics[source_site] = ClaimsKGStatistics()
+
+        claim_review_instance = self._create_schema_claim_review(row, logical_claim)
+
+        organization = self._create_organization(row, logical_claim)
+        self._graph.add((claim_review_instance, self._schema_author_property_uri, organization))
+
+        creative_work = self._create_creative_work(row, logical_claim)
+        self._graph.add((claim_review_instance, self._schema_item_reviewed_property_uri, creative_work))
+        logical_claim.creative_work_uri = creative_work
+
+        original, normalized = self._create_review_rating(row, logical_claim)
+        self._graph.add((claim_review_instance, self._schema_review_rating_property_uri, original))
+        self._graph.add((claim_review_instance, self._schema_review_rating_property_uri, normalized))
+
+        # For claim review mentions
+        entities_json = row['extra_entities_claimReview_claimReviewed']  # type: str
+        loaded_json = self._process_json(entities_json)
+        if loaded_json:
+            for mention_entry in loaded_json:
+                mention, dbpedia_entity = self._create_mention(mention_entry, logical_claim, True)
+                if mention:
+                    self._graph.add((creative_work, self._schema_mentions_property_uri, mention))
+
+        # For Creative Work mentions
+        body_entities_json = row['extra_entities_body']
+        loaded_body_json = self._process_json(body_entities_json)
+        if loaded_body_json:
+            for mention_entry in loaded_body_json:
+                mention, dbpedia_entity = self._create_mention(mention_entry, logical_claim, False)
+                if mention:
+                    self._graph.add((claim_review_instance, self._schema_mentions_property_uri, mention))
+
+        self.global_statistics.compute_stats_for_review(logical_claim)
+        self.per_source_statistics[source_site].compute_stats_for_review(logical_claim)
+        if keep_logical_view:
+            logical_claim.compact()
             self._logical_view_claims.append(logical_claim)
-            self.global_statistics.compute_stats_for_review(logical_claim)
-            self.per_source_statistics[source_site].compute_stats_for_review(logical_claim)
-
-        progress_bar.close()
+            self._creative_works_index.append(creative_work)
+        return logical_claim
 
     def _process_json(self, json_string):
-        loaded_json = []
-        if json_string:
-            json_string = re.sub("\",\"\"", ",\"", json_string)
-            json_string = re.sub('"\n\t\"', "", json_string)
-            json_string = re.sub('}\]\[\]', '}]', json_string)
-
-            if json_string == "[[][]]":
-                loaded_json = []
-            else:
-                try:
-                    loaded_json = json.loads(json_string)
-                except ValueError:
-                    loaded_json = None
-        return loaded_json
+        return parse_entity_annotations(json_string)
 
-    def export_rdf(self, format):
+    def _lookup_caches(self) -> List[Tuple[str, LRUCache]]:
+        caches = [("Keyword thesaurus matching cache", self._keyword_annotation_cache)]
+        for name, memo in self.thesoz.concept_recognizer.analyzer.statistics().items():
+            caches.append(("Token analysis {} memo".format(name), memo))
+        return caches
 
+    def output_statistics(self):
         print("\nGlobal dataset statistics")
         self.global_statistics.output_stats()
 
@@ -758,15 +1238,48 @@ class ClaimsKGGenerator:
         for site in self.per_source_statistics.keys():
             print("\n\n{site} statistics...".format(site=site))
             self.per_source_statistics[site].output_stats()
-        graph_serialization = self._graph.serialize(format=format, encoding='utf-8')
+
+        for name, cache in self._lookup_caches():
+            print("\n{name}: {hits} hits, {misses} misses ({rate:.1%} hit rate), {size} cached entries".format(
+                name=name, hits=cache.hits, misses=cache.misses, rate=cache.hit_rate(), size=len(cache)))
+        print("\nTerm interning: {saved} term allocations saved out of {requests} requests, {size} distinct terms".format(
+            saved=self._terms.saved, requests=self._terms.requests, size=len(self._terms)))
+
+    def export_rdf(self, format):
+        self.output_statistics()
+        graph_serialization = self._dataset.serialize(format=format, encoding='utf-8')
         return graph_serialization
 
     def reconcile_claims(self, embeddings, theta, keyword_weight,
-                         link_weight, text_weight, entity_weight, mappings_file_path=None, seed=None, samples=None):
+                         link_weight, text_weight, entity_weight, mappings_file_path=None, seed=None, samples=None,
+                         workers=1, reconciliation_index_path=None, ann_neighbours=None, ann_tables=16, ann_bits=12):
+        """
+        :param reconciliation_index_path: The file of the index of the claims reconciled by previous runs. When given,
+        only the claims that are not in the index are scored, the index is then updated and the mappings of all the
+        runs are added to the model.
+        :param ann_neighbours: When given, only the pairs of each claim with its ann_neighbours nearest claims according
+        to the text embeddings are scored (see FactReconciler)
+        """
+        reconciliation_index = None
+        if reconciliation_index_path is not None:
+            text_dimension = embeddings.dim() if embeddings else None
+            reconciliation_index = ReconciliationIndex.load(reconciliation_index_path, text_dimension)
+            if reconciliation_index is None:
+                reconciliation_index = ReconciliationIndex(text_dimension)
+
         reconciler = FactReconciler(embeddings, self._use_caching, mappings_file_path, self._logical_view_claims, theta,
-                                    keyword_weight, link_weight, text_weight, entity_weight, seed=seed, samples=samples)
+                                    keyword_weight, link_weight, text_weight, entity_weight, seed=seed, samples=samples,
+                                    workers=workers, reconciliation_index=reconciliation_index,
+                                    cache_backend=self._cache_backend, ann_neighbours=ann_neighbours,
+                                    ann_tables=ann_tables, ann_bits=ann_bits)
         mappings = reconciler.generate_mappings()
 
+        if reconciliation_index is not None:
+            reconciliation_index.save(reconciliation_index_path)
+            for score, source_uri, target_uri, _ in reconciliation_index.mappings:
+                self._graph.add((URIRef(source_uri), OWL.sameAs, URIRef(target_uri)))
+            return
+
         for mapping in mappings:
             if mapping is not None and mapping[1] is not None and mapping[1] != (None, None):
                 source = mapping[1][0]
@@ -774,23 +1287,40 @@ class ClaimsKGGenerator:
                 self._graph.add((source.creative_work_uri, OWL.sameAs, target.creative_work_uri))
 
     def materialize_indirect_claim_links(self):
-        mdg = rdflib_to_networkx_multidigraph(self._graph)
+        mdg = rdflib_to_networkx_multidigraph(self._dataset)
 
     def align_duplicated(self):
-        count = len(self._logical_view_claims)
-        total = int(count * (count - 1) / 2)
-        result = [pair for
-                  pair in
-                  tqdm(itertools.combinations(range(count), 2), total=total) if
-                  self.compare_claim_titles(self._logical_view_claims[pair[0]], self._logical_view_claims[
-                      pair[1]])]
-
-        for pair in result:
-            self._graph.add(
-                (self._creative_works_index[pair[0]], self._owl_same_as, self._creative_works_index[pair[1]]))
+        # Claims with the same normalized title are grouped in a single pass, pairs are then only enumerated inside
+        # each group
+        title_groups = dict()  # type: Dict[str, List[int]]
+        for index, claim in enumerate(tqdm(self._logical_view_claims)):
+            normalized_title = self._normalize_label(claim.title)
+            if normalized_title not in title_groups:
+                title_groups[normalized_title] = []
+            title_groups[normalized_title].append(index)
+
+        for group in title_groups.values():
+            for index_a, index_b in itertools.combinations(group, 2):
+                self._add_claim_alignment(index_a, index_b)
+
+    def align_near_duplicates(self, threshold=0.8, num_perm=128):
+        """
+            Aligns the claims whose normalized titles are near-duplicates (same text up to case, punctuation or a few
+            words), found with MinHash LSH over the character shingles of the titles and verified on their Jaccard
+            index. Exactly identical titles are near-duplicates too, claims with an empty title are left out.
+        :param threshold: The minimum Jaccard index of the shingles of two aligned titles
+        :param num_perm: The size of the MinHash signatures
+        """
+        titles = [self._normalize_label(claim.title) for claim in self._logical_view_claims]
+        for index_a, index_b, _ in tqdm(near_duplicate_pairs(titles, threshold=threshold, num_perm=num_perm)):
+            self._add_claim_alignment(index_a, index_b)
+
+    def _add_claim_alignment(self, index_a, index_b):
+        self._graph.add(
+            (self._creative_works_index[index_a], self._owl_same_as, self._creative_works_index[index_b]))
 
-            self.global_statistics.count_mapping()
-            self.per_source_statistics[self._logical_view_claims[pair[0]].claimreview_author].count_mapping()
+        self.global_statistics.count_mapping()
+        self.per_source_statistics[self._logical_view_claims[index_a].claimreview_author].count_mapping()
 
     def compare_claim_titles(self, claim_a, claim_b):
         return self._normalize_label(claim_a.title) == self._normalize_label(claim_b.title)
@@ -0,0 +1,144 @@
+import csv
+from logging import getLogger
+from typing import Dict, Iterator, List, Optional
+
+from pandas.io import json
+from tqdm import tqdm
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+logger = getLogger()
+
+# Columns of the extractor CSV holding the JSON list of the entity annotations (TagMe mentions) of a field
+ENTITY_COLUMNS = ('extra_entities_claimReview_claimReviewed', 'extra_entities_body', 'extra_entities_keywords',
+                  'extra_entities_author')
+
+
+def parse_entity_annotations(json_string) -> Optional[List[Dict]]:
+    """
+        Parses the entity annotations of an extractor CSV field, fixing the quoting artifacts of the extractor
+    :return: The list of mentions, None if the field cannot be parsed. Already parsed lists (columnar input) are
+    returned as is.
+    """
+    if isinstance(json_string, list):
+        return json_string
+    loaded_json = []
+    if json_string:
+        json_string = json_string.replace("\",\"\"", ",\"").replace('"\n\t\"', "").replace('}][]', '}]')
+        if json_string == "[[][]]":
+            loaded_json = []
+        else:
+            try:
+                loaded_json = json.loads(json_string)
+            except ValueError:
+                loaded_json = None
+    return loaded_json
+
+
+def read_csv_rows(input_path) -> Iterator[Dict]:
+    with open(input_path, encoding='utf8') as csv_file:
+        csv_reader = csv.DictReader(csv_file, delimiter=',', quotechar='"', dialect=csv.unix_dialect)
+        for row in csv_reader:
+            yield row
+
+
+def is_columnar_input(input_path) -> bool:
+    return input_path.endswith(".parquet")
+
+
+def _mention_type():
+    return pyarrow.struct([("text", pyarrow.string()), ("begin", pyarrow.int64()), ("end", pyarrow.int64()),
+                           ("entity", pyarrow.string()), ("score", pyarrow.float64()),
+                           ("categories", pyarrow.list_(pyarrow.string()))])
+
+
+def _mention_record(mention: Dict) -> Dict:
+    """
+        Mention with the types of the columnar layout, the scores being compared and rounded as floats anyway
+    """
+    return {"text": mention.get("text"), "begin": mention.get("begin"), "end": mention.get("end"),
+            "entity": mention.get("entity"), "score": float(mention["score"]) if "score" in mention else None,
+            "categories": mention.get("categories", [])}
+
+
+def _require_pyarrow():
+    if pyarrow is None:
+        raise ImportError("The pyarrow package is required to read and write columnar (Parquet) inputs")
+
+
+def convert_csv_to_parquet(input_path, output_path, row_group_size=10000) -> int:
+    """
+        Converts the extractor CSV to a Parquet file once, the entity annotation columns being parsed into lists of
+        mention structs (null when they cannot be parsed) and the other columns kept as strings, so that later exports
+        read typed columns instead of parsing the CSV and the JSON annotations of every row.
+    :param row_group_size: The number of rows converted and written at once
+    :return: The number of rows converted
+    """
+    _require_pyarrow()
+    mention_list_type = pyarrow.list_(_mention_type())
+    writer = None
+    row_count = 0
+    columns = None
+    batch = []
+
+    def write_batch():
+        arrays = []
+        fields = []
+        for column in columns:
+            values = [row[column] for row in batch]
+            if column in ENTITY_COLUMNS:
+                values = [None if mentions is None else [_mention_record(mention) for mention in mentions] for
+                          mentions in (parse_entity_annotations(value) for value in values)]
+                column_type = mention_list_type
+            else:
+                column_type = pyarrow.string()
+            arrays.append(pyarrow.array(values, type=column_type))
+            fields.append(pyarrow.field(column, column_type))
+        return pyarrow.Table.from_arrays(arrays, schema=pyarrow.schema(fields))
+
+    try:
+        for row in tqdm(read_csv_rows(input_path)):
+            if columns is None:
+                columns = list(row.keys())
+            batch.append(row)
+            if len(batch) >= row_group_size:
+                table = write_batch()
+                if writer is None:
+                    writer = pyarrow.parquet.ParquetWriter(output_path, table.schema)
+                writer.write_table(table)
+                row_count += len(batch)
+                batch = []
+        if columns is not None and (len(batch) > 0 or writer is None):
+            table = write_batch()
+            if writer is None:
+                writer = pyarrow.parquet.ParquetWriter(output_path, table.schema)
+            writer.write_table(table)
+            row_count += len(batch)
+    finally:
+        if writer is not None:
+            writer.close()
+    return row_count
+
+
+def read_parquet_rows(input_path, batch_size=10000) -> Iterator[Dict]:
+    """
+        Yields the rows of a file written by convert_csv_to_parquet, in the same order as the rows of the CSV, with the
+        entity annotations already parsed
+    """
+    _require_pyarrow()
+    parquet_file = pyarrow.parquet.ParquetFile(input_path)
+    for record_batch in parquet_file.iter_batches(batch_size=batch_size):
+        yield from record_batch.to_pylist()
+
+
+def read_rows(input_path) -> Iterator[Dict]:
+    """
+        Rows of the extractor CSV or of its columnar (.parquet) conversion
+    """
+    if is_columnar_input(input_path):
+        return read_parquet_rows(input_path)
+    return read_csv_rows(input_path)
@@ -0,0 +1,222 @@
+import hashlib
+import json
+import os
+import pickle
+from array import array
+from datetime import date
+from logging import getLogger
+from typing import Dict, Set, List, Iterable, Tuple
+
+from rdflib import URIRef
+
+from claimskg.generator.statistics import ClaimsKGStatistics, StatKeys
+
+logger = getLogger()
+
+# Version of the layout of the incremental state files, to be increased whenever their content changes
+INCREMENTAL_STATE_VERSION = 2
+
+# Pseudo-row holding the triples that do not come from a CSV row (vocabularies, DCAT metadata), regenerated at each run
+BASE_ROW_KEY = "__base__"
+
+
+def line_hash(line: str) -> int:
+    """
+        64 bits hash of an N-Triples/N-Quads line, the lines of a triple being the same from one run to the other
+    """
+    return int.from_bytes(hashlib.blake2b(line.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def row_digest(row) -> str:
+    return hashlib.sha256(json.dumps(row, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def row_key(claim_review_uri: str, seen_keys: Set[str]) -> str:
+    """
+        Key of a row in the state, the (stable) URI of its claim review, suffixed with the number of previous rows of
+        the run having the same URI
+    """
+    key = claim_review_uri
+    occurrence = 1
+    while key in seen_keys:
+        key = "{uri}#{occurrence}".format(uri=claim_review_uri, occurrence=occurrence)
+        occurrence += 1
+    seen_keys.add(key)
+    return key
+
+
+class _RowEntry:
+    def __init__(self, digest, triple_hashes, keywords, source_site, statistics):
+        self.digest = digest
+        self.triple_hashes = triple_hashes  # type: array
+        self.keywords = keywords  # type: Tuple[str]
+        self.source_site = source_site
+        self.statistics = statistics  # type: Tuple[Tuple[str, float]]
+
+
+class IncrementalState:
+    def __init__(self, model_uri, format):
+        """
+            State of the incremental export persisted between runs: the digest of every processed row, the hashes of
+            the triples each row produced, the number of rows referencing each triple, the keyword URI set of the
+            generator and the statistics accumulators.
+        """
+        self.version = INCREMENTAL_STATE_VERSION
+        self.model_uri = model_uri
+        self.format = format
+        self.rows = dict()  # type: Dict[str, _RowEntry]
+        self.triple_counts = dict()  # type: Dict[int, int]
+        self.keyword_uri_set = set()
+        # Triples describing the keywords of keyword_uri_set, produced by the first row that used them and referenced
+        # by all the rows using them afterwards, and the number of rows using each of them
+        self.keyword_triples = dict()  # type: Dict[str, array]
+        self.keyword_rows = dict()  # type: Dict[str, int]
+        self.global_statistics = ClaimsKGStatistics()
+        self.per_source_statistics = dict()  # type: Dict[str, ClaimsKGStatistics]
+        # Date of the last run that changed rows, the modification date of the dataset
+        self.modified = None  # type: date
+
+        # Changes of the current run: triple count before the run for every touched triple, lines of the new triples
+        self._previous_counts = dict()  # type: Dict[int, int]
+        self._new_lines = dict()  # type: Dict[int, str]
+
+    @staticmethod
+    def load(path, model_uri, format):
+        """
+            Loads the state saved at path, returns None when there is none or when it belongs to another model/format
+        """
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as state_file:
+            state = pickle.load(state_file)
+        if state.version != INCREMENTAL_STATE_VERSION or state.model_uri != model_uri or state.format != format:
+            logger.warning("Ignoring incompatible incremental state {}".format(path))
+            return None
+        state._previous_counts = dict()
+        state._new_lines = dict()
+        return state
+
+    def save(self, path):
+        temporary_path = path + ".tmp"
+        with open(temporary_path, "wb") as state_file:
+            pickle.dump(self, state_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary_path, path)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_previous_counts"]
+        del state["_new_lines"]
+        return state
+
+    def is_unchanged(self, key, digest):
+        return key in self.rows and self.rows[key].digest == digest
+
+    def row_keys(self):
+        return list(self.rows.keys())
+
+    def hash_lines(self, lines: Iterable[str]) -> array:
+        hashes = array("Q")
+        for line in lines:
+            line_key = line_hash(line)
+            hashes.append(line_key)
+            if self.triple_counts.get(line_key, 0) == 0:
+                self._new_lines[line_key] = line
+        return hashes
+
+    def _count(self, hashes, increment):
+        for line_key in hashes:
+            count = self.triple_counts.get(line_key, 0)
+            if line_key not in self._previous_counts:
+                self._previous_counts[line_key] = count
+            self.triple_counts[line_key] = count + increment
+
+    def add_row(self, key, digest, triple_hashes: array, keywords: List[str], source_site=None,
+                statistics: ClaimsKGStatistics = None):
+        """
+            Records the triples of a processed row. The row also references the triples describing the keywords it uses
+            that were produced by another row (see keyword_triples).
+        """
+        keywords = tuple(keyword for keyword in keywords if keyword in self.keyword_triples)
+        for keyword in keywords:
+            triple_hashes.extend(self.keyword_triples[keyword])
+            self.keyword_rows[keyword] = self.keyword_rows.get(keyword, 0) + 1
+        self._count(triple_hashes, 1)
+
+        counts = tuple()
+        if statistics is not None:
+            counts = tuple((stat.name, value) for stat, value in statistics.counts.items() if value != 0)
+        self.rows[key] = _RowEntry(digest, triple_hashes, keywords, source_site, counts)
+
+    def remove_row(self, key):
+        """
+            Retracts the triples and the statistics of a row that was removed or changed
+        """
+        entry = self.rows.pop(key)
+        self._count(entry.triple_hashes, -1)
+        for keyword in entry.keywords:
+            self.keyword_rows[keyword] -= 1
+            if self.keyword_rows[keyword] == 0:
+                # No row uses the keyword anymore, the next row using it describes it again
+                del self.keyword_rows[keyword]
+                del self.keyword_triples[keyword]
+                self.keyword_uri_set.discard(URIRef(keyword))
+
+        if entry.statistics:
+            counts = {StatKeys[name]: value for name, value in entry.statistics}
+            self.global_statistics.add_counts(counts, sign=-1)
+            source_statistics = self.per_source_statistics.get(entry.source_site)
+            if source_statistics is not None:
+                source_statistics.add_counts(counts, sign=-1)
+                if source_statistics.counts[StatKeys.CLAIM_REVIEW] == 0:
+                    del self.per_source_statistics[entry.source_site]
+
+    def add_keyword_triples(self, keyword, triple_hashes: array):
+        self.keyword_triples[keyword] = triple_hashes
+
+    def commit(self):
+        """
+            Ends the run and returns the lines of the triples added by the run and the hashes of the triples it removed
+        """
+        added_lines = []
+        removed_hashes = set()
+        for line_key, previous_count in self._previous_counts.items():
+            count = self.triple_counts[line_key]
+            if count == 0:
+                del self.triple_counts[line_key]
+            if previous_count == 0 and count > 0:
+                added_lines.append(self._new_lines[line_key])
+            elif previous_count > 0 and count == 0:
+                removed_hashes.add(line_key)
+        self._previous_counts = dict()
+        self._new_lines = dict()
+        return added_lines, removed_hashes
+
+
+def write_outputs(output_path, delta_path, added_lines: List[str], removed_hashes: Set[int], previous_output=True):
+    """
+        Rewrites the full output, the lines of the previous output minus the removed triples plus the added ones, and
+        writes the delta of the run in RDF Patch format (D/A rows within a transaction)
+    :param previous_output: Whether the previous output is the base of the new one (False on the first run)
+    """
+    temporary_path = output_path + ".tmp"
+    removed_count = 0
+    with open(temporary_path, "w", encoding="utf-8") as output, open(delta_path, "w", encoding="utf-8") as delta:
+        delta.write("TX .\n")
+        if previous_output and os.path.exists(output_path):
+            with open(output_path, "r", encoding="utf-8") as previous:
+                for line in previous:
+                    line = line.rstrip("\n")
+                    if len(line) == 0:
+                        continue
+                    if line_hash(line) in removed_hashes:
+                        delta.write("D " + line + "\n")
+                        removed_count += 1
+                    else:
+                        output.write(line + "\n")
+        for line in added_lines:
+            output.write(line + "\n")
+            delta.write("A " + line + "\n")
+        delta.write("TC .\n")
+    os.replace(temporary_path, output_path)
+    logger.info("Incremental export: {added} triples added, {removed} triples removed".format(
+        added=len(added_lines), removed=removed_count))
@@ -0,0 +1,63 @@
+from collections import OrderedDict
+from typing import Dict, Tuple
+
+from rdflib import URIRef, Literal
+
+
+class TermInterner:
+    def __init__(self, max_size=None):
+        """
+            Hands out a single URIRef/Literal instance per distinct value, so that the terms repeated across rows
+            (organizations, ratings, keywords, entities, dates, scores...) are built once and shared by all the triples
+            of the store instead of each triple keeping its own copy. Meant for the repeated terms only, unique terms
+            (claim reviews, creative works, review URLs, texts) would only grow the tables.
+        :param max_size: The maximum number of terms kept, the least recently used ones being dropped (they are
+        built again when requested), unbounded if None
+        """
+        self.max_size = max_size
+        self._uris = OrderedDict()  # type: Dict[str, URIRef]
+        self._literals = OrderedDict()  # type: Dict[Tuple, Literal]
+        self.requests = 0
+        self.created = 0
+
+    def uri(self, value: str) -> URIRef:
+        self.requests += 1
+        if type(value) is not str:
+            value = str(value)
+        term = self._uris.get(value)
+        if term is None:
+            term = URIRef(value)
+            self._uris[value] = term
+            self._created()
+        elif self.max_size is not None:
+            self._uris.move_to_end(value)
+        return term
+
+    def literal(self, value, lang=None, datatype=None) -> Literal:
+        self.requests += 1
+        # The type is part of the key, values such as 1, 1.0 and True being equal
+        key = (type(value), value, lang, datatype)
+        term = self._literals.get(key)
+        if term is None:
+            term = Literal(value, lang=lang, datatype=datatype)
+            self._literals[key] = term
+            self._created()
+        elif self.max_size is not None:
+            self._literals.move_to_end(key)
+        return term
+
+    def _created(self):
+        self.created += 1
+        if self.max_size is not None and len(self) > self.max_size:
+            # Evicts the least recently used term of the larger table
+            (self._uris if len(self._uris) >= len(self._literals) else self._literals).popitem(last=False)
+
+    @property
+    def saved(self) -> int:
+        """
+        :return: The number of term instances that were reused instead of being built
+        """
+        return self.requests - self.created
+
+    def __len__(self):
+        return len(self._uris) + len(self._literals)
@@ -1,24 +1,93 @@
+import hashlib
+import os
+import pickle
 from logging import getLogger
 
 from rdflib import Graph, Namespace
 
 from claimskg.reconciler.dictionary import StringDictionaryLoader
+from claimskg.reconciler.recognizer import RecognizerPool
+from claimskg.reconciler.recognizer.automaton_recognizers import StemAutomatonConceptRecognizer
 from claimskg.reconciler.recognizer.intersection_recognizers import IntersStemConceptRecognizer
 
 logger = getLogger()
 
+# Version of the layout of the compiled index cache files, to be increased whenever the content of the index changes
+INDEX_CACHE_VERSION = 2
+
+# Concept recognizers that can be used by the matcher, they all return the same annotations
+concept_recognizers = {
+    "intersection": IntersStemConceptRecognizer,
+    "automaton": StemAutomatonConceptRecognizer
+}
+
+
+def _file_digest(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        block = file.read(block_size)
+        while block:
+            digest.update(block)
+            block = file.read(block_size)
+    return digest.hexdigest()
+
 
 class SkosThesaurusMatcher:
-    def __init__(self, claimskg_graph: Graph, thesaurus_path="claimskg/data/thesoz-komplett.xml", skos_xl_labels=True,
-                 prefix="http://lod.gesis.org/thesoz/"):
-        self.claimskg_graph = claimskg_graph
-        self.graph = Graph()
-        logger.info("Loading thesaurus into ClaimsKG graph... [{}]".format(thesaurus_path))
-        self.graph.load(thesaurus_path)
+    def __init__(self, thesaurus_graph: Graph = None, thesaurus_path="claimskg/data/thesoz-komplett.xml",
+                 skos_xl_labels=True, prefix="http://lod.gesis.org/thesoz/", index_cache_dir=None,
+                 use_index_cache=True, concept_recognizer="intersection",
+                 stop_words_file="claimskg/data/stopwordsen.txt",
+                 termination_terms_file="claimskg/data/termination_termsen.txt"):
+        """
+            Concept matcher over a SKOS thesaurus. The index of the concept recognizer is compiled once and saved to a
+            cache file keyed on the hashes of the thesaurus, stop words and termination terms files, later
+            instantiations load it instead of parsing the thesaurus and indexing its labels again.
+        :param thesaurus_graph: A graph that only holds the triples of the thesaurus, if it was already loaded. It is
+        queried to build the index instead of parsing the thesaurus again.
+        :param index_cache_dir: Directory of the index cache files (default: the directory of the thesaurus)
+        :param use_index_cache: Whether to load/save the compiled index from/to the cache
+        :param concept_recognizer: The name of the concept recognizer in concept_recognizers
+        :param stop_words_file: The words skipped in labels and texts
+        :param termination_terms_file: The words ending a match in texts
+        """
+        self.thesaurus_path = thesaurus_path
+        self.skos_xl_labels = skos_xl_labels
+        self.prefix = prefix
+        self._graph = thesaurus_graph
+        self.stop_words_file = stop_words_file
+        self.termination_terms_file = termination_terms_file
+
+        self.concept_recognizer = concept_recognizers[concept_recognizer](StringDictionaryLoader([]), stop_words_file,
+                                                                          termination_terms_file)
+
+        index_cache_path = None
+        if use_index_cache:
+            index_cache_path = self._index_cache_path(index_cache_dir)
+
+        if index_cache_path is None or not self._load_index_cache(index_cache_path):
+            dictionary_loader = StringDictionaryLoader(self._label_entries())
+            dictionary_loader.load()
+            self.concept_recognizer.dictionary_loader = dictionary_loader
+            self.concept_recognizer.initialize()
+            if index_cache_path is not None:
+                self._save_index_cache(index_cache_path)
+
+        # The thesaurus triples are not needed for matching, the graph is released once the index is built
+        self._graph = None
 
+    @property
+    def graph(self) -> Graph:
+        # The thesaurus graph is only parsed when needed to build the index
+        if self._graph is None:
+            self._graph = Graph()
+            logger.info("Loading thesaurus... [{}]".format(self.thesaurus_path))
+            self._graph.load(self.thesaurus_path)
+        return self._graph
+
+    def _label_entries(self):
         string_entries = []
 
-        if skos_xl_labels:
+        if self.skos_xl_labels:
             query = """SELECT ?x ?lf WHERE {
                 ?x a skos:Concept;
                 skosxl:prefLabel ?l.
@@ -40,7 +109,7 @@ class SkosThesaurusMatcher:
         for result in pref_labels:
             string_entries.append((str(result[0]), str(result[1])))
 
-        if skos_xl_labels:
+        if self.skos_xl_labels:
             query = """SELECT ?x ?lf WHERE {
                 ?x a skos:Concept;
                 skosxl:prefLabel ?l.
@@ -62,19 +131,75 @@ class SkosThesaurusMatcher:
 
         for result in alt_labels:
             string_entries.append((str(result[0]), str(result[1])))
-        dictionary_loader = StringDictionaryLoader(string_entries)
-        dictionary_loader.load()
+        return string_entries
+
+    def _index_cache_key(self):
+        # The stop words are left out of the indexed labels, a cache file is only used with the word lists it was built
+        # with
+        key = "{digest}|{stop_words}|{termination_terms}|{skos_xl}|{recognizer}".format(
+            digest=_file_digest(self.thesaurus_path), stop_words=_file_digest(self.stop_words_file),
+            termination_terms=_file_digest(self.termination_terms_file), skos_xl=self.skos_xl_labels,
+            recognizer=type(self.concept_recognizer).__name__)
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def _index_cache_path(self, index_cache_dir):
+        if index_cache_dir is None:
+            index_cache_dir = os.path.dirname(self.thesaurus_path)
+        file_name = "{name}.{key}.v{version}.index".format(name=os.path.basename(self.thesaurus_path),
+                                                           key=self._index_cache_key()[:16],
+                                                           version=INDEX_CACHE_VERSION)
+        return os.path.join(index_cache_dir, file_name)
 
-        self.concept_recognizer = IntersStemConceptRecognizer(dictionary_loader,
-                                                              "claimskg/data/stopwordsen.txt",
-                                                              "claimskg/data/termination_termsen.txt")
-        self.concept_recognizer.initialize()
+    def _load_index_cache(self, index_cache_path):
+        if not os.path.exists(index_cache_path):
+            return False
+        try:
+            with open(index_cache_path, "rb") as cache_file:
+                cache = pickle.load(cache_file)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError) as error:
+            logger.warning("Ignoring unreadable thesaurus index cache {} ({})".format(index_cache_path, error))
+            return False
+        if cache.get("version") != INDEX_CACHE_VERSION:
+            return False
+        logger.info("Loading compiled thesaurus index... [{}]".format(index_cache_path))
+        self.concept_recognizer.load_index_state(cache["index"])
+        return True
 
-    def get_merged_graph(self):
-        return self.claimskg_graph + self.graph
+    def _save_index_cache(self, index_cache_path):
+        logger.info("Saving compiled thesaurus index... [{}]".format(index_cache_path))
+        temporary_path = index_cache_path + ".tmp"
+        try:
+            with open(temporary_path, "wb") as cache_file:
+                pickle.dump({"version": INDEX_CACHE_VERSION, "index": self.concept_recognizer.index_state()},
+                            cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary_path, index_cache_path)
+        except OSError as error:
+            logger.warning("Could not save the thesaurus index cache {} ({})".format(index_cache_path, error))
 
     def find_keyword_matches(self, keyword):
-        matching_annotations = self.concept_recognizer.recognize(keyword)
+        return self._full_keyword_matches(keyword, self.concept_recognizer.recognize(keyword))
+
+    def find_keyword_matches_many(self, keywords, workers=1, pool: RecognizerPool = None):
+        """
+            Batch version of find_keyword_matches, returning the matches of each keyword in the same order
+        :param workers: The number of processes the keywords are spread over
+        :param pool: A pool holding the concept recognizer of the matcher, used instead of forking workers
+        """
+        keywords = list(keywords)
+        return [self._full_keyword_matches(keyword, matching_annotations) for keyword, matching_annotations in
+                zip(keywords, self.concept_recognizer.recognize_many(keywords, workers=workers, pool=pool))]
+
+    def annotate_texts(self, texts, workers=1, pool: RecognizerPool = None):
+        """
+            Finds the concepts mentioned anywhere in the texts (e.g. claim texts or review headlines)
+        :return: For each text, the set of (concept_id, matched_text, start, end) of its matches
+        """
+        return [set((annotation.concept_id, annotation.matched_text, annotation.start, annotation.end) for annotation
+                    in matching_annotations) for matching_annotations in
+                self.concept_recognizer.recognize_many(texts, workers=workers, pool=pool)]
+
+    @staticmethod
+    def _full_keyword_matches(keyword, matching_annotations):
         return_annotations = set()
         for matching_annotation in matching_annotations:
             delta = matching_annotation.end - matching_annotation.start
@@ -94,38 +94,48 @@ class ClaimsKGStatistics:
         elif "OTHER" in claim.normalized_rating:
             self._increment_statistic(StatKeys.OTHER_CLAIMS, 1)
 
+    def add_counts(self, counts: Dict[StatKeys, float], sign=1):
+        """
+            Adds (sign=1) or subtracts (sign=-1) the counts of a review computed by another instance, used to retract
+            the contribution of a claim review that is removed from the dataset
+        """
+        for key, value in counts.items():
+            self._increment_statistic(key, sign * value)
+
     def count_mapping(self):
         self._increment_statistic(StatKeys.CLAIM_MAPPINGS, 1)
 
     def output_stats(self):
-        self.counts[StatKeys.ENTITIES_PER_REVIEW] /= float(self.counts[StatKeys.CLAIM_REVIEW])
-        self.counts[StatKeys.ENTITIES_PER_CLAIM] /= float(self.counts[StatKeys.CREATIVE_WORK])
-        self.counts[StatKeys.KEYWORDS_PER_REVIEW] /= float(self.counts[StatKeys.CLAIM_REVIEW])
-        self.counts[StatKeys.CITATIONS_PER_CREATIVE_WORK] /= float(self.counts[StatKeys.CREATIVE_WORK])
+        # The ratios are computed on a copy, the counts can still be updated and output again afterwards
+        counts = dict(self.counts)
+        counts[StatKeys.ENTITIES_PER_REVIEW] /= float(counts[StatKeys.CLAIM_REVIEW])
+        counts[StatKeys.ENTITIES_PER_CLAIM] /= float(counts[StatKeys.CREATIVE_WORK])
+        counts[StatKeys.KEYWORDS_PER_REVIEW] /= float(counts[StatKeys.CLAIM_REVIEW])
+        counts[StatKeys.CITATIONS_PER_CREATIVE_WORK] /= float(counts[StatKeys.CREATIVE_WORK])
 
-        self.counts[StatKeys.CLAIMS_WITH_TEXT_PERCENT] /= float(self.counts[StatKeys.CREATIVE_WORK])
-        self.counts[StatKeys.CLAIMS_WITH_TEXT_PERCENT] *= 100.0
+        counts[StatKeys.CLAIMS_WITH_TEXT_PERCENT] /= float(counts[StatKeys.CREATIVE_WORK])
+        counts[StatKeys.CLAIMS_WITH_TEXT_PERCENT] *= 100.0
 
-        self.counts[StatKeys.CLAIMS_WITH_AUTHOR_PERCENT] /= float(self.counts[StatKeys.CREATIVE_WORK])
-        self.counts[StatKeys.CLAIMS_WITH_AUTHOR_PERCENT] *= 100.0
+        counts[StatKeys.CLAIMS_WITH_AUTHOR_PERCENT] /= float(counts[StatKeys.CREATIVE_WORK])
+        counts[StatKeys.CLAIMS_WITH_AUTHOR_PERCENT] *= 100.0
 
-        self.counts[StatKeys.CLAIMS_WITH_DATE_PERCENT] /= float(self.counts[StatKeys.CREATIVE_WORK])
-        self.counts[StatKeys.CLAIMS_WITH_DATE_PERCENT] *= 100.0
+        counts[StatKeys.CLAIMS_WITH_DATE_PERCENT] /= float(counts[StatKeys.CREATIVE_WORK])
+        counts[StatKeys.CLAIMS_WITH_DATE_PERCENT] *= 100.0
 
-        self.counts[StatKeys.CLAIMS_WITH_CITATIONS_PERCENT] /= float(self.counts[StatKeys.CREATIVE_WORK])
-        self.counts[StatKeys.CLAIMS_WITH_CITATIONS_PERCENT] *= 100.0
+        counts[StatKeys.CLAIMS_WITH_CITATIONS_PERCENT] /= float(counts[StatKeys.CREATIVE_WORK])
+        counts[StatKeys.CLAIMS_WITH_CITATIONS_PERCENT] *= 100.0
 
-        self.counts[StatKeys.CLAIMS_WITH_ENTITIES_PERCENT] /= float(self.counts[StatKeys.CREATIVE_WORK])
-        self.counts[StatKeys.CLAIMS_WITH_ENTITIES_PERCENT] *= 100.0
+        counts[StatKeys.CLAIMS_WITH_ENTITIES_PERCENT] /= float(counts[StatKeys.CREATIVE_WORK])
+        counts[StatKeys.CLAIMS_WITH_ENTITIES_PERCENT] *= 100.0
 
-        self.counts[StatKeys.REVIEW_WITH_HEADLINE_PERCENT] /= float(self.counts[StatKeys.CLAIM_REVIEW])
-        self.counts[StatKeys.REVIEW_WITH_HEADLINE_PERCENT] *= 100.0
+        counts[StatKeys.REVIEW_WITH_HEADLINE_PERCENT] /= float(counts[StatKeys.CLAIM_REVIEW])
+        counts[StatKeys.REVIEW_WITH_HEADLINE_PERCENT] *= 100.0
 
-        self.counts[StatKeys.REVIEW_WITH_KEYWORDS_PERCENT] /= float(self.counts[StatKeys.CLAIM_REVIEW])
-        self.counts[StatKeys.REVIEW_WITH_KEYWORDS_PERCENT] *= 100.0
+        counts[StatKeys.REVIEW_WITH_KEYWORDS_PERCENT] /= float(counts[StatKeys.CLAIM_REVIEW])
+        counts[StatKeys.REVIEW_WITH_KEYWORDS_PERCENT] *= 100.0
 
-        self.counts[StatKeys.REVIEW_WITH_ENTITIES] /= float(self.counts[StatKeys.CLAIM_REVIEW])
-        self.counts[StatKeys.REVIEW_WITH_ENTITIES] *= 100.0
+        counts[StatKeys.REVIEW_WITH_ENTITIES] /= float(counts[StatKeys.CLAIM_REVIEW])
+        counts[StatKeys.REVIEW_WITH_ENTITIES] *= 100.0
 
-        for stat in self.counts.keys():
-            print("{name},{value}".format(name=stat.value, value=self.counts[stat]))
+        for stat in counts.keys():
+            print("{name},{value}".format(name=stat.value, value=counts[stat]))
@@ -1,22 +1,23 @@
+import hashlib
 import itertools
-from datetime import timedelta
+import os
+import pickle
+from datetime import timedelta, date
+from logging import getLogger
+from typing import Dict, List, Set, Tuple
 
 import numpy
-import redis
-from nltk.corpus import stopwords
 from tqdm import tqdm
 
 from claimskg import similarity as sim
+from claimskg.reconciler.features import ClaimFeatures
+from claimskg.similarity.sparse import SparseFeatureMatrix
+from claimskg.util import _pool_context
+from claimskg.util.cache import open_cache
+from claimskg.vsm.ann import RandomHyperplaneIndex, nearest_neighbour_pairs
 from claimskg.vsm.embeddings import Embeddings
 
-_stop_words = set(stopwords.words('english'))
-import re
-
-stopword_pattern = re.compile(r'\b(' + r'|'.join(_stop_words) + r')\b\s*')
-
-
-def _merge_and_normalise_strings(strings):
-    return re.sub(r'\[.*?\]|\(.*?\)|\W', ' ', stopword_pattern.sub("", " ".join(strings).strip().lower()))
+logger = getLogger()
 
 
 def _process_pairwise_sample(sample_size, collection, seed, callback, *args):
@@ -50,23 +51,361 @@ def _process_pairwise_sample(sample_size, collection, seed, callback, *args):
     return results
 
 
+class ClaimBlockingIndex:
+    """
+        Candidate generation for the pairwise reconciliation. Claims are bucketed by (creative work author, claim date).
+        The candidates of a claim are the claims of the compatible buckets: same author and same date, no date, or any
+        date when it has none. FactReconciler._pruning_criterion discards every other pair, so that scoring the
+        candidates yields the same mappings as the exhaustive scan.
+    """
+
+    def __init__(self):
+        self._author_dates = dict()  # type: Dict[str, Set[date]]
+        self._blocks = dict()  # type: Dict[Tuple[str, date], List[int]]
+
+    def add(self, index: int, claim):
+        author = claim.creative_work_author
+        block_key = (author, claim.claim_date)
+        if author not in self._author_dates:
+            self._author_dates[author] = set()
+        self._author_dates[author].add(claim.claim_date)
+
+        if block_key not in self._blocks:
+            self._blocks[block_key] = []
+        self._blocks[block_key].append(index)
+
+    def _compatible_blocks(self, claim) -> List[Tuple[str, date]]:
+        author = claim.creative_work_author
+        if claim.claim_date is None:
+            dates = self._author_dates.get(author, set())
+        else:
+            dates = {claim.claim_date, None}
+        return [(author, claim_date) for claim_date in dates]
+
+    def candidates(self, index: int, claim) -> List[int]:
+        candidates = set()
+        for block_key in self._compatible_blocks(claim):
+            candidates.update(self._blocks.get(block_key, []))
+        candidates.discard(index)
+        return sorted(candidates)
+
+
+def _claim_blocking_index(claims) -> ClaimBlockingIndex:
+    blocking_index = ClaimBlockingIndex()
+    for index, claim in enumerate(claims):
+        blocking_index.add(index, claim)
+    return blocking_index
+
+
+def _blocked_candidate_pairs(claims):
+    blocking_index = _claim_blocking_index(claims)
+
+    # Pairs are generated in the same order as itertools.combinations so that the de-duplication of
+    # FactReconciler._is_pair_to_score behaves as in the exhaustive scan
+    for index_a, claim in enumerate(tqdm(claims)):
+        for index_b in blocking_index.candidates(index_a, claim):
+            if index_b > index_a:
+                yield index_a, index_b
+
+
+def _new_claim_pairs(claim_count, first_new_index, blocking_index: ClaimBlockingIndex = None, claims=None):
+    """
+        Pairs involving at least one of the claims from first_new_index on (new x existing and new x new), each pair
+        (index_a, index_b) being generated once, with index_a < index_b
+    """
+    for index_b in tqdm(range(first_new_index, claim_count)):
+        if blocking_index is not None:
+            candidates = blocking_index.candidates(index_b, claims[index_b])
+        else:
+            candidates = range(index_b)
+        for index_a in candidates:
+            if index_a < index_b:
+                yield index_a, index_b
+
+
+def _nearest_neighbour_pairs(text_matrix, neighbours, tables, bits, claims, blocking_index: ClaimBlockingIndex,
+                             first_new_index=0):
+    """
+        Candidate pairs from the approximate nearest neighbours of the claim texts (rows of the all fragments text
+        matrix): each claim from first_new_index on is paired with its neighbours most similar claims among its
+        blocking candidates (the other claims being pruned anyway, see ClaimBlockingIndex), hence at most neighbours
+        pairs per claim instead of a scan of all the pairs. Pairs are generated in the order of _new_claim_pairs
+        (itertools.combinations for first_new_index=0).
+    """
+    logger.info("Indexing the claim text embeddings ({tables} tables of {bits} bits)...".format(tables=tables,
+                                                                                                bits=bits))
+    index = RandomHyperplaneIndex(text_matrix, tables=tables, bits=bits)
+    pairs = nearest_neighbour_pairs(index, neighbours, tqdm(range(first_new_index, len(index))),
+                                    lambda row: blocking_index.candidates(row, claims[row]))
+    if first_new_index > 0:
+        pairs.sort(key=lambda pair: (pair[1], pair[0]))
+    logger.info("{pairs} candidate pairs from the nearest neighbours of {claims} claims".format(
+        pairs=len(pairs), claims=len(index) - first_new_index))
+    return pairs
+
+
+# Version of the layout of the reconciliation index files, to be increased whenever their content changes
+RECONCILIATION_INDEX_VERSION = 4
+
+
+class ReconciliationIndex:
+    def __init__(self, text_dimension=None):
+        """
+            Claims already reconciled, persisted between runs with their features, text embeddings, blocking index,
+            scored pairs and mappings, so that the claims added to the corpus are only scored against them (and against
+            each other) instead of re-scoring every pair.
+        :param text_dimension: The dimension of the text embeddings, None when the claims are reconciled without them
+        """
+        self.version = RECONCILIATION_INDEX_VERSION
+        self.text_dimension = text_dimension
+        self.claims = []
+        self.features = []
+        self.text_matrices = None
+        self.blocking_index = ClaimBlockingIndex()
+        # (score, creative work URI A, creative work URI B, line of the mappings file)
+        self.mappings = []  # type: List[Tuple[float, str, str, str]]
+        # Creative work pairs already scored, see FactReconciler._is_pair_to_score
+        self.processed_pairs = set()  # type: Set[Tuple[str, str]]
+        # (key, digest) of each indexed claim
+        self._claim_entries = []  # type: List[Tuple[str, str]]
+        self._claim_keys = set()  # type: Set[Tuple[str, str]]
+
+    @staticmethod
+    def load(path, text_dimension=None):
+        """
+            Loads the index saved at path, returns None when there is none or when it was built with other embeddings
+        """
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as index_file:
+            index = pickle.load(index_file)
+        if index.version != RECONCILIATION_INDEX_VERSION or index.text_dimension != text_dimension:
+            logger.warning("Ignoring incompatible reconciliation index {}".format(path))
+            return None
+        return index
+
+    def save(self, path):
+        temporary_path = path + ".tmp"
+        with open(temporary_path, "wb") as index_file:
+            pickle.dump(self, index_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary_path, path)
+
+    @staticmethod
+    def _claim_key(claim):
+        # The reviews of the same claim share its creative work, they are told apart by the URL of the review
+        return "{uri} {review_url}".format(uri=claim.creative_work_uri, review_url=claim.claim_review_url)
+
+    @staticmethod
+    def _claim_entry(claim) -> Tuple[str, str]:
+        """
+            Key of a claim and digest of everything its scores and mappings file lines depend on, which changes when
+            its row is edited
+        """
+        entities, categories, keywords, links, text, first_text = _claim_features(claim).__getstate__()
+        content = (sorted(entities), sorted(categories), sorted(keywords), sorted(links), text, first_text,
+                   claim.claim_date, claim.review_date, claim.creative_work_author, claim.claimreview_author,
+                   claim.claim_review_url, claim.text_fragments[0] if claim.text_fragments else None)
+        digest = hashlib.sha256(repr(content).encode("utf-8")).hexdigest()
+        return ReconciliationIndex._claim_key(claim), digest
+
+    def is_indexed(self, claim):
+        return ReconciliationIndex._claim_entry(claim) in self._claim_keys
+
+    def retain(self, claims):
+        """
+            Drops the indexed claims that are not among claims anymore or whose row changed, together with the other
+            indexed claims of their creative works (pairs and mappings are per creative work), their scored pairs and
+            their mappings, so that the claims of these creative works are reconciled again as new claims
+        """
+        current_entries = set(ReconciliationIndex._claim_entry(claim) for claim in claims)
+        stale_uris = set(str(claim.creative_work_uri) for claim, entry in zip(self.claims, self._claim_entries) if
+                         entry not in current_entries)
+        if len(stale_uris) == 0:
+            return
+        retained = [index for index, claim in enumerate(self.claims) if str(claim.creative_work_uri) not in stale_uris]
+        logger.info("Dropping {count} changed or removed claims from the reconciliation index".format(
+            count=len(self.claims) - len(retained)))
+        retained_claims = [self.claims[index] for index in retained]
+        retained_features = [self.features[index] for index in retained]
+        retained_text_matrices = None
+        if self.text_matrices is not None:
+            retained_text_matrices = tuple(matrix[retained] for matrix in self.text_matrices)
+
+        self.claims = []
+        self.features = []
+        self.text_matrices = None
+        self.blocking_index = ClaimBlockingIndex()
+        self._claim_entries = []
+        self._claim_keys = set()
+        self.add(retained_claims, retained_features, retained_text_matrices)
+        self.mappings = [mapping for mapping in self.mappings if
+                         mapping[1] not in stale_uris and mapping[2] not in stale_uris]
+        self.processed_pairs = set(pair for pair in self.processed_pairs if
+                                   str(pair[0]) not in stale_uris and str(pair[1]) not in stale_uris)
+
+    def add(self, claims, features, text_matrices=None):
+        for claim in claims:
+            self.blocking_index.add(len(self.claims), claim)
+            self.claims.append(claim)
+            entry = ReconciliationIndex._claim_entry(claim)
+            self._claim_entries.append(entry)
+            self._claim_keys.add(entry)
+        self.features.extend(features)
+        if text_matrices is not None:
+            if self.text_matrices is None:
+                self.text_matrices = text_matrices
+            else:
+                self.text_matrices = tuple(numpy.vstack((matrix, new_matrix)) for matrix, new_matrix in
+                                           zip(self.text_matrices, text_matrices))
+
+    def add_mappings(self, mappings):
+        for score, pair in mappings:
+            if pair is not None:
+                self.mappings.append((score, str(pair[0].creative_work_uri), str(pair[1].creative_work_uri),
+                                      FactReconciler._generate_claim_mapping_string_description(score, pair[0],
+                                                                                                pair[1])))
+
+
+def _chunks(iterable, chunk_size):
+    iterator = iter(iterable)
+    chunk = list(itertools.islice(iterator, chunk_size))
+    while chunk:
+        yield chunk
+        chunk = list(itertools.islice(iterator, chunk_size))
+
+
+def _claim_features(claim) -> ClaimFeatures:
+    """
+        Compact, picklable view of the parts of a claim used by the similarity, computed once per claim when its row is
+        transformed (see ClaimLogicalView.compact)
+    """
+    if claim.features is None:
+        return ClaimFeatures.from_claim(claim)
+    return claim.features
+
+
+def _claim_feature_matrices(features: List[ClaimFeatures]) -> Tuple[SparseFeatureMatrix, ...]:
+    """
+        The entities, categories, keywords and links of the claims as the rows of sparse matrices, whose similarities
+        are computed for whole chunks of pairs at once (see _score_pairs)
+    """
+    return (SparseFeatureMatrix([feature.entities for feature in features]),
+            SparseFeatureMatrix([feature.categories for feature in features]),
+            SparseFeatureMatrix([feature.keywords for feature in features]),
+            SparseFeatureMatrix([feature.links for feature in features]))
+
+
+def _ratio_similarities(matrix: SparseFeatureMatrix, indices_a, indices_b, empty_similarity=None):
+    """
+        Similarities (claimskg.similarity.jaccard) of the pairs of rows, empty_similarity for the pairs of empty rows
+    """
+    ratios = matrix.ratios(indices_a, indices_b).tolist()
+    if empty_similarity == 0:
+        return ratios
+    sizes = (matrix.sizes[indices_a] + matrix.sizes[indices_b]).tolist()
+    return [ratio if size > 0 else empty_similarity for ratio, size in zip(ratios, sizes)]
+
+
+def _combine_similarities(entity_similarity, category_similarity, keyword_similarity, link_similarity, weights,
+                          text_similarity=None):
+    entity_weight, keyword_weight, link_weight, text_weight = weights
+
+    if not entity_similarity and category_similarity:
+        entity_similarity = category_similarity * 0.3
+    elif entity_similarity and category_similarity:
+        entity_similarity = entity_similarity * 0.7 + category_similarity + 0.3
+
+    score = sim.geometric_mean_aggregation([
+        (entity_similarity, entity_weight),
+        (keyword_similarity, keyword_weight),
+        (link_similarity, link_weight),
+        (text_similarity, text_weight)])
+
+    return score
+
+
+def _claim_text_matrices(embeddings: Embeddings, features):
+    """
+        Embeds the text of every claim once: the rows of the first matrix are the normalised texts of all the fragments
+        of the claims, those of the second the normalised texts of their first fragment (see _claim_features).
+    """
+    all_fragments_matrix = embeddings.sentence_matrix([feature.text for feature in features])
+    first_fragment_matrix = embeddings.sentence_matrix([feature.first_text for feature in features])
+    return all_fragments_matrix, first_fragment_matrix
+
+
+def _score_pairs(pair_chunk, feature_matrices, weights, text_matrices):
+    if len(pair_chunk) == 0:
+        return []
+    indices_a = numpy.fromiter((pair[0] for pair in pair_chunk), dtype=numpy.intp, count=len(pair_chunk))
+    indices_b = numpy.fromiter((pair[1] for pair in pair_chunk), dtype=numpy.intp, count=len(pair_chunk))
+    if text_matrices is not None:
+        text_similarities = Embeddings.row_similarities(text_matrices[0], indices_a, text_matrices[1],
+                                                        indices_b).tolist()
+    else:
+        text_similarities = [None] * len(pair_chunk)
+
+    entity_matrix, category_matrix, keyword_matrix, link_matrix = feature_matrices
+    entity_similarities = _ratio_similarities(entity_matrix, indices_a, indices_b)
+    category_similarities = _ratio_similarities(category_matrix, indices_a, indices_b)
+    keyword_similarities = _ratio_similarities(keyword_matrix, indices_a, indices_b)
+    link_similarities = _ratio_similarities(link_matrix, indices_a, indices_b, empty_similarity=0)
+    return [_combine_similarities(*similarities, weights, text_similarity=text_similarity) for
+            similarities, text_similarity in
+            zip(zip(entity_similarities, category_similarities, keyword_similarities, link_similarities),
+                text_similarities)]
+
+
+# State of the similarity worker processes, set once per process by _initialize_similarity_worker
+_worker_feature_matrices = None
+_worker_weights = None
+_worker_text_matrices = None
+
+
+def _initialize_similarity_worker(feature_matrices, weights, text_matrices):
+    global _worker_feature_matrices, _worker_weights, _worker_text_matrices
+    _worker_feature_matrices = feature_matrices
+    _worker_weights = weights
+    _worker_text_matrices = text_matrices
+
+
+def _score_pair_chunk(pair_chunk):
+    return _score_pairs(pair_chunk, _worker_feature_matrices, _worker_weights, _worker_text_matrices)
+
+
 class FactReconciler:
     def __init__(self, embeddings: Embeddings, caching: bool, mappings_file_path: str, claims, theta: float,
                  keyword_weight,
-                 link_weight, text_weight, entity_weight, seed=None, samples=None):
+                 link_weight, text_weight, entity_weight, seed=None, samples=None, blocking=True, workers=1,
+                 pair_chunk_size=10000, reconciliation_index: ReconciliationIndex = None, cache_backend="redis",
+                 ann_neighbours=None, ann_tables=16, ann_bits=12):
+        """
+        :param caching: Whether to cache the text embeddings of the claims, in the cache given by cache_backend (see
+        claimskg.util.cache.open_cache) unless the embeddings already have a cache
+        :param reconciliation_index: The claims reconciled by previous runs. When given, only the claims that are not
+        in the index are scored, against the indexed claims and against each other, they are then added to the index
+        and the new mappings are appended to the mappings file.
+        :param ann_neighbours: When given, the candidate pairs are the pairs of each claim with its ann_neighbours
+        nearest blocking candidates according to the text embeddings (see claimskg.vsm.ann), instead of all its
+        blocking candidates or the scan of all the pairs, ann_tables and ann_bits being the number of hash tables and
+        of bits per table of the index
+        """
         self._embeddings = embeddings
         self._caching = caching
         if caching:
-            self._redis = redis.StrictRedis()
+            self._cache = open_cache(cache_backend)
+            if embeddings is not None and embeddings.cache is None:
+                embeddings.cache = self._cache
         else:
-            self._redis = None
+            self._cache = None
 
         if mappings_file_path is not None:
             self.output_file = open(mappings_file_path, "w")
         else:
             self.output_file = None
 
-        self._processed_set = set()
+        # Creative work pairs already scored, those of the previous runs with a reconciliation index
+        self._processed_set = set() if reconciliation_index is None else reconciliation_index.processed_pairs
 
         self.claims = claims
 
@@ -78,6 +417,21 @@ class FactReconciler:
         self.claim_count = len(claims)
         self.seed = seed
         self.samples = samples
+        self.blocking = blocking
+        self.workers = workers
+        self.pair_chunk_size = pair_chunk_size
+        self.ann_neighbours = ann_neighbours
+        self.ann_tables = ann_tables
+        self.ann_bits = ann_bits
+        if ann_neighbours is not None and not embeddings:
+            logger.warning("Nearest neighbour candidates require embeddings, falling back to the pairs of the "
+                           + ("blocking" if blocking else "exhaustive scan"))
+            self.ann_neighbours = None
+
+        self._features = None
+        self._feature_matrices = None
+        self._text_matrices = None
+        self._index = reconciliation_index
 
     # if self.output_file is not None:
     # self.output_file.write(
@@ -97,13 +451,28 @@ class FactReconciler:
         # computed = 0
         # index_a = len(self.claims) - 1
 
-        if self.samples is not None:
-            result = _process_pairwise_sample(self.samples, self.claims, self.seed, self._evaluate_mapping)
+        if self._index is not None:
+            result = self._evaluate_new_claims()
+        elif self.samples is not None:
+            self._compute_features()
+            result = _process_pairwise_sample(self.samples, list(range(self.claim_count)), self.seed,
+                                              lambda pair: self._evaluate_pair_chunk([pair])[0])
         else:
-            count = len(self.claims)
-            total = int(count * (count - 1) / 2)
-            result = [self._evaluate_mapping((self.claims[pair[0]], self.claims[pair[1]])) for pair in
-                      tqdm(itertools.combinations(range(len(self.claims)), 2), total=total)]
+            self._compute_features()
+            if self.ann_neighbours is not None:
+                index_pairs = _nearest_neighbour_pairs(self._text_matrices[0], self.ann_neighbours, self.ann_tables,
+                                                       self.ann_bits, self.claims, _claim_blocking_index(self.claims))
+            elif self.blocking:
+                index_pairs = _blocked_candidate_pairs(self.claims)
+            else:
+                count = len(self.claims)
+                total = int(count * (count - 1) / 2)
+                index_pairs = tqdm(itertools.combinations(range(len(self.claims)), 2), total=total)
+
+            if self.workers > 1:
+                result = self._evaluate_mappings_in_parallel(index_pairs)
+            else:
+                result = self._evaluate_mappings(index_pairs)
 
         print(len(result))
         mappings = [x for x in result if x is not None]
@@ -112,17 +481,70 @@ class FactReconciler:
         ]
         print(len(mappings))
 
+        if self._index is not None:
+            self._index.add_mappings(mappings)
+
         if self.output_file is not None:
-            for mapping in mappings:
-                if mapping is not None and mapping[1] is not None and mapping[1] != (None, None):
-                    self.output_file.write(
-                        FactReconciler._generate_claim_mapping_string_description(mapping[0], mapping[1][0],
-                                                                                  mapping[1][1]))
+            if self._index is not None:
+                # The mappings of all the runs, without those of the claims dropped from the index
+                for _, _, _, line in self._index.mappings:
+                    self.output_file.write(line)
+            else:
+                for mapping in mappings:
+                    if mapping is not None and mapping[1] is not None and mapping[1] != (None, None):
+                        self.output_file.write(
+                            FactReconciler._generate_claim_mapping_string_description(mapping[0], mapping[1][0],
+                                                                                      mapping[1][1]))
             self.output_file.flush()
             self.output_file.close()
 
         return mappings
 
+    def _compute_features(self):
+        # The features and the text embeddings of every claim are computed once, the pairs are then scored in batches
+        self._features = [_claim_features(claim) for claim in self.claims]
+        self._feature_matrices = _claim_feature_matrices(self._features)
+        if self._embeddings:
+            logger.info("Embedding claim texts...")
+            self._text_matrices = _claim_text_matrices(self._embeddings, self._features)
+
+    def _evaluate_new_claims(self):
+        """
+            Adds the claims that are not in the reconciliation index to it and evaluates the pairs involving them, the
+            features and text embeddings of the indexed claims are reused as they are
+        """
+        self._index.retain(self.claims)
+        new_claims = [claim for claim in self.claims if not self._index.is_indexed(claim)]
+        logger.info("Reconciling {new} new claims against {indexed} indexed claims...".format(
+            new=len(new_claims), indexed=len(self._index.claims)))
+        if self.samples is not None:
+            logger.warning("Pair sampling is not supported with a reconciliation index, all new pairs are evaluated")
+
+        first_new_index = len(self._index.claims)
+        new_features = [_claim_features(claim) for claim in new_claims]
+        new_text_matrices = None
+        if self._embeddings:
+            logger.info("Embedding claim texts...")
+            new_text_matrices = _claim_text_matrices(self._embeddings, new_features)
+        self._index.add(new_claims, new_features, new_text_matrices)
+
+        self.claims = self._index.claims
+        self.claim_count = len(self.claims)
+        self._features = self._index.features
+        self._feature_matrices = _claim_feature_matrices(self._features)
+        self._text_matrices = self._index.text_matrices
+
+        if self.ann_neighbours is not None:
+            index_pairs = _nearest_neighbour_pairs(self._text_matrices[0], self.ann_neighbours, self.ann_tables,
+                                                   self.ann_bits, self.claims, self._index.blocking_index,
+                                                   first_new_index)
+        else:
+            index_pairs = _new_claim_pairs(self.claim_count, first_new_index,
+                                           self._index.blocking_index if self.blocking else None, self.claims)
+        if self.workers > 1:
+            return self._evaluate_mappings_in_parallel(index_pairs)
+        return self._evaluate_mappings(index_pairs)
+
     @staticmethod
     def _generate_claim_mapping_output_header():
         return "\"Score\", \"CR Author A\",\"CR Author B\", Review URL A, Review URL B,\"Text Fragments A\"," \
@@ -131,18 +553,20 @@ class FactReconciler:
 
     @staticmethod
     def _generate_claim_mapping_string_description(score, claim_a, claim_b):
-        entities_a = claim_a.claim_entities + claim_a.review_entities
-        entities_b = claim_b.claim_entities + claim_b.review_entities
+        features_a = _claim_features(claim_a)
+        features_b = _claim_features(claim_b)
         return "{score},\"{cra_a}\",\"{cra_b}\",\"{ruri_a}\",\"{rurib_b}\",\"{tf_a}\",\"{tf_b}\",\"{ent_a}\",\"{ent_b}\"," \
                "\"{kw_a}\",\"{kw_b}\",\"{cit_a}\",\"{cit_b}\", \"{uri_a}\",\"{uri_b}\",\n" \
             .format(
             # Claim A fields
-            uri_a=claim_a.creative_work_uri, ent_a=",".join(entities_a), kw_a=",".join(claim_a.keywords),
-            cit_a=",".join(claim_a.links), ruri_a=claim_a.claim_review_url, cra_a=claim_a.claimreview_author,
+            uri_a=claim_a.creative_work_uri, ent_a=",".join(features_a.entity_values()),
+            kw_a=",".join(features_a.keyword_values()), cit_a=",".join(features_a.link_values()),
+            ruri_a=claim_a.claim_review_url, cra_a=claim_a.claimreview_author,
             tf_a=claim_a.text_fragments[0].replace("\"", "''"),
             # Claim B fields
-            uri_b=claim_b.creative_work_uri, ent_b=",".join(entities_b), kw_b=",".join(claim_b.keywords),
-            cit_b=",".join(claim_b.links), rurib_b=claim_b.claim_review_url, cra_b=claim_b.claimreview_author,
+            uri_b=claim_b.creative_work_uri, ent_b=",".join(features_b.entity_values()),
+            kw_b=",".join(features_b.keyword_values()), cit_b=",".join(features_b.link_values()),
+            rurib_b=claim_b.claim_review_url, cra_b=claim_b.claimreview_author,
             tf_b=claim_b.text_fragments[0].replace("\"", "''"),
             score=score)
 
@@ -151,10 +575,10 @@ class FactReconciler:
         prune = False
         author_score = FactReconciler.author_match(claim_a, claim_b)
 
-        entities_a = claim_a.claim_entities + claim_a.review_entities
-        entities_b = claim_b.claim_entities + claim_b.review_entities
+        entities_a = _claim_features(claim_a).entities
+        entities_b = _claim_features(claim_b).entities
 
-        entity_score = sim.compute_overlap(entities_a, entities_b)
+        entity_score = sim.sorted_overlap(entities_a, entities_b)
         num_entities_a = len(entities_a)
         num_entities_b = len(entities_b)
 
@@ -181,62 +605,84 @@ class FactReconciler:
         else:
             return 0
 
-    def _evaluate_mapping(self, pair):
-        result = None
-        score = None
-        claim_a = pair[0]
-        claim_b = pair[1]
-        key = claim_a.creative_work_uri + claim_b.creative_work_uri
+    def _is_pair_to_score(self, claim_a, claim_b):
+        key = (claim_a.creative_work_uri, claim_b.creative_work_uri)
 
         if key not in self._processed_set and claim_a != claim_b \
                 and not FactReconciler._pruning_criterion(claim_a, claim_b):
-            score = self._claim_similarity(claim_a, claim_b)
             self._processed_set.add(key)
-
+            return True
+        return False
+
+    def _evaluate_pair_chunk(self, pair_chunk):
+        """
+            Evaluates a chunk of index pairs, the pairs that are pruned or already processed get a (None, None) result.
+            The feature and text similarities of the pairs to score are computed in a single batch.
+        """
+        result = [(None, None)] * len(pair_chunk)
+        positions = [position for position, (index_a, index_b) in enumerate(pair_chunk) if
+                     self._is_pair_to_score(self.claims[index_a], self.claims[index_b])]
+        scores = _score_pairs([pair_chunk[position] for position in positions], self._feature_matrices,
+                              self._weights(), self._text_matrices)
+        for position, score in zip(positions, scores):
+            index_a, index_b = pair_chunk[position]
+            mapping = None
             if score > self.theta:
-                result = pair
-
-        return score, result
+                mapping = (self.claims[index_a], self.claims[index_b])
+            result[position] = (score, mapping)
+        return result
+
+    def _evaluate_mappings(self, index_pairs):
+        result = []
+        for pair_chunk in _chunks(index_pairs, self.pair_chunk_size):
+            result.extend(self._evaluate_pair_chunk(pair_chunk))
+        return result
+
+    def _evaluate_mappings_in_parallel(self, index_pairs):
+        """
+            Scores the pairs on a pool of self.workers processes. Pruning and de-duplication stay in this process, the
+            workers only receive the sparse claim feature matrices and text matrices once and chunks of index pairs
+            afterwards. Chunks are collected in submission order and the pairs that are pruned or already processed
+            get a (None, None) result, hence the result is the same as that of the sequential evaluation.
+        """
+        result = []
+        pairs_to_score = []
+        positions = []
+        for index_a, index_b in index_pairs:
+            if self._is_pair_to_score(self.claims[index_a], self.claims[index_b]):
+                positions.append(len(result))
+                pairs_to_score.append((index_a, index_b))
+            result.append((None, None))
+        pair_chunks = [pairs_to_score[start:start + self.pair_chunk_size] for start in
+                       range(0, len(pairs_to_score), self.pair_chunk_size)]
+
+        scored = 0
+        with _pool_context().Pool(self.workers, initializer=_initialize_similarity_worker,
+                                  initargs=(self._feature_matrices, self._weights(), self._text_matrices)) as pool:
+            progress_bar = tqdm(total=len(pairs_to_score))
+            for pair_chunk, scores in zip(pair_chunks, pool.imap(_score_pair_chunk, pair_chunks)):
+                for (index_a, index_b), score in zip(pair_chunk, scores):
+                    mapping = None
+                    if score > self.theta:
+                        mapping = (self.claims[index_a], self.claims[index_b])
+                    result[positions[scored]] = (score, mapping)
+                    scored += 1
+                progress_bar.update(len(pair_chunk))
+            progress_bar.close()
+        return result
+
+    def _weights(self):
+        return self.entity_weight, self.keyword_weight, self.link_weight, self.text_weight
 
     def _claim_similarity(self, claim_a, claim_b):
-        entities_a = claim_a.claim_entities + claim_a.review_entities
-        entities_b = claim_b.claim_entities + claim_b.review_entities
-        categories_a = claim_a.review_entity_categories + claim_a.claim_entity_categories
-        categories_b = claim_b.review_entity_categories + claim_b.claim_entity_categories
-
-        if len(claim_a.keywords) == 0 and len(claim_b.keywords) == 0:
-            keyword_similarity = None
-        else:
-            keyword_similarity = sim.jaccard(claim_a.keywords, claim_b.keywords)
-
-        link_similarity = sim.jaccard(claim_a.links, claim_b.links)
-
-        if len(entities_a) == 0 and len(entities_b) == 0:
-            entity_similarity = None
-        else:
-            entity_similarity = sim.jaccard(entities_a, entities_b)
-
-        if len(categories_a) == 0 and len(categories_b) == 0:
-            category_similarity = None
-        else:
-            category_similarity = sim.jaccard(categories_a, categories_b)
-
-        if not entity_similarity and category_similarity:
-            entity_similarity = category_similarity * 0.3
-        elif entity_similarity and category_similarity:
-            entity_similarity = entity_similarity * 0.7 + category_similarity + 0.3
-
+        features_a = _claim_features(claim_a)
+        features_b = _claim_features(claim_b)
+        text_similarity = None
         if self._embeddings:
-            text_similarity = self._embeddings.sentence_similarity(
-                _merge_and_normalise_strings(claim_a.text_fragments),
-                _merge_and_normalise_strings(claim_b.text_fragments[0:1]))
-        else:
-            text_similarity = None
-
-        score = sim.geometric_mean_aggregation([
-            (entity_similarity, self.entity_weight),
-            (keyword_similarity, self.keyword_weight),
-            (link_similarity, self.link_weight),
-            (text_similarity, self.text_weight)])
-
-        return score
+            text_similarity = self._embeddings.sentence_similarity(features_a.text, features_b.first_text)
+        entity_matrix, category_matrix, keyword_matrix, link_matrix = _claim_feature_matrices([features_a, features_b])
+        return _combine_similarities(_ratio_similarities(entity_matrix, [0], [1])[0],
+                                     _ratio_similarities(category_matrix, [0], [1])[0],
+                                     _ratio_similarities(keyword_matrix, [0], [1])[0],
+                                     _ratio_similarities(link_matrix, [0], [1], empty_similarity=0)[0],
+                                     self._weights(), text_similarity)
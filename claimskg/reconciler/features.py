@@ -0,0 +1,120 @@
+import re
+from array import array
+from typing import Dict, Iterable, List, Tuple
+
+from nltk.corpus import stopwords
+
+_stop_words = set(stopwords.words('english'))
+
+stopword_pattern = re.compile(r'\b(' + r'|'.join(_stop_words) + r')\b\s*')
+
+
+def _merge_and_normalise_strings(strings):
+    return re.sub(r'\[.*?\]|\(.*?\)|\W', ' ', stopword_pattern.sub("", " ".join(strings).strip().lower()))
+
+
+class FeatureVocabulary:
+    def __init__(self):
+        """
+            Integer codes of the entities, categories, keywords and links of the claims
+        """
+        self._codes = dict()  # type: Dict[str, int]
+        self._values = []  # type: List[str]
+
+    def _codes_of(self, values: Iterable[str]) -> List[int]:
+        codes = []
+        for value in values:
+            code = self._codes.get(value)
+            if code is None:
+                code = len(self._values)
+                self._codes[value] = code
+                self._values.append(value)
+            codes.append(code)
+        return codes
+
+    def encode(self, values: Iterable[str]) -> array:
+        """
+        :return: The sorted int32 array of the codes of values, duplicates included
+        """
+        codes = self._codes_of(values)
+        codes.sort()
+        return array("i", codes)
+
+    def encode_with_order(self, values: Iterable[str]) -> Tuple[array, array]:
+        """
+        :return: The sorted int32 array of the codes of values, duplicates included, and for each value in its original
+        order, the position of its code in the sorted array (see decode_in_order)
+        """
+        codes = self._codes_of(values)
+        order = sorted(range(len(codes)), key=codes.__getitem__)
+        positions = [0] * len(codes)
+        for position, index in enumerate(order):
+            positions[index] = position
+        return array("i", [codes[index] for index in order]), array("H" if len(codes) <= 0xFFFF else "i", positions)
+
+    def decode(self, codes: Iterable[int]) -> List[str]:
+        return [self._values[code] for code in codes]
+
+    def decode_in_order(self, codes: array, positions: array) -> List[str]:
+        return [self._values[codes[position]] for position in positions]
+
+    def __len__(self):
+        return len(self._values)
+
+
+# Vocabulary of the claim features of the process. Codes are only meaningful within a process, features are pickled
+# with their values and encoded again when they are unpickled (reconciliation index, worker processes).
+_vocabulary = FeatureVocabulary()
+
+
+class ClaimFeatures:
+    __slots__ = ("entities", "categories", "keywords", "links", "text", "first_text", "entity_positions",
+                 "keyword_positions", "link_positions")
+
+    def __init__(self, entities: Iterable[str], categories: Iterable[str], keywords: Iterable[str],
+                 links: Iterable[str], text: str, first_text: str):
+        """
+            Parts of a claim used by the reconciliation: the entities, categories, keywords and links as sorted int32
+            arrays of codes (multisets, see claimskg.similarity.sorted_overlap), the normalised text of all its
+            fragments and the normalised text of its first fragment. The original order of the entities, keywords and
+            links, written to the mappings file, is kept as the positions of their codes in the sorted arrays.
+        """
+        self.entities, self.entity_positions = _vocabulary.encode_with_order(entities)
+        self.categories = _vocabulary.encode(categories)
+        self.keywords, self.keyword_positions = _vocabulary.encode_with_order(keywords)
+        self.links, self.link_positions = _vocabulary.encode_with_order(links)
+        self.text = text
+        self.first_text = first_text
+
+    @staticmethod
+    def from_claim(claim):
+        return ClaimFeatures(claim.claim_entities + claim.review_entities,
+                             claim.review_entity_categories + claim.claim_entity_categories,
+                             claim.keywords, claim.links,
+                             _merge_and_normalise_strings(claim.text_fragments),
+                             _merge_and_normalise_strings(claim.text_fragments[0:1]))
+
+    def entity_values(self) -> List[str]:
+        """
+        :return: The entities in their original order
+        """
+        return _vocabulary.decode_in_order(self.entities, self.entity_positions)
+
+    def keyword_values(self) -> List[str]:
+        """
+        :return: The keywords in their original order
+        """
+        return _vocabulary.decode_in_order(self.keywords, self.keyword_positions)
+
+    def link_values(self) -> List[str]:
+        """
+        :return: The links in their original order
+        """
+        return _vocabulary.decode_in_order(self.links, self.link_positions)
+
+    def __getstate__(self):
+        return (self.entity_values(), _vocabulary.decode(self.categories), self.keyword_values(), self.link_values(),
+                self.text, self.first_text)
+
+    def __setstate__(self, state):
+        ClaimFeatures.__init__(self, *state)
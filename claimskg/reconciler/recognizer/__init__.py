@@ -1,11 +1,14 @@
+import math
 from abc import ABC, abstractmethod
-from typing import List, Set, Dict
+from typing import List, Set, Dict, FrozenSet, Iterable, Tuple
 
 # (concept_id, concept, concept_start, concept_end, text[concept_start:concept_end],
 # match_cursor - stop_count)
 import torch
 
 from claimskg.reconciler.dictionary import DictionaryLoader
+from claimskg.util import _pool_context
+from claimskg.util.text_analysis import load_word_set
 
 
 class Concept:
@@ -58,7 +61,68 @@ class Annotation:
         return hash((self.matched_text, self.start, self.end, self.concept_id))
 
 
+# Recognizers of the annotation worker processes, set once per process by _initialize_recognizer_worker
+_worker_recognizers = None  # type: List[ConceptRecognizer]
+
+
+def _initialize_recognizer_worker(recognizers):
+    global _worker_recognizers
+    _worker_recognizers = recognizers
+
+
+def _annotation_fields(annotation: Annotation) -> Tuple:
+    # Annotations are sent back from the workers without their Concept, re-attached from the index of the parent
+    return (annotation.concept_id, annotation.start, annotation.end, annotation.matched_text,
+            annotation.matched_length, annotation.label_key, annotation.confidence_score)
+
+
+def _recognize_chunk(task):
+    recognizer_index, texts = task
+    recognizer = _worker_recognizers[recognizer_index]
+    return [[_annotation_fields(annotation) for annotation in recognizer.recognize(text)] for text in texts]
+
+
+class RecognizerPool:
+    def __init__(self, recognizers: List["ConceptRecognizer"], workers: int):
+        """
+            Pool of worker processes recognizing concepts with any of the recognizers, so that a run forks its workers
+            once instead of once per call of recognize_many. The workers are forked when the pool is created, the
+            indices of the recognizers must be built by then.
+        """
+        self.recognizers = recognizers
+        self.workers = workers
+        self._pool = _pool_context().Pool(workers, initializer=_initialize_recognizer_worker, initargs=(recognizers,))
+
+    def recognize_many(self, recognizer: "ConceptRecognizer", texts: List[str], chunk_size: int = 1000) -> \
+            List[Set[Annotation]]:
+        recognizer_index = next(index for index, pool_recognizer in enumerate(self.recognizers) if
+                                pool_recognizer is recognizer)
+        chunk_size = max(1, min(chunk_size, math.ceil(len(texts) / (self.workers * 4))))
+        tasks = [(recognizer_index, texts[start:start + chunk_size]) for start in range(0, len(texts), chunk_size)]
+        results = []
+        for chunk_fields in self._pool.imap(_recognize_chunk, tasks):
+            for text_fields in chunk_fields:
+                results.append(set(recognizer._annotation_from_fields(fields) for fields in text_fields))
+        return results
+
+    def close(self):
+        self._pool.close()
+        self._pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self._pool.terminate()
+
+
 class ConceptRecognizer(ABC):
+    # Attributes holding the index built by initialize(), see index_state()
+    _index_attributes = ("concept_index",)
+
     def __init__(self, stop_words_file, termination_terms_file, dictionary_loader: DictionaryLoader):
         self.stop_words = self._load_word_list(stop_words_file)
         self.termination_terms = self._load_word_list(termination_terms_file)
@@ -66,15 +130,50 @@ class ConceptRecognizer(ABC):
         self.concept_index = dict()  # type: Dict[str,Concept]
 
     @staticmethod
-    def _load_word_list(file) -> List[str]:
-        with open(file, "r", encoding="utf8") as word_file:
-            words = [line.strip() for line in word_file.readlines()]
-        return words
+    def _load_word_list(file) -> FrozenSet[str]:
+        # Frozen sets, the lists are looked up for every token
+        return load_word_set(file)
 
     @abstractmethod
     def initialize(self):
         pass
 
+    def index_state(self) -> Dict[str, object]:
+        """
+            Returns the picklable index built by initialize(), so that it can be persisted and restored with
+            load_index_state() instead of indexing the dictionary again
+        """
+        return {attribute: getattr(self, attribute) for attribute in self._index_attributes}
+
+    def load_index_state(self, state: Dict[str, object]):
+        for attribute in self._index_attributes:
+            setattr(self, attribute, state[attribute])
+
     @abstractmethod
     def recognize(self, input_text) -> Set[Annotation]:
         pass
+
+    def recognize_many(self, texts: Iterable[str], workers: int = 1, chunk_size: int = 1000,
+                       pool: RecognizerPool = None) -> List[Set[Annotation]]:
+        """
+            Recognizes the concepts of several texts and returns their annotations in the same order.
+        :param workers: The number of processes the texts are spread over. The workers are forked once the index is
+        built and share it with this process.
+        :param chunk_size: The maximum number of texts sent to a worker at once
+        :param pool: A pool holding this recognizer, used instead of forking workers for this call
+        """
+        texts = list(texts)
+        if pool is not None and len(texts) > 1:
+            return pool.recognize_many(self, texts, chunk_size)
+        if workers <= 1 or len(texts) <= 1:
+            return [self.recognize(text) for text in texts]
+
+        with RecognizerPool([self], workers) as call_pool:
+            return call_pool.recognize_many(self, texts, chunk_size)
+
+    def _annotation_from_fields(self, fields) -> Annotation:
+        concept_id, start, end, matched_text, matched_length, label_key, confidence_score = fields
+        annotation = Annotation(concept_id, start, end, matched_text, matched_length, label_key=label_key,
+                                concept=self.concept_index.get(concept_id))
+        annotation.confidence_score = confidence_score
+        return annotation
@@ -0,0 +1,137 @@
+from typing import Set, Dict, List, FrozenSet, Optional
+
+from nltk import StemmerI
+
+from claimskg.reconciler.dictionary import DictionaryLoader
+from claimskg.reconciler.recognizer import Annotation
+from claimskg.reconciler.recognizer.intersection_recognizers import IntersStemConceptRecognizer
+from claimskg.util.text_analysis import TokenAnalyzer
+
+_STOP_WORD = None
+_TERMINATION_TERM = False
+
+_DEAD_STATE = -1
+
+
+class StemAutomatonConceptRecognizer(IntersStemConceptRecognizer):
+    """
+        Concept recognizer returning the same annotations as IntersStemConceptRecognizer, following the transitions of
+        an automaton instead of intersecting sets of label keys for every token.
+
+        The intersection recognizer matches the stems of a label in any order: a match starting at a token is extended
+        as long as the set of stems matched so far is included in the stems of at least one label, and the labels
+        kept are those containing all these stems and having as many tokens as the match. The states of the
+        automaton are thus the sets of stems included in the stems of a label and a transition adds a stem to the set.
+        A label of k distinct stems has 2^k such subsets, hence the states are built lazily: a transition is computed
+        (one intersection of label keys) the first time it is followed and memoized, so that only the stem sets that
+        occur in the texts are ever built, and the accepting keys of a state are grouped by label length on demand.
+
+        Each token is stemmed once per text, a match is then extended with one dict lookup per token. As with the
+        intersection recognizer, a match is started at every token, so a text of n tokens costs O(n * L) lookups,
+        L being the length of the longest match.
+    """
+
+    def __init__(self, dictionary_loader: DictionaryLoader, stop_words_file: str, termination_terms_file: str,
+                 stemmer: StemmerI = None, analyzer: TokenAnalyzer = None):
+        super().__init__(dictionary_loader, stop_words_file, termination_terms_file, stemmer, analyzer)
+        self._reset_automaton()
+
+    def _reset_automaton(self):
+        # State 0 is the empty set of stems, contained in every label
+        self.transitions = [dict()]  # type: List[Dict[str, int]]
+        self.state_keys = [None]  # type: List[Optional[Set[str]]]
+        self.accepting_keys = [dict()]  # type: List[Dict[int, List[str]]]
+        self._state_ids = {frozenset(): 0}  # type: Dict[FrozenSet[str], int]
+        self._state_stems = [frozenset()]  # type: List[FrozenSet[str]]
+
+    def initialize(self):
+        super().initialize()
+        self._reset_automaton()
+
+    def load_index_state(self, state):
+        super().load_index_state(state)
+        self._reset_automaton()
+
+    def _transition(self, state: int, stem: str) -> int:
+        """
+        :return: The state reached from state with stem, _DEAD_STATE when no label contains the stems of state and stem
+        """
+        next_state = self.transitions[state].get(stem)
+        if next_state is not None:
+            return next_state
+
+        stems = self._state_stems[state] | {stem}
+        next_state = self._state_ids.get(stems)
+        if next_state is None:
+            stem_keys = self.unigram_stem_index.get(stem)
+            keys = self.state_keys[state]
+            if stem_keys is not None and keys is not None:
+                # Sets are intersected from the smaller one
+                keys = stem_keys & keys if len(stem_keys) < len(keys) else keys & stem_keys
+            else:
+                keys = stem_keys
+            if not keys:
+                next_state = _DEAD_STATE
+            else:
+                next_state = len(self.transitions)
+                self._state_ids[stems] = next_state
+                self._state_stems.append(stems)
+                self.state_keys.append(keys)
+                self.transitions.append(dict())
+                self.accepting_keys.append(dict())
+        self.transitions[state][stem] = next_state
+        return next_state
+
+    def _accepting_keys(self, state: int, length: int) -> List[str]:
+        accepting = self.accepting_keys[state]
+        keys = accepting.get(length)
+        if keys is None:
+            keys = [key for key in self.state_keys[state] if self.concept_length_index[key] == length]
+            accepting[length] = keys
+        return keys
+
+    def recognize(self, text) -> Set[Annotation]:
+        annotations = set()
+
+        normalized_input_text = self.punctuation_remove.sub(" ", text).replace("-", " ").lower()
+        token_spans = self.analyzer.span_tokenize(normalized_input_text)
+
+        # Each token is classified and stemmed once: termination term, stop word or stem
+        token_stems = []
+        for span in token_spans:
+            token = normalized_input_text[span[0]:span[1]]
+            if token in self.termination_terms:
+                token_stems.append(_TERMINATION_TERM)
+            elif token in self.stop_words:
+                token_stems.append(_STOP_WORD)
+            else:
+                token_stems.append(self.stem(token))
+
+        for start_index, start_stem in enumerate(token_stems):
+            if start_stem is _STOP_WORD or start_stem is _TERMINATION_TERM:
+                continue
+            state = self._transition(0, start_stem)
+            if state == _DEAD_STATE:
+                continue
+
+            concept_start = token_spans[start_index][0]
+            concept_end = token_spans[start_index][1]
+            matched_length = 1
+            for next_index in range(start_index + 1, len(token_stems)):
+                next_stem = token_stems[next_index]
+                if next_stem is _TERMINATION_TERM:
+                    break
+                elif next_stem is _STOP_WORD:
+                    continue
+                next_state = self._transition(state, next_stem)
+                if next_state == _DEAD_STATE:
+                    break
+                state = next_state
+                concept_end = token_spans[next_index][1]
+                matched_length += 1
+
+            for key in self._accepting_keys(state, matched_length):
+                concept_id = key.split(":::")[0]
+                annotations.add(Annotation(concept_id, concept_start, concept_end, text[concept_start:concept_end],
+                                           matched_length, label_key=key, concept=self.concept_index[concept_id]))
+        return annotations
@@ -1,5 +1,5 @@
 import re
-from typing import Set, Tuple, List
+from typing import Set, Tuple, List, Iterable
 
 import regex
 import torch
@@ -13,7 +13,15 @@ from claimskg.reconciler.recognizer import ConceptRecognizer, Concept, Annotatio
 class IntersEmbeddingConceptRecognizer(ConceptRecognizer):
 
     def __init__(self, dictionary_loader: DictionaryLoader, stop_words_file: str, termination_terms_file: str,
-                 tokenizer: AutoTokenizer, model: AutoModel, config: AutoConfig):
+                 tokenizer: AutoTokenizer, model: AutoModel, config: AutoConfig, batch_size: int = 64,
+                 num_threads: int = None, max_length: int = 512):
+        """
+        :param batch_size: The number of labels/texts going through the model at once. Batches group sequences of
+        similar lengths and are only padded to their longest sequence.
+        :param num_threads: The number of threads torch uses while the model runs (default: the torch default), the
+        previous number of threads being restored afterwards
+        :param max_length: The maximum number of tokens of a sequence, longer ones are truncated
+        """
         super().__init__(stop_words_file, termination_terms_file, dictionary_loader)
         self.unigram_index = dict()  # record the stem and give an Id
         self.concept_token_vector_index = dict()
@@ -21,6 +29,9 @@ class IntersEmbeddingConceptRecognizer(ConceptRecognizer):
         self.model = model
         self.tokenizer = tokenizer
         self.config = config
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.num_threads = num_threads
         self.unk_token_id = self.tokenizer.unk_token_id
         self.cls_token_id = self.tokenizer.cls_token_id
         self.pad_token_id = self.tokenizer.pad_token_id
@@ -34,7 +45,8 @@ class IntersEmbeddingConceptRecognizer(ConceptRecognizer):
         self.dictionary_loader.load()
         dictionary = self.dictionary_loader.dictionary  # type : List[DictionaryEntry]
         print("Now indexing the dictionary...")
-        for entry in tqdm(dictionary):
+        concept_labels = []  # type: List[Tuple[str, int, str]]
+        for entry in dictionary:
             # we split concept ids from labels
             # fields = line.split("\t")
             label = entry.label
@@ -44,61 +56,88 @@ class IntersEmbeddingConceptRecognizer(ConceptRecognizer):
             if entry.synonyms:
                 labels.extend(entry.synonyms)
 
-            self._load_concept_labels(concept_id, labels)
+            for label_index, label in enumerate(labels):
+                concept_labels.append((concept_id, label_index, label))
+
+        encoded_labels = self._encode([label for _, _, label in concept_labels], progress=True)
+        for (concept_id, label_index, label), encoded_label in zip(concept_labels, encoded_labels):
+            self._load_concept_label(concept_id, label_index, label, *encoded_label)
 
     def _piece_wise_tokenize_token_list(self, token_list):
+        """
+            The ids of the last word pieces of the terms, which the token ids of the texts are tested against. The
+            terms that are not in the vocabulary of the tokenizer are left out, every unknown word of the texts would
+            otherwise be taken for them.
+        """
         final_token_list = []
 
         for token in token_list:
             sub_tokens = self.tokenizer.tokenize(token)
-            final_token_list.append(sub_tokens[-1])
-
-        return self.tokenizer.convert_tokens_to_ids(final_token_list)
-
-    def _load_concept_labels(self, concept_id, labels):
-        label_index = 0
-        for label in labels:
-            inputs = self.tokenizer.encode_plus(label, add_special_tokens=True, max_length=512, pad_to_max_length=True,
-                                                return_attention_mask=True)
-            tokens = inputs['input_ids']
-            att_masks = inputs['attention_mask']
-            last_token = att_masks.index(0)
-
-            for key in inputs.keys():
-                inputs[key] = torch.tensor(inputs[key], dtype=torch.long)
-                inputs[key] = inputs[key].reshape((1, len(inputs[key])))
-
-            last_outputs, class_output = self.model(**inputs)
-            token_vectors = last_outputs[:, 0:last_token - 1, :]
-
-            concept = Concept(concept_id)
-            concept.add_label(label, label_embedding=class_output)
-            self.concept_index[concept_id] = concept
-            # We tokenize the label
-            concept_token_count = 0
-            # For each token
-            key = str(concept_id) + ":::" + str(label_index)
-            last_token_index = tokens.index(0) - 1
-            tokens = tokens[:last_token_index]
-            token_index = 0
-            for token in tokens:
-                # We skip words that belong to the stop list and words that contain non alphanumerical characters
-                # we create the dictionary entry if it did not exist before
-                if token not in self.unigram_index:
-                    self.unigram_index[token] = set()
-                # if it already existed we add the concept id to the corresponding set
-                self.unigram_index[token].add(key)
-
-                if token not in self.concept_token_vector_index:
-                    self.concept_token_vector_index[token] = dict()
-                    token_vector = token_vectors[:, token_index, :]
-                    new_shape = (token_vector.shape[1])
-                    self.concept_token_vector_index[token][concept_id] = token_vector.reshape(new_shape)
-
-                token_index += 1
-                concept_token_count += 1
-            self.concept_length_index[key] = concept_token_count
-            label_index += 1
+            if len(sub_tokens) > 0:
+                final_token_list.append(sub_tokens[-1])
+
+        return frozenset(self.tokenizer.convert_tokens_to_ids(final_token_list)) - {self.unk_token_id}
+
+    def _encode(self, texts: List[str], progress=False) -> List[Tuple[List[int], torch.Tensor, torch.Tensor]]:
+        """
+            Runs the texts through the model in batches and returns, for each text and in the same order: the token ids
+            of the sequence without the special tokens ([CLS], [SEP]), their contextual vectors and the pooled output
+            of the sequence (shape (1, hidden size)). The texts are sorted by length so that the batches only hold
+            sequences of similar lengths, each batch being padded to its longest sequence.
+        """
+        order = sorted(range(len(texts)), key=lambda index: len(texts[index]))
+        encoded = [None] * len(texts)  # type: List[Tuple[List[int], torch.Tensor, torch.Tensor]]
+        batches = [order[start:start + self.batch_size] for start in range(0, len(order), self.batch_size)]
+        previous_num_threads = torch.get_num_threads()
+        if self.num_threads is not None:
+            torch.set_num_threads(self.num_threads)
+        try:
+            with torch.inference_mode():
+                for batch in tqdm(batches, disable=not progress):
+                    inputs = self.tokenizer([texts[index] for index in batch], add_special_tokens=True, padding=True,
+                                            truncation=True, max_length=self.max_length, return_attention_mask=True,
+                                            return_tensors="pt")
+                    outputs = self.model(**inputs)
+                    last_outputs = outputs[0]
+                    class_outputs = outputs[1]
+                    lengths = inputs['attention_mask'].sum(dim=1).tolist()
+                    for row, index in enumerate(batch):
+                        sequence_end = lengths[row] - 1
+                        encoded[index] = (inputs['input_ids'][row, 1:sequence_end].tolist(),
+                                          last_outputs[row, 1:sequence_end, :],
+                                          class_outputs[row:row + 1, :])
+        finally:
+            torch.set_num_threads(previous_num_threads)
+        return encoded
+
+    def _load_concept_label(self, concept_id, label_index, label, tokens, token_vectors, class_output):
+        if concept_id not in self.concept_index:
+            self.concept_index[concept_id] = Concept(concept_id)
+        self.concept_index[concept_id].add_label(label, label_embedding=class_output)
+
+        # We tokenize the label
+        concept_token_count = 0
+        # For each token
+        key = str(concept_id) + ":::" + str(label_index)
+        token_index = 0
+        for token in tokens:
+            # We skip words that belong to the stop list and words that contain non alphanumerical characters
+            # we create the dictionary entry if it did not exist before
+            if token not in self.unigram_index:
+                self.unigram_index[token] = set()
+            # if it already existed we add the concept id to the corresponding set
+            self.unigram_index[token].add(key)
+
+            if token not in self.concept_token_vector_index:
+                self.concept_token_vector_index[token] = dict()
+            # Every concept having the token gets its vector (that of its first label having it), copied so that the
+            # outputs of the whole batch are not kept alive
+            if concept_id not in self.concept_token_vector_index[token]:
+                self.concept_token_vector_index[token][concept_id] = token_vectors[token_index, :].clone()
+
+            token_index += 1
+            concept_token_count += 1
+        self.concept_length_index[key] = concept_token_count
 
     def _tokens_to_spans(self, tokens, text: str, initial_start_offset=0):
         spans = []  # type: List[Tuple[int, int, str]]
@@ -123,33 +162,42 @@ class IntersEmbeddingConceptRecognizer(ConceptRecognizer):
         return spans
 
     def recognize(self, text) -> Set[Annotation]:
+        return self.recognize_many([text])[0]
+
+    def recognize_many(self, texts: Iterable[str], workers: int = 1, chunk_size: int = 1000,
+                       pool=None) -> List[Set[Annotation]]:
+        """
+            Recognizes the concepts of a list of texts, which go through the model together (see _encode). The
+            confidence score of an annotation is the mean cosine similarity between the contextual vectors of its
+            tokens and the vectors of the same tokens in the labels of the concept, when they are indexed. The texts
+            are not spread over processes (workers, chunk_size and pool are ignored), the model uses the torch threads.
+        """
+        texts = list(texts)
+        encoded_texts = self._encode(texts)
+        return [self._recognize_encoded(text, token_ids, token_vectors) for text, (token_ids, token_vectors, _) in
+                zip(texts, encoded_texts)]
+
+    def _recognize_encoded(self, text, token_ids, token_vectors) -> Set[Annotation]:
         annotations = []
 
-        tokens = self.tokenizer.tokenize(text)
-        token_ids = self.tokenizer.convert_tokens_to_ids(tokens)
-
         len_leading_whitespaces = len(text) - len(text.lstrip())
-        token_spans = self._tokens_to_spans(tokens, text, initial_start_offset=len_leading_whitespaces)
-
-        print(tokens)
-        print(token_ids)
-        print(token_spans)
+        token_spans = self._tokens_to_spans(self.tokenizer.tokenize(text), text,
+                                            initial_start_offset=len_leading_whitespaces)
+        # Truncated sequences are only matched up to the last encoded token
+        token_spans = token_spans[:len(token_ids)]
 
         # we iterate over tokens one by one until we reach the end of the text
         current_token_span_index = 0
         while current_token_span_index < len(token_spans):
-            # we get the current token span
+            # we get the current token span and id
             current_span = token_spans[current_token_span_index]
-
-            # we extract the string of the token from the text
-            token = text[current_span[0]:current_span[1]]
+            token = token_ids[current_token_span_index]
 
             # if the word is a stoplist term or a termination term we skip it
             if token not in self.stop_words and token not in self.termination_terms:
-                # We get the concept ids matching the stem of the current token
-                # Double stemming ensures we come back to the most elementary root, ensure match between nouns and
-                # adjectives with the same root
-                concepts = self.concepts_from_stem(self.stem(token))
+                # We get the concept ids matching the current token
+                concepts = self.concepts_from_token(token)
+                matched_positions = [current_token_span_index]
 
                 # this is the start position of the first token of a matching sequence
                 concept_start = current_span[0]
@@ -162,7 +210,7 @@ class IntersEmbeddingConceptRecognizer(ConceptRecognizer):
 
                     # We get the next token and position span
                     next_span = token_spans[current_token_span_index + match_cursor]
-                    next_token = text[next_span[0]:next_span[1]]
+                    next_token = token_ids[current_token_span_index + match_cursor]
 
                     # if the token is in the termination list the matching process ends here
                     if next_token in self.termination_terms:
@@ -171,41 +219,35 @@ class IntersEmbeddingConceptRecognizer(ConceptRecognizer):
                     # We will need to subtract this from the total number of tokens for the concept
                     elif next_token in self.stop_words:
                         stop_count += 1
-                    # Otherwise we try to find a match for the token stem's in the dictionary index
+                    # Otherwise we try to find a match for the token in the dictionary index
                     else:
-                        # we stem the toke text
-                        next_token_stem = self.stem(next_token)
-
                         # We try to find matching concepts and compute the intersection with previously identified
                         # concepts
-
-                        next_concepts = self.concepts_from_stem(next_token_stem) & concepts
+                        next_concepts = self.concepts_from_token(next_token) & concepts
 
                         # if we find none we stop the matching here
                         if len(next_concepts) == 0:
-
                             break
-
                         else:
                             # if we find a match, then we update the current end position to that of the currently
                             # matching token and update the intersected matched concept buffer
                             concepts = next_concepts
                             concept_end = next_span[1]
+                            matched_positions.append(current_token_span_index + match_cursor)
 
                     # if we arrive here the current token has matched, we keep count of the current match length
                     match_cursor += 1
 
                 # Once we get out of the loop we reconstruct the matches from the concepts remaining in the set
-                # after successive intersections, if concepts is empty there was no match and so
-                # Tokens.conceptsToAnnotationTokens will return an empty list otherwise we get a list of
-                # AnnotationToken objects instances that we add to the list of identified concepts
-
+                # after successive intersections
                 for concept in concepts:
                     key_parts = concept.split(":::")
                     concept_id = key_parts[0]
                     annotation = Annotation(concept_id, concept_start, concept_end, text[concept_start:concept_end],
                                             match_cursor - stop_count, label_key=concept,
                                             concept=self.concept_index[concept_id])
+                    annotation.confidence_score = self._match_confidence(concept_id, token_ids, token_vectors,
+                                                                         matched_positions)
                     annotations.append(annotation)
 
             current_token_span_index += 1
@@ -214,8 +256,19 @@ class IntersEmbeddingConceptRecognizer(ConceptRecognizer):
         return set([annotation for annotation in annotations if
                     annotation.matched_length == self.concept_length_index[annotation.label_key]])
 
-    def concepts_from_stem(self, stem):
-        if stem not in self.unigram_vector_index:
+    def _match_confidence(self, concept_id, token_ids, token_vectors, matched_positions):
+        similarities = []
+        for position in matched_positions:
+            label_token_vector = self.concept_token_vector_index.get(token_ids[position], dict()).get(concept_id)
+            if label_token_vector is not None:
+                similarities.append(
+                    torch.nn.functional.cosine_similarity(token_vectors[position], label_token_vector, dim=0).item())
+        if len(similarities) == 0:
+            return 1
+        return sum(similarities) / len(similarities)
+
+    def concepts_from_token(self, token_id):
+        if token_id not in self.unigram_index:
             return set()
         else:
-            return self.unigram_vector_index[stem]
+            return self.unigram_index[token_id]
@@ -1,19 +1,24 @@
 from typing import Set
 
 import regex
-from metaphone import doublemetaphone
-from nltk import TreebankWordTokenizer, StemmerI, SnowballStemmer
+from nltk import StemmerI
 from nltk.tokenize import word_tokenize
 from tqdm import tqdm
 
 from claimskg.reconciler.dictionary import DictionaryLoader
 from claimskg.reconciler.recognizer import ConceptRecognizer, Annotation, Concept
+from claimskg.util.text_analysis import TokenAnalyzer, shared_analyzer
 
 
 class InterDoubleMetaphoneConceptRecognizer(ConceptRecognizer):
+    _index_attributes = ("concept_index", "unigram_phone_index", "concept_length_index")
 
-    def __init__(self, dictionary_loader: DictionaryLoader, stop_words_file: str, termination_terms_file: str):
+    def __init__(self, dictionary_loader: DictionaryLoader, stop_words_file: str, termination_terms_file: str,
+                 analyzer: TokenAnalyzer = None):
         super().__init__(stop_words_file, termination_terms_file, dictionary_loader)
+        self.analyzer = analyzer
+        if not analyzer:
+            self.analyzer = shared_analyzer()
         self.unigram_phone_index = dict()  # record the phone and give an Id
         self.concept_length_index = dict()  # record the phone and give the length of the expression
 
@@ -49,7 +54,7 @@ class InterDoubleMetaphoneConceptRecognizer(ConceptRecognizer):
             for token in tokens:
                 # We skip words that belong to the stop list and words that contain non alphanumerical characters
                 if token not in self.stop_words:
-                    token_phone = doublemetaphone(token)[0]
+                    token_phone = self.analyzer.phone(token)
 
                     # we create the dictionary entry if it did not exist before
                     if token_phone not in self.unigram_phone_index:
@@ -70,8 +75,7 @@ class InterDoubleMetaphoneConceptRecognizer(ConceptRecognizer):
         normalized_input_text = self.punctuation_remove.sub(" ", text).replace("-", " ").lower()
 
         # We split the text into token spans (begin and end position from the start of the text)
-        spans = TreebankWordTokenizer().span_tokenize(normalized_input_text)
-        token_spans = [i for i in spans]
+        token_spans = self.analyzer.span_tokenize(normalized_input_text)
 
         # we iterate over tokens one by one until we reach the end of the text
         current_token_span_index = 0
@@ -85,7 +89,7 @@ class InterDoubleMetaphoneConceptRecognizer(ConceptRecognizer):
             # if the word is a stoplist term or a termination term we skip it
             if token not in self.stop_words and token not in self.termination_terms:
                 # We get the concept ids matching the phone of the current token
-                token_phone = doublemetaphone(token)[0]
+                token_phone = self.analyzer.phone(token)
                 concepts = self.concepts_from_phone(token_phone)
 
                 # this is the start position of the first token of a matching sequence
@@ -111,7 +115,7 @@ class InterDoubleMetaphoneConceptRecognizer(ConceptRecognizer):
                     # Otherwise we try to find a match for the token phone in the dictionary index
                     else:
                         # we doublemetaphone the token's text
-                        next_token_phone = doublemetaphone(next_token)[0]
+                        next_token_phone = self.analyzer.phone(next_token)
 
                         # We try to find matching concepts and compute the intersection with previously identified
                         # concepts
@@ -142,7 +146,7 @@ class InterDoubleMetaphoneConceptRecognizer(ConceptRecognizer):
                     concept_id = key_parts[0]
                     annotation = Annotation(concept_id, concept_start, concept_end, text[concept_start:concept_end],
                                             match_cursor - stop_count, label_key=concept,
-                                            concept=self.concept_index[concept])
+                                            concept=self.concept_index[concept_id])
                     annotations.append(annotation)
 
             current_token_span_index += 1
@@ -159,15 +163,18 @@ class InterDoubleMetaphoneConceptRecognizer(ConceptRecognizer):
 
 
 class IntersStemConceptRecognizer(ConceptRecognizer):
+    _index_attributes = ("concept_index", "unigram_stem_index", "concept_length_index")
 
     def __init__(self, dictionary_loader: DictionaryLoader, stop_words_file: str, termination_terms_file: str,
-                 stemmer: StemmerI = None):
+                 stemmer: StemmerI = None, analyzer: TokenAnalyzer = None):
         super().__init__(stop_words_file, termination_terms_file, dictionary_loader)
-        self.stemmer = stemmer
+        self.analyzer = analyzer
+        if not analyzer:
+            # The stem memo is only shared between recognizers using the default stemmer
+            self.analyzer = TokenAnalyzer(stemmer) if stemmer else shared_analyzer()
+        self.stemmer = self.analyzer.stemmer
         self.unigram_stem_index = dict()  # record the stem and give an Id
         self.concept_length_index = dict()  # record the stem and give the length of the expression
-        if not stemmer:
-            self.stemmer = SnowballStemmer("english")
 
         self.punctuation_remove = regex.compile('\p{C}', regex.UNICODE)
 
@@ -222,8 +229,7 @@ class IntersStemConceptRecognizer(ConceptRecognizer):
         normalized_input_text = self.punctuation_remove.sub(" ", text).replace("-", " ").lower()
 
         # We split the text into token spans (begin and end position from the start of the text)
-        spans = TreebankWordTokenizer().span_tokenize(normalized_input_text)
-        token_spans = [i for i in spans]
+        token_spans = self.analyzer.span_tokenize(normalized_input_text)
 
         # we iterate over tokens one by one until we reach the end of the text
         current_token_span_index = 0
@@ -311,5 +317,4 @@ class IntersStemConceptRecognizer(ConceptRecognizer):
             return self.unigram_stem_index[stem]
 
     def stem(self, word):
-        # sno =
-        return self.stemmer.stem(self.stemmer.stem(word))
+        return self.analyzer.stem(word)
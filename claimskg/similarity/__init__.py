@@ -7,23 +7,47 @@ from textacy.similarity import levenshtein
 
 tokenizer = TreebankWordTokenizer()
 
-_stop_words = stopwords.words('english')
+_stop_words = frozenset(stopwords.words('english'))
 
 
 def compute_overlap(collection_a: List[str], collection_b: List[str], soft=False):
     overlap_count = 0
-    index_a = 0
-    while index_a < len(collection_a):
-        item_a = collection_a[index_a]
-        index_b = 0
-        while index_b < len(collection_b):
-            item_b = collection_b[index_b]
-            if item_a == item_b and not soft:
+    for item_a in collection_a:
+        for item_b in collection_b:
+            if item_a == item_b:
                 overlap_count += 1
-            else:
+            elif soft:
                 overlap_count += levenshtein(item_a, item_b)
+    return overlap_count
+
+
+def sorted_overlap(codes_a, codes_b):
+    """
+        Same count as compute_overlap (number of equal pairs, duplicates included) for sorted sequences of codes, in a
+        single merge pass
+    """
+    overlap_count = 0
+    index_a = 0
+    index_b = 0
+    length_a = len(codes_a)
+    length_b = len(codes_b)
+    while index_a < length_a and index_b < length_b:
+        code_a = codes_a[index_a]
+        code_b = codes_b[index_b]
+        if code_a < code_b:
+            index_a += 1
+        elif code_a > code_b:
             index_b += 1
-        index_a += 1
+        else:
+            end_a = index_a + 1
+            while end_a < length_a and codes_a[end_a] == code_a:
+                end_a += 1
+            end_b = index_b + 1
+            while end_b < length_b and codes_b[end_b] == code_a:
+                end_b += 1
+            overlap_count += (end_a - index_a) * (end_b - index_b)
+            index_a = end_a
+            index_b = end_b
     return overlap_count
 
 
@@ -0,0 +1,123 @@
+import re
+import zlib
+from typing import Iterable, List, Optional, Set, Tuple
+
+import numpy
+
+# Prime just above 2^32, the hashes of the shingles being 32 bits
+_mersenne_prime = numpy.uint64(4294967311)
+_max_hash = numpy.uint64(0xFFFFFFFF)
+
+_non_word_pattern = re.compile(r'[\W_]+')
+
+
+def text_shingles(text: str, size=4) -> Set[int]:
+    """
+        32 bits hashes of the character shingles of text once lowercased and stripped of punctuation, so that texts
+        differing in case or punctuation have the same shingles. A text shorter than size is a single shingle.
+    """
+    normalized_text = _non_word_pattern.sub(" ", text.lower()).strip()
+    if len(normalized_text) == 0:
+        return set()
+    if len(normalized_text) <= size:
+        return {zlib.crc32(normalized_text.encode("utf-8"))}
+    return {zlib.crc32(normalized_text[start:start + size].encode("utf-8")) for start in
+            range(len(normalized_text) - size + 1)}
+
+
+def jaccard_index(set_a: Set, set_b: Set) -> float:
+    if len(set_a) == 0 and len(set_b) == 0:
+        return 0.0
+    intersection = len(set_a & set_b)
+    return intersection / (len(set_a) + len(set_b) - intersection)
+
+
+def lsh_bands(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """
+        Number of bands and of rows per band of the LSH such that two sets are likely candidates well below threshold
+        (the threshold of the S-curve, (1 / bands) ^ (1 / rows), is the largest one under threshold - 0.1), the
+        candidates being verified afterwards
+    :return: (bands, rows)
+    """
+    target = max(threshold - 0.1, 0.0)
+    best = (num_perm, 1)
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        if (1.0 / bands) ** (1.0 / rows) <= target:
+            best = (bands, rows)
+    return best
+
+
+class MinHashLSH:
+    def __init__(self, num_perm=128, threshold=0.8, bands: Optional[int] = None, seed=1):
+        """
+            MinHash signatures of sets of 32 bits hashes and LSH banding of the signatures: the sets whose signatures
+            are equal on all the rows of a band are candidates, the probability of two sets being candidates growing
+            with their Jaccard index
+        :param bands: The number of bands, computed from threshold (see lsh_bands) if None
+        """
+        self.num_perm = num_perm
+        if bands is None:
+            self.bands, self.rows = lsh_bands(num_perm, threshold)
+        else:
+            self.bands, self.rows = bands, num_perm // bands
+        random = numpy.random.RandomState(seed)
+        # Universal hash functions (a * x + b) mod p, a * x + b fitting in 64 bits for 32 bits a, b and x
+        self._a = random.randint(1, 1 << 32, size=num_perm, dtype=numpy.uint64)
+        self._b = random.randint(0, 1 << 32, size=num_perm, dtype=numpy.uint64)
+
+    def signature(self, hashes: Set[int]) -> numpy.ndarray:
+        """
+        :return: The MinHash signature of the set (num_perm uint32 values), all ones for the empty set
+        """
+        if len(hashes) == 0:
+            return numpy.full(self.num_perm, _max_hash, dtype=numpy.uint32)
+        values = numpy.fromiter(hashes, dtype=numpy.uint64, count=len(hashes))
+        permuted = (numpy.outer(self._a, values) + self._b[:, None]) % _mersenne_prime
+        return (permuted.min(axis=1) & _max_hash).astype(numpy.uint32)
+
+    def candidate_pairs(self, signatures: numpy.ndarray, skip: Iterable[int] = ()) -> Set[Tuple[int, int]]:
+        """
+            Pairs (index_a, index_b), index_a < index_b, of the rows of signatures that fall in the same bucket of at
+            least one band, the rows of skip being left out
+        """
+        skipped = set(skip)
+        candidates = set()
+        for band in range(self.bands):
+            buckets = dict()
+            band_signatures = numpy.ascontiguousarray(signatures[:, band * self.rows:(band + 1) * self.rows])
+            for index in range(len(signatures)):
+                if index in skipped:
+                    continue
+                key = band_signatures[index].tobytes()
+                if key in buckets:
+                    bucket = buckets[key]
+                    candidates.update((other, index) for other in bucket)
+                    bucket.append(index)
+                else:
+                    buckets[key] = [index]
+        return candidates
+
+
+def near_duplicate_pairs(texts: List[str], threshold=0.8, num_perm=128, shingle_size=4, bands=None,
+                         seed=1) -> List[Tuple[int, int, float]]:
+    """
+        Pairs of near-duplicate texts in time linear in the number of texts (besides the pairs of the buckets): the
+        candidates of the MinHash LSH are verified on the exact Jaccard index of their shingles. Empty texts are left
+        out.
+    :return: The (index_a, index_b, jaccard) of the pairs whose Jaccard index is at least threshold, index_a < index_b,
+    in order
+    """
+    lsh = MinHashLSH(num_perm=num_perm, threshold=threshold, bands=bands, seed=seed)
+    shingle_sets = [text_shingles(text, shingle_size) for text in texts]
+    signatures = numpy.empty((len(texts), num_perm), dtype=numpy.uint32)
+    for index, shingles in enumerate(shingle_sets):
+        signatures[index] = lsh.signature(shingles)
+    empty_texts = (index for index, shingles in enumerate(shingle_sets) if len(shingles) == 0)
+
+    pairs = []
+    for index_a, index_b in sorted(lsh.candidate_pairs(signatures, skip=empty_texts)):
+        similarity = jaccard_index(shingle_sets[index_a], shingle_sets[index_b])
+        if similarity >= threshold:
+            pairs.append((index_a, index_b, similarity))
+    return pairs
@@ -0,0 +1,135 @@
+import itertools
+from typing import Callable, Dict, List, Sequence
+
+import numpy
+from scipy import sparse
+
+from claimskg.similarity import levenshtein
+
+
+def _safe_divide(numerators, denominators) -> numpy.ndarray:
+    numerators = numpy.asarray(numerators, dtype=numpy.float64)
+    return numpy.divide(numerators, denominators, out=numpy.zeros(len(numerators)), where=denominators != 0)
+
+
+def _row_sums(matrix) -> numpy.ndarray:
+    return numpy.asarray(matrix.sum(axis=1), dtype=numpy.float64).ravel()
+
+
+class SoftMatchIndex:
+    def __init__(self, values: Sequence[str], threshold=0.8, similarity: Callable[[str, str], float] = levenshtein,
+                 ngram_size=3):
+        """
+            Similarity matrix of a vocabulary for soft matching (the code of a value being its position in values): 1 on
+            the diagonal and similarity(a, b) for the pairs of distinct values whose similarity is at least threshold.
+            Only the pairs of values sharing a character n-gram are compared, instead of every pair of the vocabulary,
+            hence the pairs below the threshold count for 0 instead of their similarity as in
+            compute_overlap(soft=True).
+        :param ngram_size: The size of the character n-grams of the candidate pairs
+        """
+        self.threshold = threshold
+        postings = dict()  # type: Dict[str, List[int]]
+        for code, value in enumerate(values):
+            padded_value = " " + value.lower() + " "
+            for start in range(max(1, len(padded_value) - ngram_size + 1)):
+                gram = padded_value[start:start + ngram_size]
+                if gram not in postings:
+                    postings[gram] = []
+                if len(postings[gram]) == 0 or postings[gram][-1] != code:
+                    postings[gram].append(code)
+
+        candidate_pairs = set()
+        for codes in postings.values():
+            candidate_pairs.update(itertools.combinations(codes, 2))
+
+        rows = list(range(len(values)))
+        columns = list(range(len(values)))
+        data = [1.0] * len(values)
+        for code_a, code_b in candidate_pairs:
+            if values[code_a] == values[code_b]:
+                continue
+            value_similarity = similarity(values[code_a], values[code_b])
+            if value_similarity >= threshold:
+                rows.extend((code_a, code_b))
+                columns.extend((code_b, code_a))
+                data.extend((value_similarity, value_similarity))
+        self.matrix = sparse.csr_matrix((data, (rows, columns)), shape=(len(values), len(values)))
+        self.pair_count = (len(data) - len(values)) // 2
+
+
+class SparseFeatureMatrix:
+    def __init__(self, code_arrays: Sequence[Sequence[int]], dimension: int = None):
+        """
+            Multisets of integer codes (e.g. the entities of every claim, see claimskg.reconciler.features) as the rows
+            of a CSR matrix of counts, so that the overlaps of many pairs of rows are computed with sparse products
+        :param dimension: The number of columns, the largest code + 1 by default. Must be the size of the vocabulary
+        of the SoftMatchIndex used with the matrix.
+        """
+        self.sizes = numpy.fromiter((len(codes) for codes in code_arrays), dtype=numpy.int64,
+                                    count=len(code_arrays))
+        indptr = numpy.zeros(len(code_arrays) + 1, dtype=numpy.int64)
+        numpy.cumsum(self.sizes, out=indptr[1:])
+        indices = numpy.fromiter(itertools.chain.from_iterable(code_arrays), dtype=numpy.int32,
+                                 count=int(indptr[-1]))
+        if dimension is None:
+            dimension = int(indices.max()) + 1 if len(indices) > 0 else 0
+        self.counts = sparse.csr_matrix((numpy.ones(len(indices)), indices, indptr),
+                                        shape=(len(code_arrays), dimension))
+        self.counts.sum_duplicates()
+        self.set_sizes = numpy.diff(self.counts.indptr)
+        self._binary = None
+
+    def __len__(self):
+        return self.counts.shape[0]
+
+    def _binary_matrix(self):
+        if self._binary is None:
+            self._binary = self.counts.copy()
+            self._binary.data[:] = 1
+        return self._binary
+
+    def overlaps(self, rows_a, rows_b, soft_index: SoftMatchIndex = None) -> numpy.ndarray:
+        """
+            Overlap of each pair of rows (rows_a[k], rows_b[k]): the number of pairs of equal elements, duplicates
+            included, as claimskg.similarity.compute_overlap. With a soft_index, the pairs of distinct elements count for
+            their similarity in the index.
+        """
+        left = self.counts[rows_a]
+        if soft_index is not None:
+            left = left @ soft_index.matrix
+        return _row_sums(left.multiply(self.counts[rows_b]))
+
+    def ratios(self, rows_a, rows_b, soft_index: SoftMatchIndex = None) -> numpy.ndarray:
+        """
+            Overlap of each pair of rows divided by the sum of their sizes, as claimskg.similarity.jaccard (0 when both
+            are empty)
+        """
+        return _safe_divide(self.overlaps(rows_a, rows_b, soft_index), self.sizes[rows_a] + self.sizes[rows_b])
+
+    def jaccard(self, rows_a, rows_b) -> numpy.ndarray:
+        """
+            Jaccard index of the sets of each pair of rows, |A & B| / |A | B| (0 when both are empty)
+        """
+        binary = self._binary_matrix()
+        intersections = _row_sums(binary[rows_a].multiply(binary[rows_b]))
+        return _safe_divide(intersections, self.set_sizes[rows_a] + self.set_sizes[rows_b] - intersections)
+
+    def block_overlaps(self, rows, soft_index: SoftMatchIndex = None) -> sparse.csr_matrix:
+        """
+            Overlaps of all the pairs of a block of rows in a single sparse product, entry (i, j) being the overlap of
+            rows[i] and rows[j]
+        """
+        block = self.counts[rows]
+        if soft_index is not None:
+            return (block @ soft_index.matrix) @ block.T
+        return block @ block.T
+
+    def block_jaccard(self, rows) -> numpy.ndarray:
+        """
+            Jaccard indices of the sets of all the pairs of a block of rows (dense matrix)
+        """
+        block = self._binary_matrix()[rows]
+        intersections = (block @ block.T).toarray()
+        set_sizes = self.set_sizes[rows]
+        unions = set_sizes[:, None] + set_sizes[None, :] - intersections
+        return numpy.divide(intersections, unions, out=numpy.zeros(intersections.shape), where=unions != 0)
@@ -1,6 +1,16 @@
+import multiprocessing
+from collections import OrderedDict
+
 import requests
 
 
+def _pool_context():
+    # Forked workers inherit the index of the parent (copy-on-write) instead of receiving a pickled copy
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+    return multiprocessing.get_context()
+
+
 class TypedCounter:
     def __init__(self):
         self.counts = dict()
@@ -9,4 +19,45 @@ class TypedCounter:
         if key not in self.counts.keys():
             self.counts[key] = 0
         self.counts[key] += 1
-        return self.counts[key]
\ No newline at end of file
+        return self.counts[key]
+
+
+class LRUCache:
+    def __init__(self, max_size=None):
+        """
+            Memoization cache keeping the max_size most recently used entries and counting hits and misses.
+        :param max_size: The maximum number of entries, unbounded if None
+        """
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, compute):
+        """
+            Returns the value cached for key, calls compute(key) and caches its result on a miss.
+        """
+        if key in self._entries:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key]
+        self.misses += 1
+        value = compute(key)
+        self.put(key, value)
+        return value
+
+    def put(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        if self.max_size is not None and len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups > 0 else 0.0
@@ -0,0 +1,205 @@
+import dbm
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from typing import List, Optional, Iterable, Tuple
+
+try:
+    import lmdb
+except ImportError:
+    lmdb = None
+
+
+class Cache(ABC):
+    """
+        Key-value cache of byte strings (embedding vectors, SPARQL results...). Lookups of many keys go through
+        get_many/set_many, which the backends serve with a single round trip or transaction.
+    """
+
+    @abstractmethod
+    def get_many(self, keys: List[str]) -> List[Optional[bytes]]:
+        """
+        :return: The value of each key, in the same order, None for the keys that are not cached
+        """
+        pass
+
+    @abstractmethod
+    def set_many(self, items: Iterable[Tuple[str, bytes]]):
+        pass
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.get_many([key])[0]
+
+    def set(self, key: str, value: bytes):
+        self.set_many([(key, value)])
+
+    def close(self):
+        pass
+
+
+class RedisCache(Cache):
+    def __init__(self, url=None):
+        """
+        :param url: The URL of the redis server (default: redis://localhost:6379/0)
+        """
+        import redis
+        if url is None:
+            self._redis = redis.StrictRedis()
+        else:
+            self._redis = redis.StrictRedis.from_url(url)
+
+    def get_many(self, keys: List[str]) -> List[Optional[bytes]]:
+        if len(keys) == 0:
+            return []
+        return self._redis.mget(keys)
+
+    def set_many(self, items: Iterable[Tuple[str, bytes]]):
+        pipeline = self._redis.pipeline(transaction=False)
+        for key, value in items:
+            pipeline.set(key, value)
+        pipeline.execute()
+
+    def close(self):
+        self._redis.connection_pool.disconnect()
+
+
+class SqliteCache(Cache):
+    # Maximum number of parameters of a single SELECT ... IN (...) query
+    _max_batch_size = 500
+
+    def __init__(self, path):
+        """
+            Cache stored in a SQLite database file, nothing to run besides the process using it. Each thread gets its
+            own connection, re-opened in processes forked after its creation.
+        """
+        self._path = path
+        self._local = threading.local()
+
+    def _connect(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self._path, timeout=60)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB)")
+            connection.commit()
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def get_many(self, keys: List[str]) -> List[Optional[bytes]]:
+        connection = self._connect()
+        values = dict()
+        for start in range(0, len(keys), self._max_batch_size):
+            batch = keys[start:start + self._max_batch_size]
+            query = "SELECT key, value FROM cache WHERE key IN ({})".format(",".join("?" * len(batch)))
+            values.update(connection.execute(query, batch).fetchall())
+        return [values.get(key) for key in keys]
+
+    def set_many(self, items: Iterable[Tuple[str, bytes]]):
+        connection = self._connect()
+        with connection:
+            connection.executemany("INSERT OR REPLACE INTO cache (key, value) VALUES (?, ?)", items)
+
+    def close(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    def __getstate__(self):
+        return {"_path": self._path}
+
+    def __setstate__(self, state):
+        self._path = state["_path"]
+        self._local = threading.local()
+
+
+class DbmCache(Cache):
+    def __init__(self, path):
+        """
+            Cache stored in a dbm database (the best dbm implementation available, see the dbm module). dbm files do
+            not support concurrent writers, use SqliteCache or LmdbCache when several processes write to the cache.
+        """
+        self._path = path
+        self._database = dbm.open(path, "c")
+        self._lock = threading.Lock()
+
+    def get_many(self, keys: List[str]) -> List[Optional[bytes]]:
+        values = []
+        with self._lock:
+            for key in keys:
+                try:
+                    values.append(self._database[key])
+                except KeyError:
+                    values.append(None)
+        return values
+
+    def set_many(self, items: Iterable[Tuple[str, bytes]]):
+        with self._lock:
+            for key, value in items:
+                self._database[key] = value
+
+    def close(self):
+        with self._lock:
+            self._database.close()
+
+
+class LmdbCache(Cache):
+    def __init__(self, path, map_size=1 << 34):
+        """
+            Cache stored in a LMDB environment (requires the lmdb package). Reads are served from memory-mapped pages
+            and any number of processes can read and write the same environment.
+        :param map_size: The maximum size of the database in bytes
+        """
+        if lmdb is None:
+            raise ImportError("The lmdb package is required by LmdbCache")
+        self._path = path
+        self._map_size = map_size
+        self._environment = None
+        self._pid = None
+
+    def _open(self):
+        if self._environment is None or self._pid != os.getpid():
+            self._environment = lmdb.open(self._path, map_size=self._map_size, subdir=True)
+            self._pid = os.getpid()
+        return self._environment
+
+    def get_many(self, keys: List[str]) -> List[Optional[bytes]]:
+        with self._open().begin() as transaction:
+            return [transaction.get(key.encode("utf-8")) for key in keys]
+
+    def set_many(self, items: Iterable[Tuple[str, bytes]]):
+        with self._open().begin(write=True) as transaction:
+            for key, value in items:
+                transaction.put(key.encode("utf-8"), value)
+
+    def close(self):
+        if self._environment is not None:
+            self._environment.close()
+            self._environment = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_environment"] = None
+        return state
+
+
+def open_cache(specification: str) -> Optional[Cache]:
+    """
+        Opens the cache described by specification: 'redis' or a redis:// URL, 'sqlite:[path]', 'dbm:[path]',
+        'lmdb:[path]', or 'none' (returns None)
+    """
+    if specification is None or specification == "none":
+        return None
+    if specification == "redis":
+        return RedisCache()
+    if specification.startswith("redis://") or specification.startswith("rediss://") or \
+            specification.startswith("unix://"):
+        return RedisCache(specification)
+    backend, separator, path = specification.partition(":")
+    backends = {"sqlite": SqliteCache, "dbm": DbmCache, "lmdb": LmdbCache}
+    if backend not in backends or len(path) == 0:
+        raise ValueError("Unknown cache specification {}".format(specification))
+    return backends[backend](path)
@@ -0,0 +1,121 @@
+import copy
+import time
+from concurrent.futures import ThreadPoolExecutor
+from logging import getLogger
+from typing import Dict, Iterable, List, Optional
+
+from SPARQLWrapper import JSON, POST
+from tqdm import tqdm
+
+from claimskg.util.cache import Cache
+from claimskg.util.sparql.sparql_offset_fetcher import iter_json_bindings
+
+logger = getLogger()
+
+# Characters allowed in IRIs but not in SPARQL IRI references, percent-encoded in the queries
+_iri_escapes = {character: "%{:02X}".format(ord(character)) for character in ' <>"{}|^`\\'}
+
+_cache_key_prefix = "dbpedia-resolution|"
+
+
+def _sparql_iri(iri: str) -> str:
+    return "<" + "".join(_iri_escapes.get(character, character) for character in iri) + ">"
+
+
+class DBpediaEntityResolver:
+    def __init__(self, sparql_wrapper, cache: Cache = None, batch_size=200, workers=4, chunk_size=1 << 16, retries=3,
+                 retry_delay=1.0):
+        """
+            Resolves candidate DBpedia resource IRIs (built from the titles of the TagMe annotations) to the resources
+            that exist on the endpoint, following wikiPageRedirects. Candidates are sent in batches of batch_size in the
+            VALUES clause of a single query, up to workers queries being in flight at any time. Resolutions, including
+            the candidates that do not exist, are kept in the cache, hence a candidate is only queried once.
+        :param cache: The cache of the resolutions, see claimskg.util.cache (nothing is cached if None)
+        :param retries: The number of times a failed query is sent again, after retry_delay seconds, doubled at each
+        retry. The candidates of a query that still fails are left unresolved (and are not cached).
+        """
+        self.sparql_wrapper = sparql_wrapper
+        self.cache = cache
+        self.batch_size = batch_size
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.query_count = 0
+
+    def resolve(self, candidates: Iterable[str]) -> Dict[str, Optional[str]]:
+        """
+        :return: For each distinct candidate, the IRI of the resource it resolves to, None if there is none. The
+        candidates of the batches whose query failed are left out.
+        """
+        candidates = sorted(set(candidates))
+        resolutions = dict()
+        if self.cache is not None and len(candidates) > 0:
+            cached_values = self.cache.get_many([_cache_key_prefix + candidate for candidate in candidates])
+            for candidate, cached_value in zip(candidates, cached_values):
+                if cached_value is not None:
+                    resolutions[candidate] = cached_value.decode("utf-8") or None
+
+        pending_candidates = [candidate for candidate in candidates if candidate not in resolutions]
+        batches = [pending_candidates[start:start + self.batch_size] for start in
+                   range(0, len(pending_candidates), self.batch_size)]
+        if len(batches) > 0:
+            logger.info("Resolving {count} entities against DBpedia in {batches} queries...".format(
+                count=len(pending_candidates), batches=len(batches)))
+            self.query_count += len(batches)
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                for batch_resolutions in tqdm(executor.map(self._resolve_batch_or_skip, batches),
+                                              total=len(batches)):
+                    if batch_resolutions is None:
+                        continue
+                    resolutions.update(batch_resolutions)
+                    if self.cache is not None:
+                        self.cache.set_many([(_cache_key_prefix + candidate, (resolution or "").encode("utf-8")) for
+                                             candidate, resolution in batch_resolutions.items()])
+        return resolutions
+
+    def _batch_query(self, batch: List[str]) -> str:
+        return """SELECT DISTINCT ?candidate ?redirect WHERE {{
+            VALUES ?candidate {{ {candidates} }}
+            FILTER EXISTS {{ ?candidate ?property ?value }}
+            OPTIONAL {{ ?candidate <http://dbpedia.org/ontology/wikiPageRedirects> ?redirect }}
+        }}""".format(candidates=" ".join(_sparql_iri(candidate) for candidate in batch))
+
+    def _resolve_batch_or_skip(self, batch: List[str]) -> Optional[Dict[str, Optional[str]]]:
+        """
+            Resolves a batch, retrying failed queries (timeouts, HTTP errors, truncated responses)
+        :return: The resolutions of the batch, None if its query failed after all the retries
+        """
+        for attempt in range(self.retries + 1):
+            try:
+                return self._resolve_batch(batch)
+            except Exception as error:
+                if attempt == self.retries:
+                    logger.warning("Leaving {count} entities unresolved, resolution query failed: {error}".format(
+                        count=len(batch), error=error))
+                    return None
+                delay = self.retry_delay * (2 ** attempt)
+                logger.info("Resolution query failed ({error}), retrying in {delay}s".format(error=error,
+                                                                                            delay=delay))
+                time.sleep(delay)
+
+    def _resolve_batch(self, batch: List[str]) -> Dict[str, Optional[str]]:
+        # SPARQLWrapper instances hold the query, each batch gets its own copy
+        sparql_wrapper = copy.copy(self.sparql_wrapper)
+        sparql_wrapper.setReturnFormat(JSON)
+        sparql_wrapper.setMethod(POST)
+        sparql_wrapper.setQuery(self._batch_query(batch))
+        response = sparql_wrapper.query().response
+
+        escaped_candidates = {_sparql_iri(candidate)[1:-1]: candidate for candidate in batch}
+        resolutions = {candidate: None for candidate in batch}
+        for binding in iter_json_bindings(iter(lambda: response.read(self.chunk_size), b"")):
+            candidate = binding["candidate"]["value"]
+            candidate = escaped_candidates.get(candidate, candidate)
+            if candidate not in resolutions:
+                continue
+            if "redirect" in binding:
+                resolutions[candidate] = binding["redirect"]["value"]
+            elif resolutions[candidate] is None:
+                resolutions[candidate] = candidate
+        return resolutions
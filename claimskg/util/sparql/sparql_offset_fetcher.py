@@ -1,21 +1,161 @@
+import codecs
+import copy
 import json
+import re
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator, Dict, List, Union
 
-import redis
 from SPARQLWrapper import JSON
 
-r = redis.StrictRedis()
+from claimskg.util.cache import Cache, open_cache
 
+_bindings_start = re.compile(r'"bindings"\s*:\s*\[')
+_whitespace_or_comma = re.compile(r'[\s,]*')
 
-class SparQLOffsetFetcher:
 
-    def __init__(self, sparql_wrapper, page_size, where_body, select_columns, prefixes=""):
+def iter_json_bindings(chunks: Iterable[bytes]) -> Iterator[Dict]:
+    """
+        Decodes the bindings of a SPARQL JSON result one at a time as the chunks of the response arrive, instead of
+        decoding the whole response at once
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    chunks = iter(chunks)
+    buffer = ""
+    # Position of the next binding in buffer, None until the start of the bindings array is found
+    position = None
+    exhausted = False
+
+    while True:
+        if position is None:
+            match = _bindings_start.search(buffer)
+            if match is not None:
+                position = match.end()
+        if position is not None:
+            position = _whitespace_or_comma.match(buffer, position).end()
+            if position < len(buffer):
+                if buffer[position] == "]":
+                    return
+                try:
+                    binding, position = decoder.raw_decode(buffer, position)
+                    yield binding
+                    continue
+                except json.JSONDecodeError:
+                    # The binding is not complete yet
+                    if exhausted:
+                        raise
+        if exhausted:
+            if position is None:
+                # No bindings (e.g. an empty response)
+                return
+            raise ValueError("Truncated SPARQL JSON result")
+
+        chunk = next(chunks, None)
+        if position is not None:
+            buffer = buffer[position:]
+            position = 0
+        if chunk is None:
+            exhausted = True
+            buffer += text_decoder.decode(b"", final=True)
+        else:
+            buffer += text_decoder.decode(chunk)
+
+
+def _sparql_term(binding: Dict) -> str:
+    """
+        SPARQL syntax of a bound value, used to resume a keyset pagination after it
+    """
+    value = binding["value"]
+    if binding["type"] == "uri":
+        return "<{}>".format(value)
+    literal = json.dumps(value)
+    if "datatype" in binding:
+        return "{literal}^^<{datatype}>".format(literal=literal, datatype=binding["datatype"])
+    if "xml:lang" in binding:
+        return "{literal}@{lang}".format(literal=literal, lang=binding["xml:lang"])
+    return literal
+
+
+class _SparQLFetcher:
+    def __init__(self, sparql_wrapper, page_size, where_body, select_columns, prefixes="",
+                 cache: Union[Cache, str] = None, chunk_size=1 << 16):
+        """
+        :param cache: The cache of the query results or its specification (see claimskg.util.cache.open_cache),
+        nothing is cached if None
+        :param chunk_size: The number of bytes of the responses decoded at once
+        """
+        if isinstance(cache, str):
+            cache = open_cache(cache)
+        self.cache = cache
         self.sparql_wrapper = sparql_wrapper
         self.page_size = page_size
-        self.current_offset = 0
         self.where_body = where_body
         self.prefixes = prefixes
         self.select_columns = select_columns
+        self.chunk_size = chunk_size
         sparql_wrapper.setReturnFormat(JSON)
+
+    def _fetch_from_cache_or_query(self, query):
+        cache_key = query
+        result = self.cache.get(cache_key) if self.cache is not None else None
+        # If it doesn't exist, query the endpoint and cache the result
+        if result is None:
+            result = self._query(query).read()
+            if self.cache is not None:
+                self.cache.set(cache_key, result)
+        strres = str(result, 'utf-8')
+        return json.loads(strres)
+
+    def _query(self, query):
+        # SPARQLWrapper instances hold the query, each request gets its own copy so that requests can run concurrently
+        sparql_wrapper = copy.copy(self.sparql_wrapper)
+        sparql_wrapper.setQuery(query)
+        return sparql_wrapper.query().response
+
+    def _query_bindings(self, query) -> Iterator[Dict]:
+        """
+            Yields the bindings of the result of query as they are decoded from the cached result or from the response
+            of the endpoint, which is cached once it has been read completely
+        """
+        cache_key = query
+        result = self.cache.get(cache_key) if self.cache is not None else None
+        if result is not None:
+            yield from iter_json_bindings([result])
+            return
+
+        response = self._query(query)
+        chunks = []
+
+        def read_chunks():
+            chunk = response.read(self.chunk_size)
+            while chunk:
+                # The chunks are only kept to cache the whole result
+                if self.cache is not None:
+                    chunks.append(chunk)
+                yield chunk
+                chunk = response.read(self.chunk_size)
+
+        yield from iter_json_bindings(read_chunks())
+        if self.cache is not None:
+            # Reads what remains after the bindings array before caching the whole result
+            for _ in read_chunks():
+                pass
+            self.cache.set(cache_key, b"".join(chunks))
+
+
+class SparQLOffsetFetcher(_SparQLFetcher):
+
+    def __init__(self, sparql_wrapper, page_size, where_body, select_columns, prefixes="",
+                 cache: Union[Cache, str] = None, order_by=None, chunk_size=1 << 16):
+        """
+            Fetches the result of a query page by page with LIMIT/OFFSET
+        :param order_by: The ORDER BY expression of the pages, without it the endpoint may not return the solutions in
+        the same order for every page
+        """
+        super().__init__(sparql_wrapper, page_size, where_body, select_columns, prefixes, cache, chunk_size)
+        self.order_by = order_by
+        self.current_offset = 0
         self.count = -1
         self.__get_count__()
 
@@ -31,44 +171,113 @@ class SparQLOffsetFetcher:
             return count
         return self.count
 
+    def _page_query(self, offset):
+        order_by = ""
+        if self.order_by:
+            order_by = "ORDER BY " + self.order_by
+        return """{prefixes} SELECT {select_columns} WHERE {{
+                        {where_body}
+                    }} {order_by} LIMIT {page_size} OFFSET {offset}
+                    """.format(select_columns=self.select_columns, where_body=self.where_body, order_by=order_by,
+                               page_size=self.page_size, offset=offset, prefixes=self.prefixes)
+
+    def _fetch_page(self, offset) -> List[Dict]:
+        return list(self._query_bindings(self._page_query(offset)))
+
     def next_page(self):
         if self.current_offset < self.count:
-            query = """{prefixes} SELECT {select_columns} WHERE {{
-                        {where_body}
-                    }} LIMIT {page_size} OFFSET {offset}
-                    """.format(select_columns=self.select_columns, where_body=self.where_body, page_size=self.page_size,
-                               offset=self.current_offset, prefixes=self.prefixes)
-            result = self._fetch_from_cache_or_query(query)
+            page = self._fetch_page(self.current_offset)
             self.current_offset += self.page_size
-            return result['results']['bindings']
+            return page
         return None
 
-    def fetch_all(self):
-        result = list()
-        page = list()
-        while page is not None:
-            page = self.next_page()
-            if page is not None:
-                result.extend(page)
-        return result
+    def iter_pages(self, workers=4) -> Iterator[List[Dict]]:
+        """
+            Yields the remaining pages in order, up to workers page requests being in flight on a thread pool at any
+            time, hence at most workers pages are held in memory
+        """
+        offsets = range(self.current_offset, self.count, self.page_size)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = deque()
+            try:
+                for offset in offsets:
+                    pending.append(executor.submit(self._fetch_page, offset))
+                    if len(pending) >= workers:
+                        self.current_offset += self.page_size
+                        yield pending.popleft().result()
+                while pending:
+                    self.current_offset += self.page_size
+                    yield pending.popleft().result()
+            finally:
+                for future in pending:
+                    future.cancel()
 
-    def _fetch_from_cache_or_query(self, query):
-        result = str()
-        found = False
-        cache_key = query
-        # If redis was successfully initialized
-        if r is not None:
-            # Get cache value and check whether it exists
-            val = r.get(cache_key)
-            if val is not None:
-                result = val
-                found = True
-        # If it doesn't exist, query annotator and cache the result
-        if not found:
-            self.sparql_wrapper.setQuery(query)
-            result = self.sparql_wrapper.query().response.read()
-            if len(result) == 0:
-                result = ""
-            r.set(cache_key, result)
-        strres = str(result, 'utf-8')
-        return json.loads(strres)
+    def iter_rows(self, workers=4) -> Iterator[Dict]:
+        """
+            Yields the remaining bindings in order. With a single worker, the bindings are yielded as they are decoded
+            from the response instead of page by page.
+        """
+        if workers <= 1:
+            while self.current_offset < self.count:
+                offset = self.current_offset
+                self.current_offset += self.page_size
+                yield from self._query_bindings(self._page_query(offset))
+        else:
+            for page in self.iter_pages(workers):
+                yield from page
+
+    def fetch_all(self, workers=1):
+        return list(self.iter_rows(workers))
+
+
+class SparQLKeysetFetcher(_SparQLFetcher):
+
+    def __init__(self, sparql_wrapper, page_size, where_body, select_columns, key_variable, prefixes="",
+                 cache: Union[Cache, str] = None, string_key=True, chunk_size=1 << 16):
+        """
+            Fetches the result of a query page by page ordered on key_variable, each page starting after the last key
+            of the previous one (FILTER ?key > last) instead of skipping an OFFSET, so that the endpoint does not
+            compute and skip all the previous solutions for every page. The key must be bound and unique in every
+            solution.
+        :param key_variable: The name of the key variable, without '?'
+        :param string_key: Whether keys are ordered on their string (required for IRIs, which are not comparable with
+        '>') or on their value (numbers, dates)
+        """
+        super().__init__(sparql_wrapper, page_size, where_body, select_columns, prefixes, cache, chunk_size)
+        self.key_variable = key_variable
+        self.string_key = string_key
+        self.last_key = None
+
+    def _page_query(self):
+        key_expression = "?" + self.key_variable
+        if self.string_key:
+            key_expression = "STR({})".format(key_expression)
+        key_filter = ""
+        if self.last_key is not None:
+            if self.string_key:
+                last_key = json.dumps(self.last_key["value"])
+            else:
+                last_key = _sparql_term(self.last_key)
+            key_filter = "FILTER({key} > {last})".format(key=key_expression, last=last_key)
+        return """{prefixes} SELECT {select_columns} WHERE {{
+                        {where_body}
+                        {key_filter}
+                    }} ORDER BY {key} LIMIT {page_size}
+                    """.format(select_columns=self.select_columns, where_body=self.where_body, key_filter=key_filter,
+                               key=key_expression, page_size=self.page_size, prefixes=self.prefixes)
+
+    def iter_rows(self) -> Iterator[Dict]:
+        """
+            Yields the bindings as they are decoded from the responses, page after page
+        """
+        while True:
+            row_count = 0
+            for binding in self._query_bindings(self._page_query()):
+                row_count += 1
+                self.last_key = binding[self.key_variable]
+                yield binding
+            if row_count < self.page_size:
+                return
+
+    def fetch_all(self):
+        return list(self.iter_rows())
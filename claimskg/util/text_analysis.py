@@ -0,0 +1,55 @@
+from typing import Dict, List, Tuple, FrozenSet
+
+from metaphone import doublemetaphone
+from nltk import TreebankWordTokenizer, StemmerI, SnowballStemmer
+
+from claimskg.util import LRUCache
+
+
+def load_word_set(file) -> FrozenSet[str]:
+    with open(file, "r", encoding="utf8") as word_file:
+        return frozenset(line.strip() for line in word_file)
+
+
+class TokenAnalyzer:
+    def __init__(self, stemmer: StemmerI = None, memo_size=200000):
+        """
+            Token analysis shared by the concept recognizers: span tokenization and memoized token -> double stem and
+            token -> double metaphone. The same tokens come back in every label and text, the memos make each of them
+            analysed once.
+        :param stemmer: The stemmer (default: english Snowball stemmer)
+        :param memo_size: The maximum number of tokens kept in each memo, unbounded if None
+        """
+        self.tokenizer = TreebankWordTokenizer()
+        self.stemmer = stemmer
+        if not stemmer:
+            self.stemmer = SnowballStemmer("english")
+        self.stem_memo = LRUCache(memo_size)
+        self.phone_memo = LRUCache(memo_size)
+
+    def span_tokenize(self, text) -> List[Tuple[int, int]]:
+        return list(self.tokenizer.span_tokenize(text))
+
+    def stem(self, token):
+        # Double stemming ensures we come back to the most elementary root, ensure match between nouns and
+        # adjectives with the same root
+        return self.stem_memo.get(token, lambda word: self.stemmer.stem(self.stemmer.stem(word)))
+
+    def phone(self, token):
+        return self.phone_memo.get(token, lambda word: doublemetaphone(word)[0])
+
+    def statistics(self) -> Dict[str, LRUCache]:
+        return {"stem": self.stem_memo, "phone": self.phone_memo}
+
+
+_shared_analyzer = None
+
+
+def shared_analyzer() -> TokenAnalyzer:
+    """
+        The analyzer used by the recognizers that do not get a specific stemmer, hence shared by all of them
+    """
+    global _shared_analyzer
+    if _shared_analyzer is None:
+        _shared_analyzer = TokenAnalyzer()
+    return _shared_analyzer
@@ -0,0 +1,103 @@
+from typing import Callable, Iterable, Iterator, List, Sequence, Set, Tuple
+
+import numpy
+from numpy import ndarray
+
+
+class RandomHyperplaneIndex:
+    def __init__(self, matrix: ndarray, tables=16, bits=12, multiprobe=True, seed=1):
+        """
+            Approximate nearest neighbour index over the rows of matrix for the cosine similarity (random-hyperplane
+            LSH): in each table, a row is hashed to the signs of its projections on bits random hyperplanes, rows with
+            a small angle between them being likely to share a bucket. The candidates of a row are the rows of its
+            buckets, their exact similarity is then computed to keep the nearest ones. More tables and multiprobe
+            increase the recall, more bits decrease the number of candidates (faster, lower recall).
+        :param matrix: The vectors, one per row, L2-normalised or not (e.g. Embeddings.sentence_matrix)
+        :param multiprobe: Whether to also probe the buckets whose code differs from that of the row by one bit
+        """
+        if bits > 62:
+            raise ValueError("At most 62 bits per table are supported")
+        norms = numpy.linalg.norm(matrix, axis=1)
+        self._matrix = numpy.divide(matrix, norms[:, None], out=numpy.zeros(matrix.shape, dtype=numpy.float64),
+                                    where=norms[:, None] > 0)
+        self.tables = tables
+        self.bits = bits
+        self.multiprobe = multiprobe
+        random = numpy.random.RandomState(seed)
+        planes = random.standard_normal((tables, bits, matrix.shape[1]))
+        powers = numpy.left_shift(numpy.int64(1), numpy.arange(bits, dtype=numpy.int64))
+
+        # Rows whose vector is null (no text) are similar to nothing and are not indexed
+        self._indexed = norms > 0
+        self._codes = numpy.empty((tables, len(matrix)), dtype=numpy.int64)
+        self._buckets = []
+        for table in range(tables):
+            codes = ((self._matrix @ planes[table].T) > 0).astype(numpy.int64) @ powers
+            self._codes[table] = codes
+            rows = numpy.flatnonzero(self._indexed)
+            order = rows[numpy.argsort(codes[rows], kind="stable")]
+            sorted_codes = codes[order]
+            boundaries = numpy.flatnonzero(numpy.diff(sorted_codes)) + 1
+            starts = numpy.concatenate(([0], boundaries))
+            ends = numpy.concatenate((boundaries, [len(order)]))
+            self._buckets.append({int(sorted_codes[start]): order[start:end] for start, end in zip(starts, ends)})
+        self._probe_masks = [1 << bit for bit in range(bits)] if multiprobe else []
+
+    def __len__(self):
+        return len(self._matrix)
+
+    def candidates(self, index: int) -> ndarray:
+        """
+        :return: The distinct rows sharing a (probed) bucket with row index, itself excluded
+        """
+        if not self._indexed[index]:
+            return numpy.empty(0, dtype=numpy.intp)
+        bucket_rows = []
+        for table, buckets in enumerate(self._buckets):
+            code = int(self._codes[table, index])
+            bucket_rows.append(buckets[code])
+            for mask in self._probe_masks:
+                probed_rows = buckets.get(code ^ mask)
+                if probed_rows is not None:
+                    bucket_rows.append(probed_rows)
+        candidates = numpy.unique(numpy.concatenate(bucket_rows))
+        return candidates[candidates != index]
+
+    def nearest_neighbours(self, k: int, indices: Iterable[int] = None,
+                           allowed: Callable[[int], Sequence[int]] = None) -> Iterator[Tuple[int, ndarray, ndarray]]:
+        """
+            The (approximate) k nearest neighbours of each row of indices (all the rows by default)
+        :param allowed: Returns the rows that may be neighbours of a row, the other candidates being discarded before
+        the nearest ones are kept
+        :return: For each row, (row, neighbour rows, cosine similarities), by decreasing similarity
+        """
+        if indices is None:
+            indices = range(len(self._matrix))
+        for index in indices:
+            candidates = self.candidates(index)
+            if allowed is not None:
+                candidates = numpy.intersect1d(candidates, numpy.asarray(allowed(index), dtype=numpy.intp),
+                                               assume_unique=True)
+            if len(candidates) == 0:
+                yield index, candidates, numpy.empty(0)
+                continue
+            similarities = self._matrix[candidates] @ self._matrix[index]
+            if len(candidates) > k:
+                nearest = numpy.argpartition(-similarities, k - 1)[:k]
+                candidates, similarities = candidates[nearest], similarities[nearest]
+            order = numpy.argsort(-similarities, kind="stable")
+            yield index, candidates[order], similarities[order]
+
+
+def nearest_neighbour_pairs(index: RandomHyperplaneIndex, k: int, indices: Iterable[int] = None,
+                            allowed: Callable[[int], Sequence[int]] = None) -> List[Tuple[int, int]]:
+    """
+        Pairs (index_a, index_b), index_a < index_b, of each row of indices with each of its k nearest neighbours (among
+        the allowed ones, see RandomHyperplaneIndex.nearest_neighbours), at most k pairs per row, in the order of
+        itertools.combinations
+    """
+    pairs = set()  # type: Set[Tuple[int, int]]
+    for row, neighbours, _ in index.nearest_neighbours(k, indices, allowed):
+        for neighbour in neighbours.tolist():
+            pairs.add((row, neighbour) if row < neighbour else (neighbour, row))
+    return sorted(pairs)
@@ -7,18 +7,22 @@ import numpy
 from nltk import TreebankWordTokenizer, everygrams, collections
 from nltk.corpus import stopwords
 from numpy.core.multiarray import ndarray
-from redis import StrictRedis
 from scipy.spatial import distance
 from sklearn.decomposition import SparsePCA
 
+from claimskg.util.cache import Cache
+
 tokenizer = TreebankWordTokenizer()
 
-_stop_words = stopwords.words('english')
+_stop_words = frozenset(stopwords.words('english'))
 
 
 class Embeddings(ABC):
-    def __init__(self, redis=None):
-        self.redis = redis
+    def __init__(self, cache: Cache = None):
+        """
+        :param cache: Cache of the sentence vectors, see claimskg.util.cache
+        """
+        self.cache = cache
 
     @abstractmethod
     def word_vector(self, word: str) -> ndarray:
@@ -42,24 +46,81 @@ class Embeddings(ABC):
         vector_b = self.sentence_vector(string_b, sample)
         return self.vector_similarity(vector_a, vector_b)
 
+    def sentence_matrix(self, sentences: List[str], sample=None) -> ndarray:
+        """
+            Embeds each distinct sentence once into the rows of a contiguous float32 matrix (one row per sentence, in
+            order). Rows are L2-normalised so that the cosine similarity of two sentences is the dot product of their
+            rows, sentences without any known token get a zero row (similarity 0 with everything).
+        """
+        matrix = numpy.zeros((len(sentences), self.dim()), dtype=numpy.float32)
+        row_by_sentence = dict()
+        for index, sentence in enumerate(sentences):
+            if sentence not in row_by_sentence:
+                row_by_sentence[sentence] = index
+
+        # The vectors of the distinct sentences are looked up in the cache with a single batch
+        distinct_sentences = list(row_by_sentence.keys())
+        cached_vectors = [None] * len(distinct_sentences)
+        if self.cache is not None:
+            cached_vectors = self.cache.get_many([Embeddings._cache_key(sentence, sample) for sentence in
+                                                  distinct_sentences])
+        computed_vectors = []
+        for sentence, cached_vector in zip(distinct_sentences, cached_vectors):
+            if cached_vector is not None:
+                vector = Embeddings._deserialize_vector(cached_vector)
+            else:
+                vector = self._compute_sentence_vector(sentence, sample)
+                computed_vectors.append((Embeddings._cache_key(sentence, sample), vector))
+            vector = numpy.asarray(vector, dtype=numpy.float32).ravel()
+            norm = numpy.linalg.norm(vector)
+            if vector.shape == (self.dim(),) and norm > 0:
+                matrix[row_by_sentence[sentence]] = vector / norm
+        if self.cache is not None and len(computed_vectors) > 0:
+            self.cache.set_many([(key, Embeddings._serialize_vector(vector)) for key, vector in computed_vectors])
+
+        for index, sentence in enumerate(sentences):
+            if row_by_sentence[sentence] != index:
+                matrix[index] = matrix[row_by_sentence[sentence]]
+        return matrix
+
+    @staticmethod
+    def row_similarities(matrix_a: ndarray, indices_a, matrix_b: ndarray, indices_b) -> ndarray:
+        """
+            Cosine similarities of the rows indices_a[i] of matrix_a and indices_b[i] of matrix_b, computed as a batch
+            of dot products, both matrices having L2-normalised rows (see sentence_matrix).
+        """
+        return numpy.einsum("ij,ij->i", matrix_a[indices_a], matrix_b[indices_b])
+
     def sentence_vector(self, sentence: str, sample=None) -> ndarray:
+        if self.cache is None:
+            return self._compute_sentence_vector(sentence, sample)
+
+        key = Embeddings._cache_key(sentence, sample)
+        cached_vector = self.cache.get(key)
+        if cached_vector is not None:
+            return Embeddings._deserialize_vector(cached_vector)
+        vector = self._compute_sentence_vector(sentence, sample)
+        self.cache.set(key, Embeddings._serialize_vector(vector))
+        return vector
+
+    def _compute_sentence_vector(self, sentence: str, sample=None) -> ndarray:
         tokens = [token for token in tokenizer.tokenize(sentence) if
                   token.isprintable() and token not in _stop_words]
 
         if sample:
             tokens = list(everygrams(tokens, 1, 1))  # .sort(key=lambda x: x[1])[:10]
             tokens = [word[0] for word, count in collections.Counter(tokens).most_common(sample)]
-        key = hashlib.md5(sentence.encode('utf-8')).hexdigest()
-        if self.redis is not None and self.redis.exists(key):
-            vector = Embeddings.load_vector_from_cache(key, self.redis)
-        else:
-            vector = self.arithmetic_mean_bow_embedding(tokens)
-            if self.redis is not None:
-                Embeddings.cache_vector(key, vector, self.redis)
+        return self.arithmetic_mean_bow_embedding(tokens)
 
-        return vector
+    @staticmethod
+    def _cache_key(sentence: str, sample=None):
+        if sample:
+            sentence = "{sample}|{sentence}".format(sample=sample, sentence=sentence)
+        return hashlib.md5(sentence.encode('utf-8')).hexdigest()
 
     def arithmetic_mean_bow_embedding(self, tokens: List[str]):
+        if len(tokens) == 0:
+            return numpy.zeros((self.dim(),))
         vectors = []
         for token in tokens:
             vectors.append(self.word_vector(token))
@@ -123,25 +184,23 @@ class Embeddings(ABC):
             return transformer.fit_transform(numpy.kron(w1, w2.transpose()).reshape(n, n))
 
     @staticmethod
-    def cache_vector(key, vector, redis: StrictRedis):
-        serialized = vector.ravel().tostring()
-        redis.set(key, serialized)
+    def _serialize_vector(vector) -> bytes:
+        return numpy.asarray(vector, dtype=numpy.float64).ravel().tobytes()
 
     @staticmethod
-    def load_vector_from_cache(key, redis: StrictRedis):
-        value = redis.get(key)
-        return numpy.fromstring(value)
+    def _deserialize_vector(value: bytes) -> ndarray:
+        return numpy.frombuffer(value, dtype=numpy.float64)
 
 
 class LazyDenseEmbeddings(Embeddings):
 
-    def __init__(self, vocab_file, vectors_file, use_cache: bool, redis: StrictRedis = None):
+    def __init__(self, vocab_file, vectors_file, use_cache: bool, cache: Cache = None):
         """
         Usage: todo
         :param vocab_file:
         :param vectors_file:
         """
-        super(Embeddings, self).__init__(redis)
+        super(LazyDenseEmbeddings, self).__init__(cache)
 
         with open(vocab_file, "r", encoding="utf-8") as vocab_file:
             labels = vocab_file.read().splitlines()
@@ -162,13 +221,13 @@ class LazyDenseEmbeddings(Embeddings):
         self._load(labels, lines)
         self._dim = None
 
-    def __init__(self, embeddings_file: str, use_cache: bool, redis: StrictRedis = None):
+    def __init__(self, embeddings_file: str, use_cache: bool = True, cache: Cache = None):
         """
         Usage: todo
         :param embeddings_file:
         :param use_cache
         """
-        super(Embeddings, self).__init__(redis)
+        super(LazyDenseEmbeddings, self).__init__(cache)
         labels = []
         vector_lines = []
         with open(embeddings_file, "r", encoding="utf-8") as embedding_file:
@@ -201,15 +260,12 @@ class LazyDenseEmbeddings(Embeddings):
     def word_vector(self, word: str) -> ndarray:
         vec = None
         if self._use_cache:
-            try:
-                vec = self._vector_index[word]
-            except KeyError:
-                pass
-
-        if not vec:
-            if word in self._vector_dictionary.keys():
-                line = self._vector_dictionary[word]
-                vec = numpy.fromstring(line, sep=" ")
+            vec = self._vector_index.get(word)
+
+        if vec is None:
+            line = self._vector_dictionary.get(word)
+            if line is not None:
+                vec = numpy.array(line.split(), dtype=numpy.float64)
             else:
                 vec = self._zero_vector()
 
@@ -219,15 +275,15 @@ class LazyDenseEmbeddings(Embeddings):
         return vec
 
     def _zero_vector(self):
-        if not self._zero_vec:
+        if self._zero_vec is None:
             self._zero_vec = numpy.zeros((self.dim(),))
         return self._zero_vec
 
 
 class DenseEmbeddings(Embeddings):
 
-    def __init__(self, vocab_file, vectors_file, redis: StrictRedis = None):
-        super(Embeddings, self).__init__(redis)
+    def __init__(self, vocab_file, vectors_file, cache: Cache = None):
+        super(DenseEmbeddings, self).__init__(cache)
         with open(vocab_file, "r") as vocab_file:
             self._dimensions = vocab_file.readlines()
         self._vsm = numpy.loadtxt(vectors_file)
@@ -248,6 +304,110 @@ class DenseEmbeddings(Embeddings):
 
 
 
+class MemoryMappedEmbeddings(Embeddings):
+
+    def __init__(self, embeddings_path: str, cache: Cache = None):
+        """
+            Embeddings stored in the binary layout written by convert_text_embeddings: embeddings_path + ".vocab" (one
+            word per line) and embeddings_path + ".npy" (float32 matrix, one row per word). The matrix is memory-mapped
+            read-only, hence the start-up time does not depend on the size of the vocabulary and processes using the
+            same file share its pages.
+        :param embeddings_path: The path of the files without the .vocab/.npy extension
+        """
+        super(MemoryMappedEmbeddings, self).__init__(cache)
+        self._embeddings_path = embeddings_path
+        with open(embeddings_path + ".vocab", "r", encoding="utf-8") as vocab_file:
+            self._word_index = {word: index for index, word in enumerate(vocab_file.read().splitlines())}
+        self._open_matrix()
+
+    def _open_matrix(self):
+        self._matrix = numpy.load(self._embeddings_path + ".npy", mmap_mode="r")
+        self._zero_vec = numpy.zeros((self.dim(),), dtype=self._matrix.dtype)
+
+    def __getstate__(self):
+        # The mapping is re-opened instead of copying the matrix when the embeddings are sent to another process
+        state = self.__dict__.copy()
+        del state["_matrix"]
+        del state["_zero_vec"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._open_matrix()
+
+    def word_vector(self, word: str) -> ndarray:
+        index = self._word_index.get(word)
+        if index is None:
+            return self._zero_vec
+        return self._matrix[index]
+
+    def dim(self):
+        return self._matrix.shape[1]
+
+
+def _text_embedding_lines(embeddings_file: str):
+    with open(embeddings_file, "r", encoding="utf-8") as embedding_file:
+        for line_number, line in enumerate(embedding_file):
+            parts = line.rstrip("\n").rstrip().split(" ")
+            # Header line of the word2vec text format: <vocabulary size> <dimensions>
+            if line_number == 0 and len(parts) == 2 and parts[0].isdigit() and parts[1].isdigit():
+                continue
+            if len(parts) > 1:
+                yield parts[0], parts[1:]
+
+
+def _vocab_vector_lines(words: List[str], vectors_file: str):
+    with open(vectors_file, "r", encoding="utf-8") as vectors:
+        for word, line in zip(words, vectors):
+            yield word, line.split()
+
+
+def convert_text_embeddings(embeddings_file: str, output_path: str, vocab_file: str = None):
+    """
+        Converts text embeddings to the binary layout of MemoryMappedEmbeddings. The input is read twice, line by line,
+        and the vectors are written straight to the memory-mapped output matrix.
+    :param embeddings_file: One "word v1 v2 ... vn" line per word or, if vocab_file is given, one "v1 v2 ... vn" line
+    per word of vocab_file
+    :param output_path: The path of the output files, without the .vocab/.npy extension
+    :param vocab_file: The vocabulary of a vectors-only embeddings_file, one word per line
+    :raise ValueError: When embeddings_file does not have as many vectors as vocab_file has words
+    """
+    if vocab_file is not None:
+        with open(vocab_file, "r", encoding="utf-8") as vocab:
+            words = vocab.read().splitlines()
+        dimensions = None
+        vector_count = 0
+        with open(embeddings_file, "r", encoding="utf-8") as vectors:
+            for line in vectors:
+                if dimensions is None:
+                    dimensions = len(line.split())
+                vector_count += 1
+        if vector_count != len(words):
+            # The vectors would be assigned to the wrong words or the missing ones left to zero
+            raise ValueError("{vectors} has {vector_count} vectors for the {word_count} words of {vocab}".format(
+                vectors=embeddings_file, vector_count=vector_count, word_count=len(words), vocab=vocab_file))
+        entries = _vocab_vector_lines(words, embeddings_file)
+        count = len(words)
+    else:
+        count = 0
+        dimensions = None
+        for word, vector in _text_embedding_lines(embeddings_file):
+            count += 1
+            if dimensions is None:
+                dimensions = len(vector)
+        entries = _text_embedding_lines(embeddings_file)
+
+    matrix = numpy.lib.format.open_memmap(output_path + ".npy", mode="w+", dtype=numpy.float32,
+                                          shape=(count, dimensions))
+    with open(output_path + ".vocab", "w", encoding="utf-8") as vocab_output:
+        for index, (word, vector) in enumerate(entries):
+            vocab_output.write(word + "\n")
+            matrix[index] = numpy.array(vector, dtype=numpy.float32)
+    matrix.flush()
+    del matrix
+    return count, dimensions
+
+
 # class MagnitudeEmbeddings(Embeddings):
 #
 #     def __init__(self, embeddings_file):
@@ -282,8 +442,8 @@ class DenseEmbeddings(Embeddings):
 
 class Sent2VecEmbeddings(Embeddings):
     def __init__(self, embeddings_file):
-        super(Embeddings, self).__init__()
-        self.model = Sent2vecModel()
+        super(Sent2VecEmbeddings, self).__init__()
+        self.model = sent2vec.Sent2vecModel()
         self.model.load_model(embeddings_file)
 
     def word_vector(self, word: str) -> ndarray:
@@ -0,0 +1,57 @@
+import getopt
+import logging
+import sys
+
+from claimskg.vsm.embeddings import convert_text_embeddings
+
+logger = logging.getLogger()
+logger.setLevel(logging.DEBUG)
+
+ch = logging.StreamHandler(sys.stdout)
+ch.setLevel(logging.DEBUG)
+formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+ch.setFormatter(formatter)
+logger.addHandler(ch)
+
+
+def usage():
+    logger.info("Converts text embeddings to the memory-mapped binary layout of MemoryMappedEmbeddings\n\n"
+                "python3 convert_embeddings.py --input [file] --output [path] [--vocab [file]]\n\n"
+                "--input [file] Text embeddings, one \"word v1 ... vn\" line per word (mandatory)\n"
+                "--vocab [file] Vocabulary of an input that only contains the vectors, one word per line and as many\n"
+                "lines as the input\n"
+                "--output [path] Path of the output, [path].vocab and [path].npy are written (mandatory)\n")
+
+
+if __name__ == '__main__':
+    options = {'vocab': None}
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], "h", ("input=", "output=", "vocab="))
+        for opt, arg in opts:
+            if opt == '-h':
+                usage()
+                exit()
+            elif opt == '--input':
+                options['input'] = arg
+            elif opt == '--output':
+                options['output'] = arg
+            elif opt == '--vocab':
+                options['vocab'] = arg
+    except getopt.GetoptError:
+        logger.info('Arguments parser error')
+        usage()
+        exit()
+
+    if "input" not in options.keys() or "output" not in options.keys():
+        logger.info("Missing mandatory parameter --input or --output")
+        usage()
+        exit()
+
+    logger.info("Converting embeddings... [{}]".format(options['input']))
+    try:
+        count, dimensions = convert_text_embeddings(options['input'], options['output'], options['vocab'])
+    except ValueError as error:
+        logger.error(error)
+        exit(1)
+    logger.info("Wrote {count} vectors of {dimensions} dimensions to {path}.npy/{path}.vocab".format(
+        count=count, dimensions=dimensions, path=options['output']))
@@ -107,11 +107,10 @@ kwc_parent = []
 print("Sub-Topic Query...")
 same_subtopic_fetcher = SparQLOffsetFetcher(wrapper, 10000, where_body=same_sub_topic_query_body,
                                             select_columns="distinct ?kwcl ?kwcl_parent ?text ?text2 ?claim ?claim2 ?kwc ?kwc_parent",
-                                            prefixes=prefixes)
-same_subtopic_results = same_subtopic_fetcher.fetch_all()
+                                            prefixes=prefixes, cache="redis")
 
 print("Building dataset...")
-for result in same_subtopic_results:
+for result in same_subtopic_fetcher.iter_rows(workers=4):
     kwcl.append(result['kwcl']['value'])
     kwcl_parent.append(result['kwcl_parent']['value'])
     text.append(result['text']['value'])
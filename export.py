@@ -8,6 +8,8 @@ import yaml
 
 import claimskg
 from claimskg.generator import ClaimsKGGenerator
+from claimskg.generator.columnar import read_rows
+from claimskg.generator.incremental import IncrementalState
 
 # from claimskg.vsm.embeddings import MagnitudeEmbeddings
 
@@ -40,11 +42,18 @@ if __name__ == '__main__':
         exit()
 
     configuration_dict = config_dict = yaml.load(open("configuration.yaml", "r"), Loader=yaml.Loader)
-    options = {'output': "output.ttl", 'format': "turtle", 'resolve': True, 'threshold': 0.3,
+    options = {'output': "output.ttl", 'format': "turtle", 'resolve': False, 'threshold': 0.3,
                'model-uri': "http://data.gesis.org/claimskg/", 'include-body': False, 'reconcile': -1.0,
                'caching': False, 'seed': None, 'sample': None, 'mappings-file': "./mappings.csv",
                'embeddings-type': "MagnitudeEmbeddings", 'embeddings-path': None, 'align-duplicated': False,
-               'materialize-indirect-claim-links': False}
+               'align-near-duplicates': False, 'near-duplicate-threshold': 0.8,
+               'materialize-indirect-claim-links': False, 'stream': False, 'chunk-size': 1000,
+               'workers': 1, 'vocabulary-graphs': "merged", 'vocabularies-output': None,
+               'keyword-cache-size': 100000, 'concept-recognizer': "intersection",
+               'annotation-workers': 1, 'incremental': False, 'state-file': None, 'delta-output': None,
+               'reconciliation-index': None, 'cache-backend': "sqlite:claimskg_cache.sqlite",
+               'resolve-endpoint': "https://dbpedia.org/sparql/", 'resolve-batch-size': 200, 'resolve-workers': 4,
+               'generation-workers': 1, 'ann-neighbours': None, 'ann-tables': 16, 'ann-bits': 12}
 
     # Overriding hard-coded defaults with values from configuration file
     for (key, value) in configuration_dict.items():
@@ -54,7 +63,13 @@ if __name__ == '__main__':
         opts, args = getopt.getopt(argv, "",
                                    ("input=", "output=", "format=", "model-uri=", "resolve", "threshold=",
                                     "include-body", "reconcile=", "caching", "sample=", "seed=", "mappings-file=",
-                                    "align-duplicated", "materialize-indirect-claim-links"))
+                                    "align-duplicated", "align-near-duplicates", "near-duplicate-threshold=",
+                                    "materialize-indirect-claim-links", "stream", "chunk-size=",
+                                    "workers=", "vocabulary-graphs=", "vocabularies-output=", "keyword-cache-size=",
+                                    "concept-recognizer=", "annotation-workers=", "incremental", "state-file=",
+                                    "delta-output=", "reconciliation-index=", "cache-backend=",
+                                    "resolve-endpoint=", "resolve-batch-size=", "resolve-workers=",
+                                    "generation-workers=", "ann-neighbours=", "ann-tables=", "ann-bits="))
 
         for opt, arg in opts:
             if opt == '--input':
@@ -75,6 +90,10 @@ if __name__ == '__main__':
                 options['reconcile'] = float(arg)
             elif opt == "--align-duplicated":
                 options['align-duplicated'] = True
+            elif opt == "--align-near-duplicates":
+                options['align-near-duplicates'] = True
+            elif opt == "--near-duplicate-threshold":
+                options['near-duplicate-threshold'] = float(arg)
             elif opt == "--caching":
                 options['caching'] = True
             elif opt == "--sample":
@@ -85,6 +104,46 @@ if __name__ == '__main__':
                 options['mappings-file'] = arg
             elif opt == "--materialize-indirect-claim-links":
                 options['materialize-indirect-claim-links'] = True
+            elif opt == "--stream":
+                options['stream'] = True
+            elif opt == "--chunk-size":
+                options['chunk-size'] = int(arg)
+            elif opt == "--workers":
+                options['workers'] = int(arg)
+            elif opt == "--vocabulary-graphs":
+                options['vocabulary-graphs'] = arg
+            elif opt == "--vocabularies-output":
+                options['vocabularies-output'] = arg
+            elif opt == "--keyword-cache-size":
+                options['keyword-cache-size'] = int(arg)
+            elif opt == "--concept-recognizer":
+                options['concept-recognizer'] = arg
+            elif opt == "--annotation-workers":
+                options['annotation-workers'] = int(arg)
+            elif opt == "--incremental":
+                options['incremental'] = True
+            elif opt == "--state-file":
+                options['state-file'] = arg
+            elif opt == "--delta-output":
+                options['delta-output'] = arg
+            elif opt == "--reconciliation-index":
+                options['reconciliation-index'] = arg
+            elif opt == "--ann-neighbours":
+                options['ann-neighbours'] = int(arg)
+            elif opt == "--ann-tables":
+                options['ann-tables'] = int(arg)
+            elif opt == "--ann-bits":
+                options['ann-bits'] = int(arg)
+            elif opt == "--cache-backend":
+                options['cache-backend'] = arg
+            elif opt == "--resolve-endpoint":
+                options['resolve-endpoint'] = arg
+            elif opt == "--resolve-batch-size":
+                options['resolve-batch-size'] = int(arg)
+            elif opt == "--resolve-workers":
+                options['resolve-workers'] = int(arg)
+            elif opt == "--generation-workers":
+                options['generation-workers'] = int(arg)
 
     except:
         logger.info('Arguments parser error')
@@ -98,7 +157,7 @@ if __name__ == '__main__':
 
     sparql_wrapper = None
     if options['resolve']:
-        sparql_wrapper = SPARQLWrapper("https://dbpedia.org/sparql/")
+        sparql_wrapper = SPARQLWrapper(options['resolve-endpoint'])
 
     logger.info("Loading data...")
     #csv.field_size_limit(sys.maxsize)
@@ -106,11 +165,6 @@ if __name__ == '__main__':
 
     # pandas_frame = pandas.read_csv(options['input'], sep=',', skipinitialspace=True, quotechar='"', escapechar='"', engine="python",encoding="utf-8")
 
-    dataset_rows = []
-    with open(options['input'], encoding='utf8') as csv_file:
-        csv_reader = csv.DictReader(csv_file, delimiter=',', quotechar='"', dialect=csv.unix_dialect)
-        for row in csv_reader:
-            dataset_rows.append(row)
     theta = options['reconcile']
     embeddings = None
     if theta > 0 and options['embeddings-path']:
@@ -123,17 +177,66 @@ if __name__ == '__main__':
     generator = ClaimsKGGenerator(model_uri=options['model-uri'],
                                   sparql_wrapper=sparql_wrapper, include_body=options['include-body'],
                                   threshold=options['threshold'], resolve=options['resolve'],
-                                  use_caching=options['caching'])
+                                  use_caching=options['caching'], vocabulary_graphs=options['vocabulary-graphs'],
+                                  keyword_cache_size=options['keyword-cache-size'] or None,
+                                  concept_recognizer=options['concept-recognizer'],
+                                  annotation_workers=options['annotation-workers'],
+                                  cache_backend=options['cache-backend'],
+                                  resolve_batch_size=options['resolve-batch-size'],
+                                  resolve_workers=options['resolve-workers'])
 
-    logger.info("Generating model from CSV data...")
-    generator.generate_model(dataset_rows)
+    if options['incremental']:
+        incremental_format = options['format']
+        if incremental_format not in ("nt", "nquads"):
+            logger.info("Incremental export requires a line-based format (nt or nquads), falling back to nt")
+            incremental_format = "nt"
+        if theta > 0 or options['align-duplicated'] or options['align-near-duplicates'] or \
+                options['materialize-indirect-claim-links']:
+            logger.warning("Reconciliation and claim alignment are not supported by the incremental export, skipped")
+        state_path = options['state-file'] or options['output'] + ".state"
+        delta_path = options['delta-output'] or options['output'] + ".rdfp"
+        state = IncrementalState.load(state_path, options['model-uri'], incremental_format)
+        if state is None:
+            state = IncrementalState(options['model-uri'], incremental_format)
+        logger.info("Updating {file} from CSV data, delta written to {delta} ...".format(file=options["output"],
+                                                                                        delta=delta_path))
+        generator.generate_model_incremental(read_rows(options['input']), state, options['output'], delta_path,
+                                             format=incremental_format)
+        state.save(state_path)
+        generator.output_statistics()
+        exit()
+
+    keep_logical_views = theta > 0 or options['align-duplicated'] or options['align-near-duplicates']
+    output_file = None
+    stream_format = options['format']
+    if options['stream']:
+        if stream_format not in ("nt", "nquads"):
+            logger.info("Streaming export requires a line-based format (nt or nquads), falling back to nt")
+            stream_format = "nt"
+        output_file = open(options['output'], "wb")
+        logger.info("Streaming model from CSV data to {file} ...".format(file=options["output"]))
+        generator.generate_model_stream(read_rows(options['input']), output_file, format=stream_format,
+                                        chunk_size=options['chunk-size'],
+                                        keep_logical_views=keep_logical_views)
+    else:
+        dataset_rows = list(read_rows(options['input']))
+        logger.info("Generating model from CSV data...")
+        generator.generate_model(dataset_rows, workers=options['generation-workers'],
+                                 keep_logical_views=keep_logical_views)
 
     if theta > 0:
         logger.info("Reconciling claims...")
         generator.reconcile_claims(embeddings, theta=theta, keyword_weight=1, link_weight=1, text_weight=1,
                                    entity_weight=1, mappings_file_path=options['mappings-file'],
-                                   samples=options['sample'], seed=options['seed'])
-    if options['align-duplicated']:
+                                   samples=options['sample'], seed=options['seed'], workers=options['workers'],
+                                   reconciliation_index_path=options['reconciliation-index'],
+                                   ann_neighbours=options['ann-neighbours'], ann_tables=options['ann-tables'],
+                                   ann_bits=options['ann-bits'])
+    if options['align-near-duplicates']:
+        # Exactly identical claims are near-duplicates too, hence --align-duplicated is not needed on top of it
+        logger.info("Matching near-duplicate claims...")
+        generator.align_near_duplicates(threshold=options['near-duplicate-threshold'])
+    elif options['align-duplicated']:
         logger.info("Matching exactly identical claims...")
         generator.align_duplicated()
 
@@ -141,11 +244,22 @@ if __name__ == '__main__':
         logger.info("Materializing thematic claim links trough thesaurus hierarchy...")
         generator.materialize_indirect_claim_links()
 
-    logger.info("\nSerializing graph...")
-    output = generator.export_rdf(options['format'])
-    file = open(options['output'], "w")
+    if options['stream']:
+        generator.output_statistics()
+        generator.flush_graph(output_file, stream_format)
+        output_file.close()
+    else:
+        logger.info("\nSerializing graph...")
+        output = generator.export_rdf(options['format'])
+        file = open(options['output'], "w")
+
+        logger.info("Writing to {file} ...\t\t\t".format(file=options["output"]))
+        file.write(output.decode("utf-8"))
+        file.flush()
+        file.close()
 
-    logger.info("Writing to {file} ...\t\t\t".format(file=options["output"]))
-    file.write(output.decode("utf-8"))
-    file.flush()
-    file.close()
+    if options['vocabularies-output']:
+        logger.info("Writing vocabularies to {file} ...".format(file=options["vocabularies-output"]))
+        vocabularies_file = open(options['vocabularies-output'], "wb")
+        generator.export_vocabularies(vocabularies_file, options['format'])
+        vocabularies_file.close()
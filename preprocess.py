@@ -0,0 +1,55 @@
+import csv
+import getopt
+import logging
+import sys
+
+from claimskg.generator.columnar import convert_csv_to_parquet
+
+logger = logging.getLogger()
+logger.setLevel(logging.DEBUG)
+
+ch = logging.StreamHandler(sys.stdout)
+ch.setLevel(logging.DEBUG)
+formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+ch.setFormatter(formatter)
+logger.addHandler(ch)
+
+
+def usage():
+    logger.info("Converts the CSV of the fake news extractor to a Parquet file read by export.py without parsing the "
+                "CSV and the entity annotations again (requires the pyarrow package)\n\n"
+                "python3 preprocess.py --input [file] --output [file] [--row-group-size [int]]\n\n"
+                "--input [file] CSV generated by the fake news extractor (mandatory)\n"
+                "--output [file] Path of the output, use a .parquet extension so that export.py recognizes it "
+                "(mandatory)\n"
+                "--row-group-size [int] Number of rows converted and written at once (default 10000)\n")
+
+
+if __name__ == '__main__':
+    options = {'row-group-size': 10000}
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], "h", ("input=", "output=", "row-group-size="))
+        for opt, arg in opts:
+            if opt == '-h':
+                usage()
+                exit()
+            elif opt == '--input':
+                options['input'] = arg
+            elif opt == '--output':
+                options['output'] = arg
+            elif opt == '--row-group-size':
+                options['row-group-size'] = int(arg)
+    except (getopt.GetoptError, ValueError):
+        logger.info('Arguments parser error')
+        usage()
+        exit()
+
+    if "input" not in options.keys() or "output" not in options.keys():
+        logger.info("Missing mandatory parameter --input or --output")
+        usage()
+        exit()
+
+    csv.field_size_limit(1000000000)
+    logger.info("Converting {input} to {output}...".format(input=options['input'], output=options['output']))
+    row_count = convert_csv_to_parquet(options['input'], options['output'], options['row-group-size'])
+    logger.info("{count} rows converted".format(count=row_count))
@@ -0,0 +1,31 @@
+from datetime import date
+
+from rdflib import URIRef
+
+from claimskg.reconciler.features import ClaimFeatures
+
+
+class StandInClaim:
+    def __init__(self, name, author="author", claim_date=date(2020, 1, 1), review_date=None, entities=(),
+                 categories=(), keywords=(), links=(), text="", review="review", site="site"):
+        """
+            Logical view of a claim (see claimskg.generator.ClaimLogicalView) holding the parts used by the
+            reconciliation only
+        :param name: The name of the creative work of the claim, the reviews of the same claim share it
+        :param review: The name of the review of the claim
+        """
+        self.creative_work_uri = URIRef("http://example.org/creative_work/" + name)
+        self.claim_review_url = "http://example.org/review/{}/{}".format(name, review)
+        self.creative_work_author = author
+        self.claimreview_author = site
+        self.claim_date = claim_date
+        self.review_date = review_date
+        self.text_fragments = [text or name]
+        self.features = ClaimFeatures(entities, categories, keywords, links, text or name, text or name)
+
+
+def mapping_pairs(mappings):
+    """
+        The (creative work A, creative work B) pairs of the mappings of FactReconciler.generate_mappings, sorted
+    """
+    return sorted((str(pair[0].creative_work_uri), str(pair[1].creative_work_uri)) for _, pair in mappings if pair)
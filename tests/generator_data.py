@@ -0,0 +1,91 @@
+import json
+import os
+import shutil
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), os.pardir, "claimskg", "data")
+
+MODEL_URI = "http://data.gesis.org/claimskg/"
+
+THESOZ = """<?xml version="1.0"?>
+<rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#" xmlns:skos="http://www.w3.org/2004/02/skos/core#"
+         xmlns:skosxl="http://www.w3.org/2008/05/skos-xl#">
+ <skos:Concept rdf:about="http://lod.gesis.org/thesoz/concept/health_policy">
+  <skosxl:prefLabel><skosxl:Label><skosxl:literalForm xml:lang="en">health policy</skosxl:literalForm></skosxl:Label>
+  </skosxl:prefLabel>
+ </skos:Concept>
+ <skos:Concept rdf:about="http://lod.gesis.org/thesoz/concept/economy">
+  <skosxl:prefLabel rdf:resource="http://lod.gesis.org/thesoz/label/economy"/>
+ </skos:Concept>
+ <skosxl:Label rdf:about="http://lod.gesis.org/thesoz/label/economy">
+  <skosxl:literalForm xml:lang="en">economy</skosxl:literalForm>
+ </skosxl:Label>
+</rdf:RDF>
+"""
+
+UNESCO = """<?xml version="1.0"?>
+<rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#" xmlns:skos="http://www.w3.org/2004/02/skos/core#">
+ <skos:Concept rdf:about="http://vocabularies.unesco.org/thesaurus/health">
+  <skos:prefLabel xml:lang="en">health</skos:prefLabel><skos:altLabel xml:lang="en">health care</skos:altLabel>
+ </skos:Concept>
+ <skos:Concept rdf:about="http://vocabularies.unesco.org/thesaurus/politics">
+  <skos:prefLabel xml:lang="en">politics</skos:prefLabel>
+ </skos:Concept>
+</rdf:RDF>
+"""
+
+DBPEDIA_CATEGORIES = """<http://dbpedia.org/resource/Category:Politics> <http://www.w3.org/2004/02/skos/core#prefLabel> "Politics"@en .
+"""
+
+SITES = ["snopes", "politifact", "africacheck"]
+AUTHORS = ["Donald Trump", "Bloggers", ""]
+KEYWORDS = ["health policy", "politics", "economy", "health", "new york"]
+ENTITIES = ["Donald Trump", "Barack Obama", "Health care", "New York", "Politics"]
+RATINGS = ["false", "true", "mixture", "mostly false"]
+
+
+def write_vocabularies(directory):
+    """
+        Writes small thesauri where ClaimsKGGenerator looks for them (claimskg/data relative to the working directory),
+        with the stop words and termination terms of the repository
+    """
+    data_directory = os.path.join(str(directory), "claimskg", "data")
+    os.makedirs(data_directory, exist_ok=True)
+    for name, content in (("thesoz-komplett.xml", THESOZ), ("unesco-thesaurus.xml", UNESCO),
+                          ("dbpedia_categories_lang_en_skos.ttl", DBPEDIA_CATEGORIES)):
+        with open(os.path.join(data_directory, name), "w", encoding="utf8") as vocabulary_file:
+            vocabulary_file.write(content)
+    for name in ("stopwordsen.txt", "termination_termsen.txt"):
+        shutil.copy(os.path.join(DATA_DIR, name), data_directory)
+
+
+def _mentions(text, index, count):
+    mentions = []
+    for position in range(count):
+        entity = ENTITIES[(index + position) % len(ENTITIES)]
+        mentions.append({"text": entity.lower(), "begin": position, "end": position + len(entity), "entity": entity,
+                         "score": round(0.3 + 0.1 * ((index + position) % 6), 3),
+                         "categories": ["Politics,Health"] if (index + position) % 2 == 0 else []})
+    return json.dumps(mentions)
+
+
+def dataset_row(index, text=None):
+    """
+        A row of the extractor output, the same for the same index (and text)
+    """
+    site = SITES[index % len(SITES)]
+    keywords = [KEYWORDS[(index + offset) % len(KEYWORDS)] for offset in range(index % 4)]
+    text = text or "Claim number {} about {}".format(index % 7, KEYWORDS[index % len(KEYWORDS)])
+    keyword_mentions = [{"text": keyword, "begin": 0, "end": len(keyword), "entity": keyword.title(), "score": 0.5,
+                         "categories": []} for keyword in keywords[:2]]
+    return {"claimReview_author_name": site, "claimReview_author_url": "",
+            "claimReview_datePublished": "2019-0{}-1{}".format(index % 9 + 1, index % 10),
+            "claimReview_url": "http://{}.com/c{}".format(site, index),
+            "creativeWork_author_name": AUTHORS[index % len(AUTHORS)], "creativeWork_author_sameAs": "",
+            "creativeWork_datePublished": ["", "2019-01-01", "2019-02-02"][index % 3],
+            "claimReview_claimReviewed": text, "extra_title": "Headline {}".format(index),
+            "extra_body": "Body of the claim {} about politics".format(index), "extra_tags": ";".join(keywords),
+            "extra_entities_keywords": json.dumps(keyword_mentions),
+            "extra_refered_links": "http://example.org/a{},http://example.org/b,".format(index),
+            "extra_entities_author": _mentions(text, index, index % 2), "rating_alternateName": RATINGS[index % 4],
+            "rating_ratingValue": "", "extra_entities_claimReview_claimReviewed": _mentions(text, index, index % 3),
+            "extra_entities_body": _mentions(text, index + 1, 2)}
@@ -0,0 +1,77 @@
+import json
+import threading
+import time
+import urllib.parse
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Callable, Dict, List
+
+
+class StandInEndpoint:
+    def __init__(self, respond: Callable[[str], List[Dict]], delay=0.0, write_size=1000):
+        """
+            Local stand-in SPARQL endpoint answering GET and POST queries with a SPARQL JSON result, written in chunks
+            of write_size bytes. The queries received and the largest number of queries in flight at once are recorded.
+        :param respond: Returns the bindings of the result of a query, the query fails (HTTP 500) when it raises
+        :param delay: The time each query takes, so that concurrent queries overlap
+        """
+        self.respond = respond
+        self.delay = delay
+        self.write_size = write_size
+        self.queries = []  # type: List[str]
+        self.max_in_flight = 0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        return "http://127.0.0.1:{port}/sparql".format(port=self._server.server_address[1])
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exception):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _answer(self, handler, query):
+        with self._lock:
+            self.queries.append(query)
+            self._in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self._in_flight)
+        try:
+            time.sleep(self.delay)
+            try:
+                bindings = self.respond(query)
+            except Exception:
+                # The respond function raises to make the query fail
+                handler.send_error(500)
+                return
+            body = json.dumps({"head": {"vars": []}, "results": {"bindings": bindings}}).encode("utf-8")
+            handler.send_response(200)
+            handler.send_header("Content-Type", "application/sparql-results+json")
+            handler.end_headers()
+            for start in range(0, len(body), self.write_size):
+                handler.wfile.write(body[start:start + self.write_size])
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    def _handler_class(self):
+        endpoint = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *arguments):
+                pass
+
+            def do_GET(self):
+                parameters = urllib.parse.parse_qs(urllib.parse.urlparse(self.path).query)
+                endpoint._answer(self, parameters["query"][0])
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"])).decode("utf-8")
+                endpoint._answer(self, urllib.parse.parse_qs(body)["query"][0])
+
+        return Handler
@@ -0,0 +1,28 @@
+import numpy
+
+from claimskg.vsm.ann import RandomHyperplaneIndex, nearest_neighbour_pairs
+
+
+def _index():
+    random = numpy.random.RandomState(0)
+    return RandomHyperplaneIndex(random.standard_normal((200, 16)), tables=8, bits=4)
+
+
+def test_neighbours_are_taken_among_the_allowed_rows():
+    # Two buckets of rows (even and odd), as the blocking of the reconciler
+    def allowed(row):
+        return [other for other in range(row % 2, 200, 2) if other != row]
+
+    pairs = nearest_neighbour_pairs(_index(), 5, allowed=allowed)
+    assert len(pairs) > 0
+    assert all((row_a - row_b) % 2 == 0 for row_a, row_b in pairs)
+    assert len(pairs) <= 200 * 5
+    for row, neighbours, _ in _index().nearest_neighbours(5, allowed=allowed):
+        assert len(neighbours) == 5
+        assert set(neighbours.tolist()) <= set(allowed(row))
+
+
+def test_pairs_are_in_combination_order():
+    pairs = nearest_neighbour_pairs(_index(), 3)
+    assert pairs == sorted(pairs)
+    assert all(row_a < row_b for row_a, row_b in pairs)
@@ -0,0 +1,31 @@
+import io
+
+import claimskg.generator
+from claimskg.generator import ClaimsKGGenerator
+from claimskg.reconciler.recognizer import RecognizerPool
+from generator_data import MODEL_URI, dataset_row, write_vocabularies
+
+
+def _stream_lines(rows, annotation_workers):
+    generator = ClaimsKGGenerator(MODEL_URI, annotation_workers=annotation_workers)
+    output = io.BytesIO()
+    generator.generate_model_stream(rows, output, chunk_size=5)
+    # Left out: the modification date (time of the run) and the blank nodes of the parsed thesauri
+    return set(line for line in output.getvalue().decode("utf-8").splitlines() if
+               "/modified>" not in line and "_:" not in line)
+
+
+def test_stream_forks_the_annotation_workers_once(tmp_path, monkeypatch):
+    write_vocabularies(tmp_path)
+    monkeypatch.chdir(tmp_path)
+    pools = []
+
+    class CountedRecognizerPool(RecognizerPool):
+        def __init__(self, recognizers, workers):
+            super().__init__(recognizers, workers)
+            pools.append(self)
+
+    monkeypatch.setattr(claimskg.generator, "RecognizerPool", CountedRecognizerPool)
+    rows = [dataset_row(index) for index in range(20)]
+    assert _stream_lines(rows, 2) == _stream_lines(rows, 1)
+    assert len(pools) == 1
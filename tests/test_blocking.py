@@ -0,0 +1,40 @@
+from datetime import date
+
+import pytest
+
+from claims import StandInClaim
+from claimskg.reconciler import FactReconciler
+
+
+def _claims():
+    return [StandInClaim("a", entities=["Trump", "Tax"], keywords=["tax"]),
+            StandInClaim("b", entities=["Trump", "Tax"], keywords=["tax", "economy"]),
+            StandInClaim("c", claim_date=None, entities=["Trump", "Tax"], keywords=["tax"]),
+            StandInClaim("d", claim_date=None, entities=["Trump"], keywords=["economy"]),
+            StandInClaim("e", claim_date=date(2020, 1, 2), entities=["Trump", "Tax"], keywords=["tax"]),
+            StandInClaim("f", author=None, entities=["Trump", "Tax"], keywords=["tax"]),
+            StandInClaim("g", author=None, claim_date=None, entities=["Trump", "Tax"], keywords=["economy"]),
+            StandInClaim("h", author=None, entities=["Trump"], keywords=["tax"]),
+            StandInClaim("i", review_date=date(2020, 1, 1), entities=["Obama", "Health"], keywords=["health"]),
+            StandInClaim("j", review_date=date(2020, 1, 5), entities=["Obama", "Health"], keywords=["health"]),
+            StandInClaim("k", claim_date=None, review_date=date(2020, 1, 2), entities=["Obama"], keywords=["health"]),
+            StandInClaim("l", claim_date=None, review_date=date(2019, 12, 1), entities=["Obama", "Health"]),
+            StandInClaim("m", author="other", entities=["Obama", "Health"], keywords=["health"]),
+            StandInClaim("n", author="other", claim_date=None, keywords=["health"]),
+            StandInClaim("o", keywords=["health"]),
+            # A second review of the claim of "a"
+            StandInClaim("a", review="second", entities=["Trump", "Tax"], keywords=["tax"])]
+
+
+def _scored_pairs(blocking, workers):
+    mappings = FactReconciler(None, False, None, _claims(), 0.01, 1, 1, 1, 1, blocking=blocking, workers=workers,
+                              pair_chunk_size=3).generate_mappings()
+    return sorted((str(pair[0].claim_review_url), str(pair[1].claim_review_url), score)
+                  for score, pair in mappings if pair)
+
+
+@pytest.mark.parametrize("blocking,workers", [(True, 1), (False, 2), (True, 2)])
+def test_blocking_and_parallel_scoring_give_the_mappings_of_the_exhaustive_scan(blocking, workers):
+    expected = _scored_pairs(False, 1)
+    assert len(expected) > 0
+    assert _scored_pairs(blocking, workers) == expected
@@ -0,0 +1,32 @@
+import pickle
+
+from claims import StandInClaim
+from claimskg.reconciler import FactReconciler
+from claimskg.reconciler.features import ClaimFeatures
+
+ENTITIES = ["Trump", "Tax", "Trump", "Abortion"]
+KEYWORDS = ["tax", "economy", "abortion"]
+LINKS = ["http://example.org/z", "http://example.org/a"]
+
+
+def test_values_keep_their_order():
+    features = ClaimFeatures(ENTITIES, [], KEYWORDS, LINKS, "text", "text")
+    assert list(features.entities) == sorted(features.entities)
+    assert features.entity_values() == ENTITIES
+    assert features.keyword_values() == KEYWORDS
+    assert features.link_values() == LINKS
+
+    # Codes assigned in another order (unpickling in another process) do not change the order of the values
+    ClaimFeatures(list(reversed(ENTITIES)), [], list(reversed(KEYWORDS)), [], "", "")
+    copy = pickle.loads(pickle.dumps(features))
+    assert copy.entity_values() == ENTITIES
+    assert copy.keyword_values() == KEYWORDS
+
+
+def test_mapping_description_lists_the_values_in_claim_order():
+    claim_a = StandInClaim("a", entities=ENTITIES, keywords=KEYWORDS, links=LINKS)
+    claim_b = StandInClaim("b", entities=list(reversed(ENTITIES)), keywords=["economy"])
+    line = FactReconciler._generate_claim_mapping_string_description(0.5, claim_a, claim_b)
+    assert '"Trump,Tax,Trump,Abortion","Abortion,Trump,Tax,Trump"' in line
+    assert '"tax,economy,abortion","economy"' in line
+    assert '"http://example.org/z,http://example.org/a",""' in line
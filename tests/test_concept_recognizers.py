@@ -0,0 +1,76 @@
+import os
+
+import pytest
+from rdflib import Graph, Literal, Namespace, RDF
+
+from claimskg.generator.skosthesaurusmatcher import SkosThesaurusMatcher
+from claimskg.reconciler.recognizer import RecognizerPool
+
+SKOS = Namespace("http://www.w3.org/2004/02/skos/core#")
+THESAURUS = Namespace("http://example.org/thesaurus/")
+
+# Overlapping and multi-token labels, labels sharing stems and a label made of a stop word and a stem
+LABELS = [("health", SKOS.prefLabel, "health"),
+          ("health_care", SKOS.prefLabel, "health care"),
+          ("health_care", SKOS.altLabel, "healthcare"),
+          ("care_policy", SKOS.prefLabel, "health care policy"),
+          ("policy", SKOS.prefLabel, "policies"),
+          ("new_york", SKOS.prefLabel, "New York"),
+          ("new_york_city", SKOS.prefLabel, "New York City"),
+          ("city_council", SKOS.prefLabel, "city council"),
+          ("tax", SKOS.prefLabel, "taxes"),
+          ("tax", SKOS.altLabel, "taxation"),
+          ("tax_cut", SKOS.prefLabel, "tax cut"),
+          ("income_tax", SKOS.prefLabel, "income of tax"),
+          ("care", SKOS.altLabel, "care")]
+
+TEXTS = ["health care", "The health care policy of New York City", "New York City council", "taxes and tax cuts",
+         "cut the tax income", "income of taxes", "tax income cut", "policy health care", "care health care",
+         "Healthcare policies in New-York", "city of New York council", "", "nothing to see", "tax tax cut cut"]
+
+
+@pytest.fixture(scope="module")
+def thesaurus():
+    graph = Graph()
+    for concept, label_property, label in LABELS:
+        graph.add((THESAURUS[concept], RDF.type, SKOS.Concept))
+        graph.add((THESAURUS[concept], label_property, Literal(label, lang="en")))
+    return graph
+
+
+def _matcher(thesaurus, concept_recognizer):
+    # The matcher reads the stop words and termination terms relative to the repository root
+    current_directory = os.getcwd()
+    os.chdir(os.path.join(os.path.dirname(__file__), os.pardir))
+    try:
+        return SkosThesaurusMatcher(thesaurus_graph=thesaurus, skos_xl_labels=False, use_index_cache=False,
+                                    concept_recognizer=concept_recognizer)
+    finally:
+        os.chdir(current_directory)
+
+
+def test_automaton_recognizer_matches_as_the_intersection_recognizer(thesaurus):
+    intersection = _matcher(thesaurus, "intersection")
+    automaton = _matcher(thesaurus, "automaton")
+
+    annotations = intersection.annotate_texts(TEXTS)
+    assert annotations == automaton.annotate_texts(TEXTS)
+    assert sum(len(text_annotations) for text_annotations in annotations) > 10
+    assert intersection.find_keyword_matches_many(TEXTS) == automaton.find_keyword_matches_many(TEXTS)
+    for text in TEXTS:
+        assert intersection.concept_recognizer.recognize(text) == automaton.concept_recognizer.recognize(text)
+
+
+def test_recognizer_pool_is_shared_by_the_recognizers_and_the_calls(thesaurus):
+    intersection = _matcher(thesaurus, "intersection")
+    automaton = _matcher(thesaurus, "automaton")
+    expected = intersection.annotate_texts(TEXTS)
+
+    with RecognizerPool([intersection.concept_recognizer, automaton.concept_recognizer], 2) as pool:
+        worker_ids = sorted(worker.pid for worker in pool._pool._pool)
+        for _ in range(2):
+            assert intersection.annotate_texts(TEXTS, pool=pool) == expected
+            assert automaton.annotate_texts(TEXTS, pool=pool) == expected
+            assert automaton.find_keyword_matches_many(TEXTS, pool=pool) == intersection.find_keyword_matches_many(
+                TEXTS)
+        assert sorted(worker.pid for worker in pool._pool._pool) == worker_ids
@@ -0,0 +1,28 @@
+import numpy
+import pytest
+
+from claimskg.vsm.embeddings import MemoryMappedEmbeddings, convert_text_embeddings
+
+
+def _write(path, lines):
+    path.write_text("".join(line + "\n" for line in lines), encoding="utf-8")
+    return str(path)
+
+
+def test_vectors_are_those_of_the_words_of_the_vocabulary(tmp_path):
+    vocab_file = _write(tmp_path / "words.txt", ["tax", "health", "war"])
+    vectors_file = _write(tmp_path / "vectors.txt", ["1 0", "0 1", "0.5 0.5"])
+    assert convert_text_embeddings(vectors_file, str(tmp_path / "embeddings"), vocab_file) == (3, 2)
+
+    embeddings = MemoryMappedEmbeddings(str(tmp_path / "embeddings"))
+    assert embeddings.word_vector("health").tolist() == [0, 1]
+    assert embeddings.word_vector("war").tolist() == [0.5, 0.5]
+
+
+@pytest.mark.parametrize("vectors", [["1 0", "0 1"], ["1 0", "0 1", "0.5 0.5", "1 1"]])
+def test_vocabulary_and_vectors_must_have_the_same_size(tmp_path, vectors):
+    vocab_file = _write(tmp_path / "words.txt", ["tax", "health", "war"])
+    vectors_file = _write(tmp_path / "vectors.txt", vectors)
+    with pytest.raises(ValueError, match="{} vectors for the 3 words".format(len(vectors))):
+        convert_text_embeddings(vectors_file, str(tmp_path / "embeddings"), vocab_file)
+    assert not (tmp_path / "embeddings.npy").exists()
@@ -0,0 +1,97 @@
+import os
+
+import pytest
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+
+from claimskg.reconciler.dictionary import StringDictionaryLoader
+from claimskg.reconciler.recognizer.deep_recognizers import IntersEmbeddingConceptRecognizer
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), os.pardir, "claimskg", "data")
+
+VOCABULARY = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]", "health", "care", "policy", "new", "york", "city", "tax",
+              "the", "of", "a", ",", ".", "!", "?", "war", "or"]
+
+ENTRIES = [("c1", "health care"), ("c2", "new york city"), ("c2", "york"), ("c3", "tax"),
+           ("c4", "health care policy"), ("c5", "tax or war")]
+
+
+@pytest.fixture(scope="module")
+def recognizer(tmp_path_factory):
+    # Tiny randomly initialised BERT model, the matching does not depend on the weights
+    vocabulary_path = tmp_path_factory.mktemp("model") / "vocab.txt"
+    vocabulary_path.write_text("\n".join(VOCABULARY) + "\n")
+    tokenizer = transformers.BertTokenizer(str(vocabulary_path))
+    torch.manual_seed(0)
+    config = transformers.BertConfig(vocab_size=len(VOCABULARY), hidden_size=16, num_hidden_layers=1,
+                                     num_attention_heads=2, intermediate_size=32, max_position_embeddings=64)
+    model = transformers.BertModel(config).eval()
+
+    recognizer = IntersEmbeddingConceptRecognizer(StringDictionaryLoader(ENTRIES),
+                                                  os.path.join(DATA_DIR, "stopwordsen.txt"),
+                                                  os.path.join(DATA_DIR, "termination_termsen.txt"), tokenizer, model,
+                                                  config, batch_size=2, num_threads=1)
+    recognizer.initialize()
+    return recognizer
+
+
+def _matches(annotations):
+    return sorted((annotation.concept_id, annotation.matched_text) for annotation in annotations)
+
+
+def test_labels_are_indexed_without_special_tokens(recognizer):
+    assert recognizer.cls_token_id not in recognizer.unigram_index
+    assert recognizer.concept_length_index["c1:::0"] == 2
+    assert recognizer.concept_length_index["c4:::0"] == 3
+
+
+def test_concepts_keep_all_their_labels(recognizer):
+    assert recognizer.concept_index["c2"].labels == {"new york city", "york"}
+
+
+def test_recognize_matches_whole_labels(recognizer):
+    assert _matches(recognizer.recognize("health care")) == [("c1", "health care")]
+    assert _matches(recognizer.recognize("The health care policy of New York City")) == [
+        ("c2", "New York City"), ("c4", "health care policy")]
+    assert _matches(recognizer.recognize("war of the tax")) == [("c3", "tax")]
+
+
+def test_recognize_many_is_recognize_of_each_text(recognizer):
+    texts = ["The health care policy of New York City", "tax", "war", "york and the health care", "health care"]
+    expected = [_matches(recognizer.recognize(text)) for text in texts]
+    assert [_matches(annotations) for annotations in recognizer.recognize_many(texts)] == expected
+
+
+def test_confidence_of_a_text_equal_to_the_label(recognizer):
+    annotation, = recognizer.recognize("health care")
+    assert annotation.confidence_score == pytest.approx(1.0, abs=1e-5)
+
+
+def test_thread_count_is_restored(recognizer):
+    num_threads = torch.get_num_threads()
+    recognizer.recognize("tax")
+    assert torch.get_num_threads() == num_threads
+
+
+def test_stop_and_termination_terms_are_token_ids(recognizer):
+    of_id, or_id = recognizer.tokenizer.convert_tokens_to_ids(["of", "or"])
+    assert of_id in recognizer.stop_words
+    assert or_id in recognizer.termination_terms
+    assert recognizer.unk_token_id not in recognizer.stop_words
+
+
+def test_stop_words_are_skipped_in_a_match(recognizer):
+    assert _matches(recognizer.recognize("health of care")) == [("c1", "health of care")]
+
+
+def test_termination_term_ends_a_match(recognizer):
+    # Without the termination term "or", the label of c5 would match the whole text
+    assert _matches(recognizer.recognize("tax or war")) == [("c3", "tax")]
+
+
+def test_every_concept_has_the_vectors_of_its_tokens(recognizer):
+    health_id, = recognizer.tokenizer.convert_tokens_to_ids(["health"])
+    assert set(recognizer.concept_token_vector_index[health_id]) == {"c1", "c4"}
+    annotation, = recognizer.recognize("health care policy")
+    assert annotation.confidence_score == pytest.approx(1.0, abs=1e-5)
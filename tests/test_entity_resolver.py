@@ -0,0 +1,115 @@
+import re
+
+from SPARQLWrapper import SPARQLWrapper
+
+from claimskg.util.cache import SqliteCache
+from claimskg.util.sparql.entity_resolver import DBpediaEntityResolver, _sparql_iri
+from sparql_endpoint import StandInEndpoint
+
+DBR = "http://dbpedia.org/resource/"
+
+REDIRECTS = {DBR + "Health_Policy": DBR + "Health_policy", DBR + 'Quote_"Unquote"': DBR + "Quote_Unquote"}
+MISSING = {DBR + "Not_a_resource", DBR + "Missing_{braces}"}
+
+CANDIDATES = [DBR + "Entity_{}".format(index) for index in range(450)] + list(REDIRECTS) + list(MISSING) + [
+    DBR + "With space", DBR + "Back\\slash_|_pipe"]
+
+
+def _respond(query):
+    # The stand-in knows every resource but the missing ones, it answers with the IRIs as written in the query
+    bindings = []
+    for iri in re.findall(r"<([^>]*)>", re.search(r"VALUES \?candidate \{(.*?)\}", query, re.S).group(1)):
+        unescaped_iri = re.sub(r"%([0-9A-F]{2})", lambda match: chr(int(match.group(1), 16)), iri)
+        if unescaped_iri in MISSING:
+            continue
+        binding = {"candidate": {"type": "uri", "value": iri}}
+        bindings.append(binding)
+        if unescaped_iri in REDIRECTS:
+            bindings.append(dict(binding, redirect={"type": "uri", "value": REDIRECTS[unescaped_iri]}))
+    return bindings
+
+
+def _values_count(query):
+    return len(re.findall(r"<[^>]*>", re.search(r"VALUES \?candidate \{(.*?)\}", query, re.S).group(1)))
+
+
+def test_candidates_are_resolved_in_batches():
+    with StandInEndpoint(_respond, delay=0.05) as endpoint:
+        resolver = DBpediaEntityResolver(SPARQLWrapper(endpoint.url), batch_size=100, workers=2, chunk_size=512)
+        resolutions = resolver.resolve(CANDIDATES + CANDIDATES[:10])
+    assert len(endpoint.queries) == resolver.query_count == 5
+    assert sorted(_values_count(query) for query in endpoint.queries) == [len(CANDIDATES) - 400, 100, 100, 100, 100]
+    assert endpoint.max_in_flight <= 2
+    assert set(resolutions) == set(CANDIDATES)
+
+
+def test_redirects_and_missing_resources():
+    with StandInEndpoint(_respond) as endpoint:
+        resolutions = DBpediaEntityResolver(SPARQLWrapper(endpoint.url), batch_size=100).resolve(CANDIDATES)
+    for candidate, target in REDIRECTS.items():
+        assert resolutions[candidate] == target
+    for candidate in MISSING:
+        assert resolutions[candidate] is None
+    assert resolutions[DBR + "Entity_7"] == DBR + "Entity_7"
+
+
+def test_escaped_candidates_resolve_to_the_original_iri():
+    assert _sparql_iri(DBR + 'A "b" {c}') == "<" + DBR + "A%20%22b%22%20%7Bc%7D>"
+    escaped = [DBR + "With space", DBR + "Back\\slash_|_pipe", DBR + 'Quote_"Unquote"']
+    with StandInEndpoint(_respond) as endpoint:
+        resolutions = DBpediaEntityResolver(SPARQLWrapper(endpoint.url)).resolve(escaped)
+    assert '"' not in endpoint.queries[0].split("VALUES")[1].split("}")[0]
+    assert resolutions == {DBR + "With space": DBR + "With space",
+                           DBR + "Back\\slash_|_pipe": DBR + "Back\\slash_|_pipe",
+                           DBR + 'Quote_"Unquote"': DBR + "Quote_Unquote"}
+
+
+def test_rerun_sends_no_query(tmp_path):
+    cache_path = str(tmp_path / "resolutions.sqlite")
+    with StandInEndpoint(_respond) as endpoint:
+        first_resolutions = DBpediaEntityResolver(SPARQLWrapper(endpoint.url), SqliteCache(cache_path),
+                                                  batch_size=100).resolve(CANDIDATES)
+        query_count = len(endpoint.queries)
+        resolver = DBpediaEntityResolver(SPARQLWrapper(endpoint.url), SqliteCache(cache_path), batch_size=100)
+        second_resolutions = resolver.resolve(CANDIDATES)
+    assert query_count > 0
+    assert len(endpoint.queries) == query_count
+    assert resolver.query_count == 0
+    assert second_resolutions == first_resolutions
+
+
+def test_failed_queries_are_retried():
+    failures = []
+
+    def respond(query):
+        if len(failures) < 2:
+            failures.append(query)
+            raise IOError("Unavailable")
+        return _respond(query)
+
+    with StandInEndpoint(respond) as endpoint:
+        resolutions = DBpediaEntityResolver(SPARQLWrapper(endpoint.url), batch_size=len(CANDIDATES),
+                                            retry_delay=0.01).resolve(CANDIDATES)
+    assert len(endpoint.queries) == 3
+    assert set(resolutions) == set(CANDIDATES)
+
+
+def test_candidates_of_failing_queries_are_left_unresolved(tmp_path):
+    def respond(query):
+        if "Entity_1>" in query:
+            raise IOError("Unavailable")
+        return _respond(query)
+
+    cache = SqliteCache(str(tmp_path / "resolutions.sqlite"))
+    with StandInEndpoint(respond) as endpoint:
+        resolver = DBpediaEntityResolver(SPARQLWrapper(endpoint.url), cache, batch_size=100, retries=2,
+                                         retry_delay=0.01)
+        resolutions = resolver.resolve(CANDIDATES)
+        query_count = len(endpoint.queries)
+        # The failed candidates are not cached, they are queried again by the next run
+        resolver.resolve(CANDIDATES)
+    failed_batch = sorted(CANDIDATES)[:100]
+    assert DBR + "Entity_1" in failed_batch
+    assert set(resolutions) == set(CANDIDATES) - set(failed_batch)
+    assert query_count == 4 + 3
+    assert len(endpoint.queries) == query_count + 3
@@ -0,0 +1,54 @@
+from claimskg.generator import ClaimsKGGenerator
+from claimskg.generator.incremental import IncrementalState
+from generator_data import MODEL_URI, dataset_row, write_vocabularies
+
+CHANGED_ROW = 3
+
+
+def _export(rows, output_path, delta_path):
+    # A new generator per run, as each run of export.py parses the vocabularies again
+    state_path = str(output_path) + ".state"
+    state = IncrementalState.load(state_path, MODEL_URI, "nt") or IncrementalState(MODEL_URI, "nt")
+    ClaimsKGGenerator(MODEL_URI).generate_model_incremental(rows, state, str(output_path), str(delta_path))
+    state.save(state_path)
+
+
+def _row_lines(row):
+    generator = ClaimsKGGenerator(MODEL_URI, vocabulary_graphs="excluded")
+    generator._flush_lines()
+    generator._process_row(row)
+    return set(generator._flush_lines())
+
+
+def _delta(delta_path):
+    with open(str(delta_path), encoding="utf-8") as delta_file:
+        lines = delta_file.read().splitlines()
+    assert lines[0] == "TX ." and lines[-1] == "TC ."
+    return {line[2:] for line in lines[1:-1] if line.startswith("D ")}, \
+           {line[2:] for line in lines[1:-1] if line.startswith("A ")}
+
+
+def test_delta_only_holds_the_triples_of_the_changed_row(tmp_path, monkeypatch):
+    write_vocabularies(tmp_path)
+    monkeypatch.chdir(tmp_path)
+    output_path = tmp_path / "claimskg.nt"
+    delta_path = tmp_path / "claimskg.nt.rdfp"
+    rows = [dataset_row(index) for index in range(12)]
+
+    _export(rows, output_path, delta_path)
+    first_output = set(output_path.read_text(encoding="utf-8").splitlines())
+
+    # Nothing changed, the delta is empty
+    _export(rows, output_path, delta_path)
+    assert _delta(delta_path) == (set(), set())
+    assert set(output_path.read_text(encoding="utf-8").splitlines()) == first_output
+
+    changed_rows = list(rows)
+    changed_rows[CHANGED_ROW] = dataset_row(CHANGED_ROW, text="A claim whose text was corrected")
+    _export(changed_rows, output_path, delta_path)
+    old_lines, new_lines = _row_lines(rows[CHANGED_ROW]), _row_lines(changed_rows[CHANGED_ROW])
+    removed, added = _delta(delta_path)
+    assert len(removed) > 0 and len(added) > 0
+    assert removed == old_lines - new_lines
+    assert added == new_lines - old_lines
+    assert set(output_path.read_text(encoding="utf-8").splitlines()) == first_output - removed | added
@@ -0,0 +1,25 @@
+from rdflib import URIRef, Literal
+from rdflib.namespace import XSD
+
+from claimskg.generator.interning import TermInterner
+
+
+def test_terms_are_shared():
+    terms = TermInterner()
+    assert terms.uri("http://example.org/a") is terms.uri(URIRef("http://example.org/a"))
+    assert terms.literal(1, datatype=XSD.integer) is terms.literal(1, datatype=XSD.integer)
+    assert terms.literal(1) is not terms.literal(True)
+    assert (terms.requests, terms.created, terms.saved) == (6, 4, 2)
+
+
+def test_least_recently_used_terms_are_dropped():
+    terms = TermInterner(max_size=3)
+    first = terms.uri("http://example.org/0")
+    for index in range(1, 4):
+        terms.uri("http://example.org/{}".format(index))
+        # Keeps the first term recently used
+        assert terms.uri("http://example.org/0") is first
+    assert len(terms) == 3
+    assert terms.uri("http://example.org/1") == URIRef("http://example.org/1")
+    assert terms.literal("text", lang="en") == Literal("text", lang="en")
+    assert len(terms) == 3
@@ -0,0 +1,51 @@
+import itertools
+
+import numpy
+
+from claimskg.similarity.minhash import MinHashLSH, jaccard_index, near_duplicate_pairs, text_shingles
+
+TEXTS = ["Donald Trump says the economy grew by 4 percent last year",
+         "Barack Obama was born in Kenya",
+         "donald trump says the economy grew by 4 percent last year!",
+         "Vaccines cause autism according to a new study",
+         "",
+         "Barack Obama was born in Kenya, says a viral post",
+         "Donald Trump says the economy grew by 4 percent this year",
+         "The Eiffel Tower is going to be demolished next month",
+         "Vaccines cause autism, according to a new study.",
+         "Donald Trump says the economy shrank by 4 percent last year",
+         "   "]
+
+
+def test_near_duplicates_are_found():
+    pairs = {(index_a, index_b) for index_a, index_b, _ in near_duplicate_pairs(TEXTS, threshold=0.75)}
+    # Same text up to case and punctuation
+    assert (0, 2) in pairs
+    assert (3, 8) in pairs
+    # One word changed in a long text
+    assert (0, 6) in pairs
+
+
+def test_distinct_texts_are_not_paired():
+    pairs = near_duplicate_pairs(TEXTS, threshold=0.8)
+    paired = {index for index_a, index_b, _ in pairs for index in (index_a, index_b)}
+    assert paired.isdisjoint({1, 4, 5, 7, 10})
+    for index_a, index_b, similarity in pairs:
+        assert index_a < index_b
+        assert similarity >= 0.8
+
+
+def test_pairs_are_those_of_the_exhaustive_comparison():
+    shingles = [text_shingles(text) for text in TEXTS]
+    expected = [(index_a, index_b) for index_a, index_b in itertools.combinations(range(len(TEXTS)), 2) if
+                shingles[index_a] and shingles[index_b] and jaccard_index(shingles[index_a], shingles[index_b]) >= 0.7]
+    assert len(expected) > 3
+    assert [(index_a, index_b) for index_a, index_b, _ in near_duplicate_pairs(TEXTS, threshold=0.7)] == expected
+
+
+def test_signatures_estimate_the_jaccard_index():
+    lsh = MinHashLSH(num_perm=256)
+    shingles_a, shingles_b = text_shingles(TEXTS[0]), text_shingles(TEXTS[9])
+    estimate = numpy.mean(lsh.signature(shingles_a) == lsh.signature(shingles_b))
+    assert abs(estimate - jaccard_index(shingles_a, shingles_b)) < 0.1
+    assert numpy.mean(lsh.signature(shingles_a) == lsh.signature(text_shingles(TEXTS[7]))) < 0.1
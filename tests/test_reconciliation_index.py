@@ -0,0 +1,70 @@
+import csv
+from datetime import date
+
+from claims import StandInClaim, mapping_pairs
+from claimskg.reconciler import FactReconciler, ReconciliationIndex
+
+
+def _claims():
+    return [StandInClaim("a", entities=["Trump", "Tax"], keywords=["tax"]),
+            StandInClaim("b", entities=["Trump", "Tax"], keywords=["tax", "economy"]),
+            StandInClaim("c", entities=["Trump"], keywords=["economy"]),
+            StandInClaim("d", entities=["Obama", "Health"], keywords=["health"]),
+            StandInClaim("e", entities=["Obama", "Health"], keywords=["health"]),
+            StandInClaim("f", author="other", entities=["Obama", "Health"], keywords=["health"]),
+            StandInClaim("g", claim_date=date(2020, 1, 2), entities=["Trump", "Tax"], keywords=["tax"])]
+
+
+def _reconcile(claims, index_path, mappings_path):
+    index = None
+    if index_path is not None:
+        index = ReconciliationIndex.load(index_path) or ReconciliationIndex()
+    mappings = FactReconciler(None, False, mappings_path, claims, 0.01, 1, 1, 1, 1,
+                              reconciliation_index=index).generate_mappings()
+    if index is not None:
+        index.save(index_path)
+    return mappings
+
+
+def _mappings_file_pairs(path):
+    with open(path) as mappings_file:
+        rows = list(csv.reader(mappings_file, skipinitialspace=True))[1:]
+    return sorted((row[13], row[14]) for row in rows)
+
+
+def test_runs_with_an_index_do_not_duplicate_mappings(tmp_path):
+    index_path = str(tmp_path / "index")
+    mappings_path = str(tmp_path / "mappings.csv")
+    claims = _claims()
+    # A second review of the claim of "b", added by the second run: its pair with "a" was scored by the first run
+    claims.append(StandInClaim("b", review="second", entities=["Trump", "Tax"], keywords=["tax", "economy"]))
+    expected = mapping_pairs(_reconcile(claims, None, str(tmp_path / "full.csv")))
+    assert len(expected) > 0
+
+    _reconcile(claims[:4], index_path, mappings_path)
+    _reconcile(claims, index_path, mappings_path)
+    assert _mappings_file_pairs(mappings_path) == expected
+
+    # Nothing is new, nothing is scored again
+    assert _reconcile(claims, index_path, mappings_path) == []
+    assert _mappings_file_pairs(mappings_path) == expected
+    assert sorted(mapping[1:3] for mapping in ReconciliationIndex.load(index_path).mappings) == expected
+
+
+def test_changed_and_removed_claims_are_reconciled_again(tmp_path):
+    index_path = str(tmp_path / "index")
+    mappings_path = str(tmp_path / "mappings.csv")
+    claims = _claims()
+    _reconcile(claims, index_path, mappings_path)
+
+    # "b" no longer shares the entities of "a", "e" is removed
+    claims[1] = StandInClaim("b", entities=["Biden"], keywords=["economy"])
+    del claims[4]
+    _reconcile(claims, index_path, mappings_path)
+    index = ReconciliationIndex.load(index_path)
+    assert len(index.claims) == len(claims)
+
+    expected = mapping_pairs(_reconcile(claims, None, str(tmp_path / "full.csv")))
+    pairs = _mappings_file_pairs(mappings_path)
+    assert sorted(tuple(sorted(pair)) for pair in pairs) == sorted(tuple(sorted(pair)) for pair in expected)
+    assert not any("/creative_work/e" in uri for pair in pairs for uri in pair)
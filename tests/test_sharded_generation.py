@@ -0,0 +1,48 @@
+from rdflib import Graph, URIRef
+from rdflib.compare import isomorphic
+
+from claimskg.generator import ClaimsKGGenerator
+from generator_data import MODEL_URI, dataset_row, write_vocabularies
+
+MODIFIED = URIRef("http://purl.org/dc/terms/modified")
+
+
+def _generate(rows, workers):
+    generator = ClaimsKGGenerator(MODEL_URI)
+    lookups = [cache.hits + cache.misses for _, cache in generator._lookup_caches()]
+    generator.generate_model(rows, workers=workers, shard_size=7)
+    # The stem memo is shared by the generators of the process, only the lookups of this run are compared
+    lookups = [cache.hits + cache.misses - count for (_, cache), count in zip(generator._lookup_caches(), lookups)]
+    return generator, lookups
+
+
+def _model(generator):
+    # The modification date of the dataset is the time of the run
+    model = Graph()
+    for triple in generator._graph:
+        if triple[1] != MODIFIED:
+            model.add(triple)
+    return model
+
+
+def test_sharded_generation_gives_the_model_of_the_serial_generation(tmp_path, monkeypatch):
+    write_vocabularies(tmp_path)
+    monkeypatch.chdir(tmp_path)
+    rows = [dataset_row(index) for index in range(40)]
+
+    serial, serial_lookups = _generate(rows, 1)
+    sharded, sharded_lookups = _generate(rows, 2)
+
+    assert len(sharded._graph) == len(serial._graph)
+    assert isomorphic(_model(sharded), _model(serial))
+    assert sharded.global_statistics.counts == serial.global_statistics.counts
+    assert {site: statistics.counts for site, statistics in sharded.per_source_statistics.items()} == {
+        site: statistics.counts for site, statistics in serial.per_source_statistics.items()}
+    assert [str(claim.creative_work_uri) for claim in sharded._logical_view_claims] == [
+        str(claim.creative_work_uri) for claim in serial._logical_view_claims]
+
+    # The lookups and interning requests of the workers are merged, each worker allocating its own terms
+    assert sharded_lookups == serial_lookups
+    assert sharded_lookups[0] > 0
+    assert sharded._terms.requests == serial._terms.requests
+    assert serial._terms.created <= sharded._terms.created <= 2 * serial._terms.created
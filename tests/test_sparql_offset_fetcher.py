@@ -0,0 +1,86 @@
+import json
+import re
+
+import pytest
+from SPARQLWrapper import SPARQLWrapper
+
+from claimskg.util.cache import SqliteCache
+from claimskg.util.sparql.sparql_offset_fetcher import SparQLOffsetFetcher, SparQLKeysetFetcher, iter_json_bindings
+from sparql_endpoint import StandInEndpoint
+
+# Values with multi-byte characters, escaped quotes and brackets, so that the decoding of split responses is exercised
+ROWS = [{"s": {"type": "uri", "value": "http://example.org/{:05d}".format(index)},
+         "label": {"type": "literal", "value": "é label \"{}\" ]}}".format(index), "xml:lang": "fr"}}
+        for index in range(1234)]
+
+
+def _respond(query):
+    if "count(" in query:
+        return [{"count": {"type": "literal", "value": str(len(ROWS))}}]
+    rows = ROWS
+    key_filter = re.search(r'FILTER\(STR\(\?s\) > (".*?")\)', query)
+    if key_filter is not None:
+        last_key = json.loads(key_filter.group(1))
+        rows = [row for row in rows if row["s"]["value"] > last_key]
+    offset = re.search(r"OFFSET (\d+)", query)
+    offset = int(offset.group(1)) if offset is not None else 0
+    limit = int(re.search(r"LIMIT (\d+)", query).group(1))
+    return rows[offset:offset + limit]
+
+
+@pytest.fixture
+def endpoint():
+    with StandInEndpoint(_respond, delay=0.05, write_size=997) as endpoint:
+        yield endpoint
+
+
+def _offset_fetcher(endpoint, cache=None, page_size=100):
+    return SparQLOffsetFetcher(SPARQLWrapper(endpoint.url), page_size, "?s ?p ?o", "?s ?label", cache=cache,
+                               order_by="?s", chunk_size=777)
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_offset_rows_are_in_order(endpoint, workers):
+    assert list(_offset_fetcher(endpoint).iter_rows(workers)) == ROWS
+
+
+def test_offset_pages_are_fetched_concurrently(endpoint):
+    pages = list(_offset_fetcher(endpoint).iter_pages(workers=4))
+    assert [row for page in pages for row in page] == ROWS
+    assert 1 < endpoint.max_in_flight <= 4
+
+
+def test_offset_resumes_after_next_page(endpoint):
+    fetcher = _offset_fetcher(endpoint, page_size=500)
+    assert fetcher.next_page() == ROWS[:500]
+    assert fetcher.fetch_all(workers=3) == ROWS[500:]
+
+
+def test_keyset_pages_start_after_the_last_key(endpoint):
+    fetcher = SparQLKeysetFetcher(SPARQLWrapper(endpoint.url), 100, "?s ?p ?o", "?s ?label", "s", chunk_size=333)
+    assert fetcher.fetch_all() == ROWS
+    assert len(endpoint.queries) == len(ROWS) // 100 + 1
+    assert "OFFSET" not in "".join(endpoint.queries)
+    assert "FILTER" not in endpoint.queries[0]
+    assert 'FILTER(STR(?s) > "http://example.org/00099")' in endpoint.queries[1]
+
+
+def test_cached_results_send_no_query(endpoint, tmp_path):
+    cache = SqliteCache(str(tmp_path / "cache.sqlite"))
+    assert _offset_fetcher(endpoint, cache).fetch_all(workers=4) == ROWS
+    query_count = len(endpoint.queries)
+    assert _offset_fetcher(endpoint, cache).fetch_all(workers=4) == ROWS
+    assert len(endpoint.queries) == query_count
+
+
+def test_bindings_are_decoded_from_split_chunks():
+    data = json.dumps({"head": {"vars": ["s", "label"]}, "results": {"bindings": ROWS[:50]}}).encode("utf-8")
+    # One byte per chunk splits the multi-byte characters and every binding
+    assert list(iter_json_bindings(data[index:index + 1] for index in range(len(data)))) == ROWS[:50]
+    assert list(iter_json_bindings([b'{"head": {}}'])) == []
+
+
+def test_truncated_result_raises():
+    data = json.dumps({"results": {"bindings": ROWS[:5]}}).encode("utf-8")
+    with pytest.raises(ValueError):
+        list(iter_json_bindings([data[:-30]]))
@@ -0,0 +1,75 @@
+import itertools
+
+import pytest
+
+from claimskg.similarity import compute_overlap, jaccard, levenshtein
+from claimskg.similarity.sparse import SoftMatchIndex, SparseFeatureMatrix
+
+COLLECTIONS = [["trump", "tax", "tax"],
+               ["tax", "economy"],
+               ["trump", "trumps", "tax"],
+               [],
+               ["economy", "trade", "trump", "trump"],
+               ["tree", "trade"],
+               ["health"]]
+
+
+def _matrix(collections):
+    values = sorted(set(itertools.chain.from_iterable(collections)))
+    codes = {value: code for code, value in enumerate(values)}
+    return values, SparseFeatureMatrix([[codes[value] for value in collection] for collection in collections],
+                                       len(values))
+
+
+def _pairs(collections):
+    return tuple(zip(*itertools.combinations_with_replacement(range(len(collections)), 2)))
+
+
+def test_overlaps_and_ratios_are_those_of_compute_overlap_and_jaccard():
+    _, matrix = _matrix(COLLECTIONS)
+    rows_a, rows_b = _pairs(COLLECTIONS)
+    overlaps = matrix.overlaps(list(rows_a), list(rows_b))
+    ratios = matrix.ratios(list(rows_a), list(rows_b))
+    for row_a, row_b, overlap, ratio in zip(rows_a, rows_b, overlaps, ratios):
+        assert overlap == compute_overlap(COLLECTIONS[row_a], COLLECTIONS[row_b])
+        assert ratio == pytest.approx(jaccard(COLLECTIONS[row_a], COLLECTIONS[row_b]))
+
+
+def test_jaccard_is_that_of_the_sets():
+    _, matrix = _matrix(COLLECTIONS)
+    rows_a, rows_b = _pairs(COLLECTIONS)
+    block = matrix.block_jaccard(list(range(len(COLLECTIONS))))
+    for row_a, row_b, similarity in zip(rows_a, rows_b, matrix.jaccard(list(rows_a), list(rows_b))):
+        set_a, set_b = set(COLLECTIONS[row_a]), set(COLLECTIONS[row_b])
+        expected = len(set_a & set_b) / len(set_a | set_b) if set_a | set_b else 0
+        assert similarity == pytest.approx(expected)
+        assert block[row_a, row_b] == pytest.approx(expected)
+
+
+def test_soft_overlaps_are_those_of_compute_overlap():
+    # Every pair of values shares the n-gram " tr", hence every pair is compared, as in compute_overlap(soft=True)
+    collections = [["trump", "trade"], ["trumps", "tree", "trump"], ["tree"], []]
+    values, matrix = _matrix(collections)
+    soft_index = SoftMatchIndex(values, threshold=0)
+    assert soft_index.pair_count == len(values) * (len(values) - 1) // 2
+    rows_a, rows_b = _pairs(collections)
+    overlaps = matrix.overlaps(list(rows_a), list(rows_b), soft_index)
+    block = matrix.block_overlaps(list(range(len(collections))), soft_index).toarray()
+    for row_a, row_b, overlap in zip(rows_a, rows_b, overlaps):
+        expected = compute_overlap(collections[row_a], collections[row_b], soft=True)
+        assert overlap == pytest.approx(expected)
+        assert block[row_a, row_b] == pytest.approx(expected)
+
+
+def test_soft_overlaps_ignore_the_pairs_below_the_threshold():
+    values, matrix = _matrix(COLLECTIONS)
+    soft_index = SoftMatchIndex(values, threshold=0.8)
+    rows_a, rows_b = _pairs(COLLECTIONS)
+    for row_a, row_b, overlap in zip(rows_a, rows_b, matrix.overlaps(list(rows_a), list(rows_b), soft_index)):
+        expected = 0
+        for value_a in COLLECTIONS[row_a]:
+            for value_b in COLLECTIONS[row_b]:
+                similarity = 1 if value_a == value_b else levenshtein(value_a, value_b)
+                if similarity >= 0.8:
+                    expected += similarity
+        assert overlap == pytest.approx(expected)
@@ -0,0 +1,44 @@
+import os
+
+from claimskg.generator.skosthesaurusmatcher import SkosThesaurusMatcher
+from generator_data import UNESCO, DATA_DIR
+
+
+def _write(path, content):
+    with open(str(path), "w", encoding="utf8") as output:
+        output.write(content)
+    return str(path)
+
+
+def _matcher(tmp_path, stop_words_file, termination_terms_file):
+    return SkosThesaurusMatcher(thesaurus_path=str(tmp_path / "unesco-thesaurus.xml"), skos_xl_labels=False,
+                                prefix="http://vocabularies.unesco.org/thesaurus/", stop_words_file=stop_words_file,
+                                termination_terms_file=termination_terms_file)
+
+
+def _index_files(tmp_path):
+    return sorted(name for name in os.listdir(str(tmp_path)) if name.endswith(".index"))
+
+
+def test_index_cache_is_keyed_on_the_word_lists(tmp_path):
+    _write(tmp_path / "unesco-thesaurus.xml", UNESCO)
+    termination_terms_file = os.path.join(DATA_DIR, "termination_termsen.txt")
+    stop_words_file = _write(tmp_path / "stopwords.txt", "of\nthe\n")
+
+    matcher = _matcher(tmp_path, stop_words_file, termination_terms_file)
+    assert len(_index_files(tmp_path)) == 1
+    assert [match[0] for match in matcher.find_keyword_matches("health care")] == [
+        "http://vocabularies.unesco.org/thesaurus/health"]
+    # The cached index is loaded by the next matcher with the same files
+    _matcher(tmp_path, stop_words_file, termination_terms_file)
+    assert len(_index_files(tmp_path)) == 1
+
+    # "care" becomes a stop word: it is no longer part of the label "health care", whose index must be rebuilt
+    _write(stop_words_file, "of\nthe\ncare\n")
+    matcher = _matcher(tmp_path, stop_words_file, termination_terms_file)
+    assert len(_index_files(tmp_path)) == 2
+    assert matcher.concept_recognizer.concept_length_index["http://vocabularies.unesco.org/thesaurus/health:::1"] == 1
+
+    termination_terms_file = _write(tmp_path / "termination_terms.txt", "and\n")
+    _matcher(tmp_path, stop_words_file, termination_terms_file)
+    assert len(_index_files(tmp_path)) == 3